@@ -0,0 +1,56 @@
+"""message index and sync state
+
+Revision ID: 8c1f4e2a9b7d
+Revises: 466dd911737c
+Create Date: 2026-10-17 09:12:40.118204
+
+"""
+from typing import Sequence, Union
+
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8c1f4e2a9b7d'
+down_revision: Union[str, Sequence[str], None] = '466dd911737c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    from alembic import op
+    import sqlalchemy as sa
+
+    op.create_table(
+        'message_index',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('id', sa.String(length=64), nullable=False),
+        sa.Column('thread_id', sa.String(length=64), nullable=False),
+        sa.Column('sender', sa.String(length=320), nullable=False),
+        sa.Column('sender_name', sa.String(length=200), nullable=False),
+        sa.Column('labels', sa.Text(), nullable=False),
+        sa.Column('is_unread', sa.Boolean(), nullable=False),
+        sa.Column('category', sa.String(length=32), nullable=True),
+        sa.Column('internal_date', sa.BigInteger(), nullable=False),
+        sa.Column('list_unsubscribe', sa.Text(), nullable=False),
+        sa.PrimaryKeyConstraint('user_id', 'id')
+    )
+    op.create_index('ix_message_index_sender', 'message_index', ['sender'])
+
+    op.create_table(
+        'sync_state',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('history_id', sa.String(length=32), nullable=True),
+        sa.Column('last_full_sync_at', sa.DateTime(), nullable=True),
+        sa.Column('last_synced_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('user_id')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    from alembic import op
+
+    op.drop_table('sync_state')
+    op.drop_index('ix_message_index_sender', table_name='message_index')
+    op.drop_table('message_index')
@@ -0,0 +1,51 @@
+"""audit log owner
+
+Revision ID: a3f6c9d2e7b4
+Revises: f2c7b9e4a1d6
+Create Date: 2026-10-18 10:42:17.503826
+
+"""
+from typing import Sequence, Union
+
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3f6c9d2e7b4'
+down_revision: Union[str, Sequence[str], None] = 'f2c7b9e4a1d6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    from alembic import op
+    import sqlalchemy as sa
+
+    op.drop_index('ix_audit_logs_event_type', table_name='audit_logs')
+    op.drop_index('ix_audit_logs_timestamp', table_name='audit_logs')
+    with op.batch_alter_table('audit_logs') as batch_op:
+        batch_op.add_column(sa.Column('user_id', sa.Integer(), nullable=True))
+    op.create_index('ix_audit_logs_user', 'audit_logs', ['user_id', 'timestamp', 'id'])
+    op.create_index('ix_audit_logs_user_event_type', 'audit_logs', ['user_id', 'event_type', 'timestamp', 'id'])
+
+    # Earlier rows don't say whose they were. With a single account they can only be its
+    # own; otherwise they stay unowned, which keeps them out of every account's log.
+    # (users itself comes from DEV_CREATE_ALL, so it may not exist yet.)
+    bind = op.get_bind()
+    if not sa.inspect(bind).has_table('users'):
+        return
+    user_ids = bind.execute(sa.text("SELECT id FROM users")).scalars().all()
+    if len(user_ids) == 1:
+        bind.execute(sa.text("UPDATE audit_logs SET user_id = :user_id"), {"user_id": user_ids[0]})
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    from alembic import op
+
+    op.drop_index('ix_audit_logs_user_event_type', table_name='audit_logs')
+    op.drop_index('ix_audit_logs_user', table_name='audit_logs')
+    with op.batch_alter_table('audit_logs') as batch_op:
+        batch_op.drop_column('user_id')
+    op.create_index('ix_audit_logs_timestamp', 'audit_logs', ['timestamp', 'id'])
+    op.create_index('ix_audit_logs_event_type', 'audit_logs', ['event_type', 'timestamp', 'id'])
@@ -0,0 +1,56 @@
+"""undo journal
+
+Revision ID: a9d3e6f1c2b8
+Revises: f4c81a7d2e95
+Create Date: 2026-10-17 17:12:40.118532
+
+"""
+from typing import Sequence, Union
+
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a9d3e6f1c2b8'
+down_revision: Union[str, Sequence[str], None] = 'f4c81a7d2e95'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    from alembic import op
+    import sqlalchemy as sa
+
+    with op.batch_alter_table('undo_windows') as batch_op:
+        batch_op.alter_column('decision_id', existing_type=sa.Integer(), nullable=True)
+        batch_op.add_column(sa.Column('action_id', sa.String(length=32), nullable=True))
+        batch_op.add_column(sa.Column('user_id', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('action_type', sa.String(length=32), nullable=False, server_default=''))
+        batch_op.add_column(sa.Column('description', sa.Text(), nullable=False, server_default=''))
+        batch_op.add_column(sa.Column('message_count', sa.Integer(), nullable=False, server_default='0'))
+        batch_op.add_column(sa.Column('journal', sa.LargeBinary(), nullable=True))
+        batch_op.add_column(sa.Column('status', sa.String(length=16), nullable=False, server_default='available'))
+        batch_op.add_column(sa.Column('created_at', sa.DateTime(), nullable=True))
+        batch_op.add_column(sa.Column('undone_at', sa.DateTime(), nullable=True))
+        batch_op.create_unique_constraint('uq_undo_windows_action_id', ['action_id'])
+        batch_op.create_index('ix_undo_windows_user_id', ['user_id'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    from alembic import op
+    import sqlalchemy as sa
+
+    with op.batch_alter_table('undo_windows') as batch_op:
+        batch_op.drop_index('ix_undo_windows_user_id')
+        batch_op.drop_constraint('uq_undo_windows_action_id', type_='unique')
+        batch_op.drop_column('undone_at')
+        batch_op.drop_column('created_at')
+        batch_op.drop_column('status')
+        batch_op.drop_column('journal')
+        batch_op.drop_column('message_count')
+        batch_op.drop_column('description')
+        batch_op.drop_column('action_type')
+        batch_op.drop_column('user_id')
+        batch_op.drop_column('action_id')
+        batch_op.alter_column('decision_id', existing_type=sa.Integer(), nullable=False)
@@ -0,0 +1,50 @@
+"""sender stats
+
+Revision ID: b3e9d05c6a41
+Revises: 8c1f4e2a9b7d
+Create Date: 2026-10-17 11:40:03.552871
+
+"""
+from typing import Sequence, Union
+
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b3e9d05c6a41'
+down_revision: Union[str, Sequence[str], None] = '8c1f4e2a9b7d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    from alembic import op
+    import sqlalchemy as sa
+
+    op.create_table(
+        'sender_stats',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('email', sa.String(length=320), nullable=False),
+        sa.Column('sender_id', sa.String(length=16), nullable=False),
+        sa.Column('name', sa.String(length=200), nullable=False),
+        sa.Column('total_emails', sa.Integer(), nullable=False),
+        sa.Column('unread_count', sa.Integer(), nullable=False),
+        sa.Column('first_seen', sa.BigInteger(), nullable=True),
+        sa.Column('last_seen', sa.BigInteger(), nullable=True),
+        sa.Column('last_read', sa.BigInteger(), nullable=True),
+        sa.Column('category', sa.String(length=32), nullable=True),
+        sa.Column('category_mix', sa.Text(), nullable=False),
+        sa.Column('list_unsubscribe', sa.Text(), nullable=False),
+        sa.PrimaryKeyConstraint('user_id', 'email')
+    )
+    op.create_index('ix_sender_stats_sender_id', 'sender_stats', ['sender_id'])
+    op.create_index('ix_sender_stats_user_total', 'sender_stats', ['user_id', 'total_emails'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    from alembic import op
+
+    op.drop_index('ix_sender_stats_user_total', table_name='sender_stats')
+    op.drop_index('ix_sender_stats_sender_id', table_name='sender_stats')
+    op.drop_table('sender_stats')
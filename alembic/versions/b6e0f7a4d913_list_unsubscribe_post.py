@@ -0,0 +1,37 @@
+"""list unsubscribe post
+
+Revision ID: b6e0f7a4d913
+Revises: a9d3e6f1c2b8
+Create Date: 2026-10-17 18:02:31.550214
+
+"""
+from typing import Sequence, Union
+
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b6e0f7a4d913'
+down_revision: Union[str, Sequence[str], None] = 'a9d3e6f1c2b8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLES = ('message_index', 'sender_stats', 'action_plans')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    from alembic import op
+    import sqlalchemy as sa
+
+    for table in TABLES:
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.add_column(sa.Column('list_unsubscribe_post', sa.Text(), nullable=False, server_default=''))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    from alembic import op
+
+    for table in TABLES:
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_column('list_unsubscribe_post')
@@ -0,0 +1,44 @@
+"""audit logs
+
+Revision ID: c2d8a5f03e17
+Revises: b6e0f7a4d913
+Create Date: 2026-10-17 20:14:05.318277
+
+"""
+from typing import Sequence, Union
+
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c2d8a5f03e17'
+down_revision: Union[str, Sequence[str], None] = 'b6e0f7a4d913'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    from alembic import op
+    import sqlalchemy as sa
+
+    # Databases bootstrapped with DEV_CREATE_ALL already have the table, just not the indexes
+    if not sa.inspect(op.get_bind()).has_table('audit_logs'):
+        op.create_table(
+            'audit_logs',
+            sa.Column('id', sa.String(length=100), nullable=False),
+            sa.Column('timestamp', sa.DateTime(), nullable=False),
+            sa.Column('event_type', sa.String(length=100), nullable=False),
+            sa.Column('details', sa.Text(), nullable=False),
+            sa.PrimaryKeyConstraint('id')
+        )
+    op.create_index('ix_audit_logs_timestamp', 'audit_logs', ['timestamp', 'id'])
+    op.create_index('ix_audit_logs_event_type', 'audit_logs', ['event_type', 'timestamp', 'id'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    from alembic import op
+
+    op.drop_index('ix_audit_logs_event_type', table_name='audit_logs')
+    op.drop_index('ix_audit_logs_timestamp', table_name='audit_logs')
+    op.drop_table('audit_logs')
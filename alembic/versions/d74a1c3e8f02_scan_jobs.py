@@ -0,0 +1,49 @@
+"""scan jobs
+
+Revision ID: d74a1c3e8f02
+Revises: b3e9d05c6a41
+Create Date: 2026-10-17 13:05:27.904113
+
+"""
+from typing import Sequence, Union
+
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd74a1c3e8f02'
+down_revision: Union[str, Sequence[str], None] = 'b3e9d05c6a41'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    from alembic import op
+    import sqlalchemy as sa
+
+    op.create_table(
+        'scan_jobs',
+        sa.Column('id', sa.String(length=32), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('status', sa.String(length=16), nullable=False),
+        sa.Column('history_id', sa.String(length=32), nullable=True),
+        sa.Column('page_token', sa.String(length=256), nullable=True),
+        sa.Column('pages_done', sa.Integer(), nullable=False),
+        sa.Column('messages_processed', sa.Integer(), nullable=False),
+        sa.Column('messages_total', sa.Integer(), nullable=True),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('started_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_scan_jobs_user_id', 'scan_jobs', ['user_id'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    from alembic import op
+
+    op.drop_index('ix_scan_jobs_user_id', table_name='scan_jobs')
+    op.drop_table('scan_jobs')
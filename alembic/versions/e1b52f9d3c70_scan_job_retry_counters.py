@@ -0,0 +1,35 @@
+"""scan job retry counters
+
+Revision ID: e1b52f9d3c70
+Revises: d74a1c3e8f02
+Create Date: 2026-10-17 15:22:48.310257
+
+"""
+from typing import Sequence, Union
+
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e1b52f9d3c70'
+down_revision: Union[str, Sequence[str], None] = 'd74a1c3e8f02'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    from alembic import op
+    import sqlalchemy as sa
+
+    with op.batch_alter_table('scan_jobs') as batch_op:
+        batch_op.add_column(sa.Column('retried', sa.Integer(), nullable=False, server_default='0'))
+        batch_op.add_column(sa.Column('dropped', sa.Integer(), nullable=False, server_default='0'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    from alembic import op
+
+    with op.batch_alter_table('scan_jobs') as batch_op:
+        batch_op.drop_column('dropped')
+        batch_op.drop_column('retried')
@@ -0,0 +1,73 @@
+"""sender identities
+
+Revision ID: e8a4f1b6c3d9
+Revises: c2d8a5f03e17
+Create Date: 2026-10-17 22:41:18.207443
+
+"""
+from typing import Sequence, Union
+
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e8a4f1b6c3d9'
+down_revision: Union[str, Sequence[str], None] = 'c2d8a5f03e17'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Second-level public suffixes, as app.jobs.identity had them when this revision was
+# written. Copied rather than imported so the migration keeps doing what it did.
+MULTI_LABEL_SUFFIXES = frozenset({
+    "co.uk", "org.uk", "ac.uk", "gov.uk", "me.uk", "ltd.uk", "plc.uk",
+    "com.au", "net.au", "org.au", "edu.au", "gov.au",
+    "co.nz", "org.nz", "co.jp", "ne.jp", "or.jp", "co.kr", "co.in", "net.in", "org.in",
+    "com.br", "com.mx", "com.ar", "com.cn", "com.hk", "com.sg", "com.tr", "com.tw",
+    "co.za", "co.il", "com.my", "com.ph", "com.pl",
+})
+
+
+def _registrable_domain(address):
+    host = address.rpartition("@")[2].strip().lower().rstrip(".")
+    labels = host.split(".")
+    if len(labels) <= 2:
+        return host
+    keep = 3 if ".".join(labels[-2:]) in MULTI_LABEL_SUFFIXES else 2
+    return ".".join(labels[-keep:])
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    from alembic import op
+    import sqlalchemy as sa
+
+    with op.batch_alter_table('message_index') as batch_op:
+        batch_op.add_column(sa.Column('address', sa.String(length=320), nullable=False, server_default=''))
+    with op.batch_alter_table('sender_stats') as batch_op:
+        batch_op.add_column(sa.Column('domain', sa.String(length=253), nullable=False, server_default=''))
+    op.create_index('ix_sender_stats_user_domain', 'sender_stats', ['user_id', 'domain'])
+
+    # Rows indexed so far are keyed by exact address. History syncs only touch changed
+    # messages and would never re-key them by canonical identity, so every account's
+    # history id is dropped to force a full rescan; the new columns are filled in so the
+    # old rows still read sensibly until it has run.
+    bind = op.get_bind()
+    bind.execute(sa.text("UPDATE message_index SET address = sender"))
+    emails = [row[0] for row in bind.execute(sa.text("SELECT DISTINCT email FROM sender_stats"))]
+    for email in emails:
+        bind.execute(
+            sa.text("UPDATE sender_stats SET domain = :domain WHERE email = :email"),
+            {"domain": _registrable_domain(email), "email": email},
+        )
+    bind.execute(sa.text("UPDATE sync_state SET history_id = NULL, last_synced_at = NULL"))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    from alembic import op
+
+    op.drop_index('ix_sender_stats_user_domain', table_name='sender_stats')
+    with op.batch_alter_table('sender_stats') as batch_op:
+        batch_op.drop_column('domain')
+    with op.batch_alter_table('message_index') as batch_op:
+        batch_op.drop_column('address')
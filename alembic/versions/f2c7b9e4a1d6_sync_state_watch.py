@@ -0,0 +1,33 @@
+"""sync state watch expiry
+
+Revision ID: f2c7b9e4a1d6
+Revises: e8a4f1b6c3d9
+Create Date: 2026-10-17 23:58:04.611390
+
+"""
+from typing import Sequence, Union
+
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2c7b9e4a1d6'
+down_revision: Union[str, Sequence[str], None] = 'e8a4f1b6c3d9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    from alembic import op
+    import sqlalchemy as sa
+
+    with op.batch_alter_table('sync_state') as batch_op:
+        batch_op.add_column(sa.Column('watch_expires_at', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    from alembic import op
+
+    with op.batch_alter_table('sync_state') as batch_op:
+        batch_op.drop_column('watch_expires_at')
@@ -0,0 +1,49 @@
+"""persisted action plans
+
+Revision ID: f4c81a7d2e95
+Revises: e1b52f9d3c70
+Create Date: 2026-10-17 16:05:12.904118
+
+"""
+from typing import Sequence, Union
+
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f4c81a7d2e95'
+down_revision: Union[str, Sequence[str], None] = 'e1b52f9d3c70'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    from alembic import op
+    import sqlalchemy as sa
+
+    with op.batch_alter_table('action_plans') as batch_op:
+        batch_op.add_column(sa.Column('plan_id', sa.String(length=32), nullable=False, server_default=''))
+        batch_op.add_column(sa.Column('user_id', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('emails_affected', sa.Integer(), nullable=False, server_default='0'))
+        batch_op.add_column(sa.Column('list_unsubscribe', sa.Text(), nullable=False, server_default=''))
+        batch_op.add_column(sa.Column('confidence', sa.Float(), nullable=True))
+        batch_op.add_column(sa.Column('risk_score', sa.Float(), nullable=True))
+        batch_op.add_column(sa.Column('updated_at', sa.DateTime(), nullable=True))
+        batch_op.create_index('ix_action_plans_plan_id', ['plan_id'])
+        batch_op.create_index('ix_action_plans_user_id', ['user_id'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    from alembic import op
+
+    with op.batch_alter_table('action_plans') as batch_op:
+        batch_op.drop_index('ix_action_plans_user_id')
+        batch_op.drop_index('ix_action_plans_plan_id')
+        batch_op.drop_column('updated_at')
+        batch_op.drop_column('risk_score')
+        batch_op.drop_column('confidence')
+        batch_op.drop_column('list_unsubscribe')
+        batch_op.drop_column('emails_affected')
+        batch_op.drop_column('user_id')
+        batch_op.drop_column('plan_id')
@@ -0,0 +1,118 @@
+# app/cache.py
+"""Small in-process caches and request coalescing shared by the routes and jobs."""
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable, Optional
+
+_MISSING: Any = object()
+
+
+class TTLCache:
+    """LRU cache whose entries also expire `ttl_seconds` after being stored."""
+
+    def __init__(self, ttl_seconds: float, maxsize: int = 1024, clock: Callable[[], float] = time.monotonic) -> None:
+        self.ttl_seconds = ttl_seconds
+        self.maxsize = maxsize
+        self._clock = clock
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()  # key -> (expires_at, value)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._data.get(key, _MISSING)
+        if entry is _MISSING or entry[0] <= self._clock():
+            if entry is not _MISSING:
+                del self._data[key]
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, key: Hashable, value: Any) -> None:
+        self._data[key] = (self._clock() + self.ttl_seconds, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._data.pop(key, _MISSING)
+        return default if entry is _MISSING else entry[1]
+
+    def stats(self) -> dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+        }
+
+    def evict(self, predicate: Callable[[Any], bool]) -> int:
+        """Drop every entry whose key matches `predicate`; returns how many went."""
+        keys = [k for k in self._data if predicate(k)]
+        for key in keys:
+            del self._data[key]
+        return len(keys)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class SingleFlight:
+    """Collapses concurrent calls with the same key into one upstream call.
+
+    Callers that arrive while a call is in flight await its result instead of starting
+    their own. With a `cache`, successful results are also served for the cache's TTL.
+    """
+
+    def __init__(self, cache: Optional[TTLCache] = None) -> None:
+        self.cache = cache
+        self._inflight: dict[Hashable, asyncio.Future[Any]] = {}
+        self.calls = 0      # calls that actually went upstream
+        self.coalesced = 0  # callers that joined a call already in flight
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]], cache: bool = True) -> Any:
+        """Result of `fn()` (a coroutine function) for `key`, shared with concurrent callers."""
+        cache = cache and self.cache is not None
+        if cache and self.cache is not None:
+            value = self.cache.get(key, _MISSING)
+            if value is not _MISSING:
+                return value
+        task = self._inflight.get(key)
+        if task is None:
+            self.calls += 1
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._done(key, t, cache))
+        else:
+            self.coalesced += 1
+        # shielded so one caller going away doesn't cancel the call for the others
+        return await asyncio.shield(task)
+
+    def _done(self, key: Hashable, task: "asyncio.Future[Any]", cache: bool) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if task.cancelled() or task.exception() is not None:
+            return
+        if cache and self.cache is not None:
+            self.cache.set(key, task.result())
+
+    def forget(self, predicate: Callable[[Any], bool]) -> None:
+        """Drop cached results whose key matches `predicate` (e.g. after a mutation)."""
+        if self.cache is not None:
+            self.cache.evict(predicate)
+
+    def stats(self) -> dict[str, Any]:
+        cache_hits = self.cache.hits if self.cache is not None else 0
+        return {
+            "upstream_calls": self.calls,
+            "coalesced": self.coalesced,
+            "cache_hits": cache_hits,
+            "calls_saved": self.coalesced + cache_hits,
+            "in_flight": len(self._inflight),
+        }
@@ -9,13 +9,68 @@ class Settings(BaseSettings):
     # Provide defaults so `Settings()` is mypy-safe; env will override at runtime.
     APP_NAME: str = "Gmail Inbox Cleaner"
     OWNER_EMAIL: str = "owner@example.com"
+    # Requests without a signed-in session act as OWNER_EMAIL. Opt in only for
+    # single-account deployments that nobody else can reach
+    OWNER_FALLBACK: bool = False
+    # Signs the session cookie (signed-in accounts, OAuth state). Required: the app
+    # refuses to start without one
+    SESSION_SECRET: str = ""
     GOOGLE_CLIENT_ID: str = "dummy-client-id"
     GOOGLE_CLIENT_SECRET: str = "dummy-client-secret"
     GOOGLE_REDIRECT_URI: str = "http://localhost:8000/oauth/callback"
     GOOGLE_SCOPES: str = "https://www.googleapis.com/auth/gmail.modify,openid,https://www.googleapis.com/auth/userinfo.email,https://www.googleapis.com/auth/userinfo.profile"
+    # Access tokens are refreshed in the background this long before they expire
+    TOKEN_REFRESH_LEAD_SECONDS: int = 300
+    TOKEN_REFRESH_INTERVAL_SECONDS: int = 60
     DATABASE_URL: str = "sqlite+aiosqlite:///./app.db"
     # Enable/disable dev auto-creation of tables at startup (migrations in prod)
     DEV_CREATE_ALL: bool = True
+    # Minimum age of the local message index before a request triggers a history sync
+    INDEX_SYNC_INTERVAL_SECONDS: int = 60
+    # Push updates: users.watch publishes mailbox changes to this Pub/Sub topic
+    # (projects/<project>/topics/<topic>). Empty disables push; the index is then synced on request
+    GMAIL_PUSH_TOPIC: str = ""
+    # Shared secret the push subscription appends to the webhook URL (/push/gmail?token=...).
+    # Required with GMAIL_PUSH_TOPIC: the webhook answers 404 without it
+    PUSH_VERIFICATION_TOKEN: str = ""
+    # Even with an active watch, a request syncs history itself once the index is this old:
+    # Pub/Sub can drop or delay notifications, and a lost one would otherwise go unnoticed
+    PUSH_MAX_INDEX_AGE_SECONDS: int = 600
+    # Watches are renewed once they expire within this long (Gmail drops them after 7 days)
+    WATCH_RENEW_LEAD_SECONDS: int = 86400
+    WATCH_RENEW_INTERVAL_SECONDS: int = 3600
+    # How long a live (pre-index) dashboard summary is reused per user
+    SUMMARY_CACHE_TTL_SECONDS: int = 30
+    # Identical GmailScanner reads (summary, sampled senders) share one upstream call and
+    # the result is reused this long
+    READ_CACHE_TTL_SECONDS: int = 5
+    # Serialized senders kept for /senders/{sender_id} lookups
+    SENDER_CACHE_TTL_SECONDS: int = 60
+    SENDER_CACHE_MAX_ENTRIES: int = 10000
+    # Messages /senders/stream samples live while the first full scan is still running
+    SENDER_STREAM_MAX_MESSAGES: int = 5000
+    # Senders mutated at once when a whole plan is executed
+    PLAN_MAX_CONCURRENT_SENDERS: int = 4
+    # How long an executed action can still be undone
+    UNDO_WINDOW_SECONDS: int = 3600
+    # Background List-Unsubscribe dispatcher
+    UNSUBSCRIBE_MAX_CONCURRENCY: int = 32
+    UNSUBSCRIBE_PER_DOMAIN: int = 2  # requests in flight per receiving domain
+    UNSUBSCRIBE_TIMEOUT_SECONDS: float = 10.0
+    UNSUBSCRIBE_MAX_RETRIES: int = 3
+    # Units of Gmail work (a scan page, a mutation batch) in flight at once across all
+    # accounts; shared out round-robin between the accounts waiting for one
+    SCHEDULER_MAX_CONCURRENT_TURNS: int = 4
+    # Async Gmail transport
+    GMAIL_API_BASE_URL: str = "https://gmail.googleapis.com"
+    GMAIL_MAX_CONCURRENCY: int = 8  # requests/batches in flight per client
+    GMAIL_HTTP_MAX_CONNECTIONS: int = 50  # shared connection pool size
+    GMAIL_CLIENT_TTL_SECONDS: int = 900  # idle time before a per-user client is dropped
+    GMAIL_QUOTA_UNITS_PER_SECOND: int = 250  # Gmail per-user quota (15,000 units/minute)
+    GMAIL_MAX_RETRIES: int = 5
+    # Longest search query sent to messages.list; bulk actions pack senders into
+    # `from:(a OR b ...)` queries up to this size
+    GMAIL_MAX_QUERY_LENGTH: int = 1024
 
     model_config = {
         "env_file": ".env",
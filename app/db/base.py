@@ -4,9 +4,9 @@ from __future__ import annotations
 
 import os
 from datetime import datetime
-from typing import AsyncIterator
+from typing import AsyncIterator, Optional
 
-from sqlalchemy import DateTime, Integer, String, Text
+from sqlalchemy import BigInteger, Boolean, DateTime, Float, Index, Integer, LargeBinary, String, Text
 from sqlalchemy.ext.asyncio import (
     AsyncEngine,
     AsyncSession,
@@ -49,28 +49,56 @@ class Audit(Base):
 
 class AuditLog(Base):
     __tablename__ = "audit_logs"
+    # Both end in the keyset (timestamp, id) so an account's pages are index range scans,
+    # filtered by event type or not
+    __table_args__ = (
+        Index("ix_audit_logs_user", "user_id", "timestamp", "id"),
+        Index("ix_audit_logs_user_event_type", "user_id", "event_type", "timestamp", "id"),
+    )
 
     id: Mapped[str] = mapped_column(String(100), primary_key=True)
+    user_id: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)  # the account the event belongs to
     timestamp: Mapped[datetime] = mapped_column(DateTime, nullable=False, default=datetime.utcnow)
     event_type: Mapped[str] = mapped_column(String(100), nullable=False)
     details: Mapped[str] = mapped_column(Text, nullable=False)
 
 
 class ActionPlan(Base):
+    """One sender decision; the rows sharing a `plan_id` make up one generated plan."""
+
     __tablename__ = "action_plans"
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    plan_id: Mapped[str] = mapped_column(String(32), nullable=False, default="", index=True)
+    user_id: Mapped[int] = mapped_column(Integer, nullable=True, index=True)
     sender_email: Mapped[str] = mapped_column(String(320), nullable=False)
     action: Mapped[str] = mapped_column(String(32), nullable=False)  # keep|unsubscribe|delete
     reason: Mapped[str] = mapped_column(String(200), nullable=False, default="")
+    emails_affected: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    list_unsubscribe: Mapped[str] = mapped_column(Text, nullable=False, default="")
+    list_unsubscribe_post: Mapped[str] = mapped_column(Text, nullable=False, default="")
+    confidence: Mapped[float] = mapped_column(Float, nullable=True)
+    risk_score: Mapped[float] = mapped_column(Float, nullable=True)
     created_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, default=datetime.utcnow)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, nullable=True)
 
 
 class UndoWindow(Base):
+    """The journal of one executed action, revertible until `expires_at` (see app.jobs.undo)."""
+
     __tablename__ = "undo_windows"
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
-    decision_id: Mapped[int] = mapped_column(Integer, nullable=False)  # (FK can be added later)
+    decision_id: Mapped[int] = mapped_column(Integer, nullable=True)  # (FK can be added later)
+    action_id: Mapped[str] = mapped_column(String(32), nullable=True, unique=True)  # public id
+    user_id: Mapped[int] = mapped_column(Integer, nullable=True, index=True)
+    action_type: Mapped[str] = mapped_column(String(32), nullable=False, default="")
+    description: Mapped[str] = mapped_column(Text, nullable=False, default="")
+    message_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    journal: Mapped[bytes] = mapped_column(LargeBinary, nullable=True)  # compressed, packed ids
+    status: Mapped[str] = mapped_column(String(16), nullable=False, default="available")  # available|partial|reverting|undone
+    created_at: Mapped[datetime] = mapped_column(DateTime, nullable=True)
+    undone_at: Mapped[datetime] = mapped_column(DateTime, nullable=True)
     expires_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
 
 class User(Base):
@@ -81,4 +109,83 @@ class User(Base):
     name: Mapped[str] = mapped_column(String(200), nullable=True)
     access_token: Mapped[str] = mapped_column(Text, nullable=True)
     refresh_token: Mapped[str] = mapped_column(Text, nullable=True)
-    expires_at: Mapped[int] = mapped_column(Integer, nullable=True)
+    expires_at: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+
+
+# --- Local mailbox index ------------------------------------------------------
+
+class MessageIndex(Base):
+    """Metadata for one Gmail message, kept in sync via users.history.list."""
+
+    __tablename__ = "message_index"
+
+    user_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    id: Mapped[str] = mapped_column(String(64), primary_key=True)  # Gmail message id
+    thread_id: Mapped[str] = mapped_column(String(64), nullable=False, default="")
+    sender: Mapped[str] = mapped_column(String(320), nullable=False, default="", index=True)  # canonical identity
+    address: Mapped[str] = mapped_column(String(320), nullable=False, default="")  # exact From address
+    sender_name: Mapped[str] = mapped_column(String(200), nullable=False, default="")
+    labels: Mapped[str] = mapped_column(Text, nullable=False, default="")  # space separated label ids
+    is_unread: Mapped[bool] = mapped_column(Boolean, nullable=False, default=False)
+    category: Mapped[str] = mapped_column(String(32), nullable=True)
+    internal_date: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)  # epoch ms
+    list_unsubscribe: Mapped[str] = mapped_column(Text, nullable=False, default="")
+    list_unsubscribe_post: Mapped[str] = mapped_column(Text, nullable=False, default="")  # RFC 8058
+
+
+class SenderStat(Base):
+    """Whole-mailbox aggregates per sender, folded from the message index."""
+
+    __tablename__ = "sender_stats"
+    __table_args__ = (
+        Index("ix_sender_stats_user_total", "user_id", "total_emails"),
+        Index("ix_sender_stats_user_domain", "user_id", "domain"),
+    )
+
+    user_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    email: Mapped[str] = mapped_column(String(320), primary_key=True)
+    sender_id: Mapped[str] = mapped_column(String(16), nullable=False, index=True)
+    domain: Mapped[str] = mapped_column(String(253), nullable=False, default="")  # registrable domain
+    name: Mapped[str] = mapped_column(String(200), nullable=False, default="")
+    total_emails: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    unread_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    first_seen: Mapped[int] = mapped_column(BigInteger, nullable=True)  # epoch ms
+    last_seen: Mapped[int] = mapped_column(BigInteger, nullable=True)
+    last_read: Mapped[int] = mapped_column(BigInteger, nullable=True)
+    category: Mapped[str] = mapped_column(String(32), nullable=True)  # dominant category
+    category_mix: Mapped[str] = mapped_column(Text, nullable=False, default="{}")  # JSON counts
+    list_unsubscribe: Mapped[str] = mapped_column(Text, nullable=False, default="")
+    list_unsubscribe_post: Mapped[str] = mapped_column(Text, nullable=False, default="")
+
+
+class ScanJob(Base):
+    """A background full-mailbox scan; `page_token` is the resume checkpoint."""
+
+    __tablename__ = "scan_jobs"
+
+    id: Mapped[str] = mapped_column(String(32), primary_key=True)
+    user_id: Mapped[int] = mapped_column(Integer, nullable=False, index=True)
+    status: Mapped[str] = mapped_column(String(16), nullable=False, default="queued")  # queued|running|completed|failed|cancelled
+    history_id: Mapped[str] = mapped_column(String(32), nullable=True)
+    page_token: Mapped[Optional[str]] = mapped_column(String(256), nullable=True)
+    pages_done: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    messages_processed: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    messages_total: Mapped[int] = mapped_column(Integer, nullable=True)  # estimate from the profile
+    retried: Mapped[int] = mapped_column(Integer, nullable=False, default=0)  # Gmail sub-requests retried
+    dropped: Mapped[int] = mapped_column(Integer, nullable=False, default=0)  # gave up after max retries
+    error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, default=datetime.utcnow)
+    started_at: Mapped[datetime] = mapped_column(DateTime, nullable=True)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, nullable=True)
+    finished_at: Mapped[datetime] = mapped_column(DateTime, nullable=True)
+
+
+class SyncState(Base):
+    __tablename__ = "sync_state"
+
+    user_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    history_id: Mapped[Optional[str]] = mapped_column(String(32), nullable=True)
+    last_full_sync_at: Mapped[datetime] = mapped_column(DateTime, nullable=True)
+    last_synced_at: Mapped[datetime] = mapped_column(DateTime, nullable=True)
+    # Set while a users.watch is active: push notifications keep the index current
+    watch_expires_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
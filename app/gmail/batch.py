@@ -0,0 +1,117 @@
+# app/gmail/batch.py
+"""Encode/decode Google's multipart/mixed batch format (POST /batch/gmail/v1).
+
+Each part wraps one plain HTTP request (or response) in an `application/http` envelope,
+matched up by Content-ID.
+"""
+import json
+import uuid
+from typing import Any, Iterator, Optional
+from urllib.parse import parse_qsl, urlencode
+
+MAX_BATCH_SIZE = 100  # Gmail rejects batches with more sub-requests than this
+
+
+class BatchRequest:
+    __slots__ = ("method", "path", "params", "body", "op")
+
+    def __init__(self, method: str, path: str, params: Optional[dict[str, Any]] = None, body: Any = None,
+                 op: Optional[str] = None) -> None:
+        self.method = method
+        self.path = path
+        self.params = params or {}
+        self.body = body
+        self.op = op  # operation name, for quota accounting
+
+    def target(self) -> str:
+        if not self.params:
+            return self.path
+        return f"{self.path}?{urlencode(self.params, doseq=True)}"
+
+
+def new_boundary() -> str:
+    return f"batch_{uuid.uuid4().hex}"
+
+
+def _split_parts(body: bytes, boundary: str) -> Iterator[bytes]:
+    delimiter = f"--{boundary}".encode()
+    for chunk in body.split(delimiter)[1:]:
+        if chunk.startswith(b"--"):
+            break
+        yield chunk.strip(b"\r\n")
+
+
+def _headers(lines: list[str]) -> dict[str, str]:
+    headers = {}
+    for line in lines:
+        name, _, value = line.partition(":")
+        headers[name.strip().lower()] = value.strip()
+    return headers
+
+
+def _read_part(part: bytes) -> tuple[dict[str, str], str, bytes]:
+    """Split one part into (envelope headers, start line, payload)."""
+    envelope, _, http = part.partition(b"\r\n\r\n")
+    head, _, payload = http.partition(b"\r\n\r\n")
+    start_line = head.decode("utf-8").split("\r\n")[0]
+    return _headers(envelope.decode("utf-8").split("\r\n")), start_line, payload
+
+
+def boundary_from(content_type: str) -> str:
+    for param in content_type.split(";")[1:]:
+        name, _, value = param.strip().partition("=")
+        if name.lower() == "boundary":
+            return value.strip('"')
+    raise ValueError(f"no boundary in {content_type!r}")
+
+
+def encode_requests(requests: list[BatchRequest], boundary: str) -> bytes:
+    out = []
+    for i, req in enumerate(requests):
+        out.append(f"--{boundary}\r\nContent-Type: application/http\r\nContent-ID: <item-{i}>\r\n\r\n")
+        out.append(f"{req.method} {req.target()} HTTP/1.1\r\n")
+        if req.body is not None:
+            out.append(f"Content-Type: application/json\r\n\r\n{json.dumps(req.body)}\r\n")
+        else:
+            out.append("\r\n")
+    out.append(f"--{boundary}--\r\n")
+    return "".join(out).encode("utf-8")
+
+
+def decode_requests(content_type: str, body: bytes) -> list[tuple[str, BatchRequest]]:
+    """Server side: multipart body -> [(content_id, BatchRequest)]."""
+    parsed = []
+    for part in _split_parts(body, boundary_from(content_type)):
+        envelope, request_line, payload = _read_part(part)
+        method, target, _ = request_line.split(" ", 2)
+        path, _, query = target.partition("?")
+        values: dict[str, list[str]] = {}
+        for key, value in parse_qsl(query):
+            values.setdefault(key, []).append(value)
+        params = {k: v if len(v) > 1 else v[0] for k, v in values.items()}
+        data = json.loads(payload) if payload.strip() else None
+        parsed.append((envelope.get("content-id", ""), BatchRequest(method, path, params, data)))
+    return parsed
+
+
+def encode_responses(responses: list[tuple[str, int, Any]], boundary: str) -> bytes:
+    """Server side: [(content_id, status, payload)] -> multipart body."""
+    out = []
+    for content_id, status, payload in responses:
+        cid = content_id.strip("<>")
+        out.append(f"--{boundary}\r\nContent-Type: application/http\r\nContent-ID: <response-{cid}>\r\n\r\n")
+        out.append(f"HTTP/1.1 {status} {'OK' if status < 400 else 'Error'}\r\n")
+        out.append(f"Content-Type: application/json; charset=UTF-8\r\n\r\n{json.dumps(payload or {})}\r\n")
+    out.append(f"--{boundary}--\r\n")
+    return "".join(out).encode("utf-8")
+
+
+def decode_responses(content_type: str, body: bytes, count: int) -> list[tuple[int, Any]]:
+    """Client side: multipart body -> [(status, payload)] in request order."""
+    results: list[tuple[int, Any]] = [(500, {"error": {"code": 500, "message": "missing batch response part"}})] * count
+    for part in _split_parts(body, boundary_from(content_type)):
+        envelope, status_line, payload = _read_part(part)
+        status = int(status_line.split(" ")[1])
+        index = int(envelope.get("content-id", "").strip("<>").rsplit("-", 1)[-1])
+        results[index] = (status, json.loads(payload) if payload.strip() else {})
+    return results
@@ -0,0 +1,365 @@
+# app/gmail/client.py
+"""Asyncio Gmail REST transport on a shared, pooled httpx client.
+
+Only the handful of endpoints the app needs are wrapped. Every call is paced against
+the per-user quota with a token bucket; rate-limit and 5xx failures (including
+individual batch sub-requests) and network errors are retried with jittered
+exponential backoff, and multipart batch size shrinks or grows with the observed
+error rate.
+"""
+import asyncio
+import time
+from typing import Any, Iterable, Optional, Sequence, Union
+
+import httpx
+
+from app import metrics
+from app.config import get_settings
+from app.gmail.batch import (
+    MAX_BATCH_SIZE,
+    BatchRequest,
+    decode_responses,
+    encode_requests,
+    new_boundary,
+)
+from app.gmail.ratelimit import AdaptiveBatchSize, CallStats, RetryPolicy, TokenBucket, current_stats
+
+API_PREFIX = "/gmail/v1/users/me"
+
+# Per-call cost against the Gmail per-user quota, keyed by operation name
+QUOTA_UNITS = {
+    "get_profile": 1,
+    "get_label": 1,
+    "list_messages": 5,
+    "get_message": 5,
+    "modify_message": 5,
+    "trash_message": 5,
+    "batch_modify": 50,
+    "batch_delete": 50,
+    "list_history": 2,
+    "send_message": 100,
+    "watch": 100,
+    "stop_watch": 50,
+}
+
+RETRYABLE_STATUSES = (429, 500, 502, 503, 504)
+RATE_LIMIT_REASONS = ("rateLimitExceeded", "userRateLimitExceeded")
+# Reason on batch results whose envelope got no response at all (timeout, connection reset)
+TRANSPORT_ERROR = "transportError"
+# Not safe to repeat once the request may have reached Gmail: these only retry errors
+# raised before anything was sent
+NON_IDEMPOTENT_OPS = ("send_message",)
+_NOT_SENT = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+# CallStats fields that are also exported as per-account Prometheus counters
+ACCOUNT_COUNTERS = {
+    "quota_units": metrics.GMAIL_QUOTA_UNITS,
+    "throttled_seconds": metrics.GMAIL_THROTTLED_SECONDS,
+    "retried": metrics.GMAIL_RETRIES,
+    "dropped": metrics.GMAIL_DROPPED,
+}
+
+_http: Optional[httpx.AsyncClient] = None
+
+
+class GmailAPIError(Exception):
+    def __init__(self, status: int, message: str = "", reason: Optional[str] = None) -> None:
+        super().__init__(f"Gmail API {status}: {message}")
+        self.status = status
+        self.message = message
+        self.reason = reason
+
+    @property
+    def retryable(self) -> bool:
+        return (
+            self.status in RETRYABLE_STATUSES
+            or (self.status == 403 and self.reason in RATE_LIMIT_REASONS)
+            or self.reason == TRANSPORT_ERROR
+        )
+
+    @classmethod
+    def from_payload(cls, status: int, payload: Any) -> "GmailAPIError":
+        error = (payload or {}).get("error", {}) if isinstance(payload, dict) else {}
+        errors = error.get("errors") or [{}]
+        return cls(status, error.get("message", ""), errors[0].get("reason"))
+
+
+def _error_payload(resp: httpx.Response) -> Any:
+    """An error response's JSON body. Proxies and load balancers in front of Gmail answer
+    with HTML or plain text, which becomes the message so the status still decides."""
+    try:
+        return resp.json() if resp.content else {}
+    except ValueError:
+        return {"error": {"message": resp.text.strip()[:200]}}
+
+
+def _retryable_transport(op: str, error: Exception) -> bool:
+    if not isinstance(error, httpx.TransportError):
+        return False
+    return op not in NON_IDEMPOTENT_OPS or isinstance(error, _NOT_SENT)
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Process-wide connection pool shared by every AsyncGmailClient."""
+    global _http
+    if _http is None or _http.is_closed:
+        settings = get_settings()
+        _http = httpx.AsyncClient(
+            base_url=settings.GMAIL_API_BASE_URL,
+            timeout=httpx.Timeout(30.0, connect=5.0),
+            limits=httpx.Limits(
+                max_connections=settings.GMAIL_HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.GMAIL_HTTP_MAX_CONNECTIONS,
+            ),
+        )
+    return _http
+
+
+async def close_http_client() -> None:
+    global _http
+    if _http is not None:
+        await _http.aclose()
+        _http = None
+
+
+class AsyncGmailClient:
+    def __init__(self, access_token: str, http: Optional[httpx.AsyncClient] = None,
+                 max_concurrency: Optional[int] = None, quota: Optional[TokenBucket] = None,
+                 retry: Optional[RetryPolicy] = None,
+                 account: Optional[Union[int, str]] = None) -> None:
+        settings = get_settings()
+        self.access_token = access_token
+        self.account = account if account is not None else "unknown"  # metrics label
+        self.http = http or get_http_client()
+        self._slots = asyncio.Semaphore(max_concurrency or settings.GMAIL_MAX_CONCURRENCY)
+        self.quota = quota or TokenBucket(settings.GMAIL_QUOTA_UNITS_PER_SECOND)
+        self.retry = retry or RetryPolicy(settings.GMAIL_MAX_RETRIES)
+        self.batch_size = AdaptiveBatchSize(MAX_BATCH_SIZE)
+        self.stats = CallStats()
+
+    def _headers(self) -> dict[str, str]:
+        return {"Authorization": f"Bearer {self.access_token}"}
+
+    def _count(self, field: str, amount: float = 1) -> None:
+        self.stats.add(field, amount)
+        counter = ACCOUNT_COUNTERS.get(field)
+        if counter is not None:
+            counter.inc(amount, account=self.account)
+        stats = current_stats()
+        if stats is not None:
+            stats.add(field, amount)
+
+    async def _spend(self, units: float) -> None:
+        self._count("quota_units", units)
+        waited = await self.quota.acquire(units)
+        if waited:
+            self._count("throttled_seconds", waited)
+
+    async def _request(self, op: str, method: str, path: str, params: Optional[dict[str, Any]] = None,
+                       body: Any = None) -> Any:
+        attempt = 0
+        error: Exception
+        resp: Optional[httpx.Response]
+        while True:
+            await self._spend(QUOTA_UNITS[op])
+            self._count("requests")
+            async with self._slots:
+                start = time.perf_counter()
+                try:
+                    resp = await self.http.request(
+                        method, API_PREFIX + path, params=params, json=body, headers=self._headers()
+                    )
+                except httpx.HTTPError as e:
+                    metrics.GMAIL_REQUEST_SECONDS.observe(time.perf_counter() - start, op=op, status="error")
+                    if not _retryable_transport(op, e):
+                        raise
+                    error, resp = e, None
+                else:
+                    metrics.GMAIL_REQUEST_SECONDS.observe(time.perf_counter() - start, op=op, status=resp.status_code)
+            if resp is not None:
+                if resp.status_code < 400:
+                    return resp.json() if resp.content else {}
+                error = GmailAPIError.from_payload(resp.status_code, _error_payload(resp))
+                if not error.retryable:
+                    raise error
+            if attempt >= self.retry.max_retries:
+                self._count("dropped")
+                raise error
+            self._count("retried")
+            await asyncio.sleep(self.retry.delay(attempt))
+            attempt += 1
+
+    # --- plain REST calls ---------------------------------------------------
+
+    async def get_profile(self) -> Any:
+        return await self._request("get_profile", "GET", "/profile")
+
+    async def get_label(self, label_id: str) -> Any:
+        return await self._request("get_label", "GET", f"/labels/{label_id}")
+
+    async def list_messages(self, q: Optional[str] = None, page_token: Optional[str] = None, max_results: int = 100,
+                            label_ids: Optional[list[str]] = None) -> Any:
+        params: dict[str, Any] = {"maxResults": max_results}
+        if q:
+            params["q"] = q
+        if page_token:
+            params["pageToken"] = page_token
+        if label_ids:
+            params["labelIds"] = label_ids
+        return await self._request("list_messages", "GET", "/messages", params=params)
+
+    async def get_message(self, message_id: str, format: str = "metadata",
+                          metadata_headers: Optional[Sequence[str]] = None) -> Any:
+        params: dict[str, Any] = {"format": format}
+        if metadata_headers:
+            params["metadataHeaders"] = metadata_headers
+        return await self._request("get_message", "GET", f"/messages/{message_id}", params=params)
+
+    async def modify_message(self, message_id: str, add_label_ids: Optional[list[str]] = None,
+                             remove_label_ids: Optional[list[str]] = None) -> Any:
+        body = {"addLabelIds": add_label_ids or [], "removeLabelIds": remove_label_ids or []}
+        return await self._request("modify_message", "POST", f"/messages/{message_id}/modify", body=body)
+
+    async def trash_message(self, message_id: str) -> Any:
+        return await self._request("trash_message", "POST", f"/messages/{message_id}/trash")
+
+    async def send_message(self, raw: str) -> Any:
+        """Send an RFC 2822 message given as base64url `raw`."""
+        return await self._request("send_message", "POST", "/messages/send", body={"raw": raw})
+
+    async def batch_modify(self, message_ids: Iterable[str], add_label_ids: Optional[list[str]] = None,
+                           remove_label_ids: Optional[list[str]] = None) -> Any:
+        body = {
+            "ids": list(message_ids),
+            "addLabelIds": add_label_ids or [],
+            "removeLabelIds": remove_label_ids or [],
+        }
+        return await self._request("batch_modify", "POST", "/messages/batchModify", body=body)
+
+    async def batch_delete(self, message_ids: Iterable[str]) -> Any:
+        """Permanently delete up to 1000 messages (bypasses Trash)."""
+        return await self._request("batch_delete", "POST", "/messages/batchDelete", body={"ids": list(message_ids)})
+
+    async def list_history(self, start_history_id: str, page_token: Optional[str] = None) -> Any:
+        params: dict[str, Any] = {"startHistoryId": start_history_id}
+        if page_token:
+            params["pageToken"] = page_token
+        return await self._request("list_history", "GET", "/history", params=params)
+
+    async def watch(self, topic_name: str, label_ids: Optional[Iterable[str]] = None) -> Any:
+        """Start or renew push notifications to a Cloud Pub/Sub topic; returns historyId and expiration (ms)."""
+        body: dict[str, Any] = {"topicName": topic_name}
+        if label_ids:
+            body.update(labelIds=list(label_ids), labelFilterBehavior="include")
+        return await self._request("watch", "POST", "/watch", body=body)
+
+    async def stop_watch(self) -> Any:
+        return await self._request("stop_watch", "POST", "/stop")
+
+    # --- multipart batches --------------------------------------------------
+
+    async def _send_batch(self, requests: list[BatchRequest]) -> list[Any]:
+        await self._spend(sum(QUOTA_UNITS.get(r.op or "", 5) for r in requests))
+        self._count("requests")
+        self._count("sub_requests", len(requests))
+        metrics.GMAIL_BATCH_SIZE.observe(len(requests))
+        boundary = new_boundary()
+        async with self._slots:
+            start = time.perf_counter()
+            try:
+                resp = await self.http.post(
+                    "/batch/gmail/v1",
+                    content=encode_requests(requests, boundary),
+                    headers={**self._headers(), "Content-Type": f"multipart/mixed; boundary={boundary}"},
+                )
+            except httpx.HTTPError as e:
+                metrics.GMAIL_REQUEST_SECONDS.observe(time.perf_counter() - start, op="batch", status="error")
+                if not isinstance(e, httpx.TransportError):
+                    raise
+                # No response: every sub-request is retried with the next round in `batch`
+                for request in requests:
+                    metrics.GMAIL_SUBREQUEST_FAILURES.inc(op=request.op, status="error")
+                return [GmailAPIError(0, str(e) or type(e).__name__, TRANSPORT_ERROR)] * len(requests)
+            metrics.GMAIL_REQUEST_SECONDS.observe(time.perf_counter() - start, op="batch", status=resp.status_code)
+        if resp.status_code >= 400:
+            # The whole envelope failed: every sub-request shares its fate
+            error = GmailAPIError.from_payload(resp.status_code, _error_payload(resp))
+            for request in requests:
+                metrics.GMAIL_SUBREQUEST_FAILURES.inc(op=request.op, status=resp.status_code)
+            return [error] * len(requests)
+        results: list[Any] = []
+        decoded = decode_responses(resp.headers["content-type"], resp.content, len(requests))
+        for request, (status, payload) in zip(requests, decoded):
+            if status < 400:
+                results.append(payload)
+            else:
+                # Counted here because callers just drop failed sub-requests from their results
+                metrics.GMAIL_SUBREQUEST_FAILURES.inc(op=request.op, status=status)
+                results.append(GmailAPIError.from_payload(status, payload))
+        return results
+
+    async def batch(self, requests: list[BatchRequest]) -> list[Any]:
+        """Run sub-requests as multipart batches, several in flight at once.
+
+        Returns one entry per request, in order: the decoded JSON payload, or a
+        GmailAPIError for sub-requests that failed permanently or ran out of retries.
+        Retryable failures are re-sent together in the next round after a backoff.
+        """
+        results: list[Any] = [None] * len(requests)
+        pending = list(range(len(requests)))
+        attempt = 0
+        while pending:
+            size = self.batch_size.current
+            chunks = [pending[i:i + size] for i in range(0, len(pending), size)]
+            outcomes = await asyncio.gather(
+                *(self._send_batch([requests[i] for i in chunk]) for chunk in chunks)
+            )
+            retry = []
+            for chunk, outcome in zip(chunks, outcomes):
+                failed = 0
+                for i, result in zip(chunk, outcome):
+                    results[i] = result
+                    if isinstance(result, GmailAPIError) and result.retryable:
+                        retry.append(i)
+                        failed += 1
+                self.batch_size.record(len(chunk), failed)
+            if not retry:
+                break
+            if attempt >= self.retry.max_retries:
+                self._count("dropped", len(retry))
+                break
+            self._count("retried", len(retry))
+            await asyncio.sleep(self.retry.delay(attempt))
+            attempt += 1
+            pending = retry
+        return results
+
+    async def batch_get_messages(self, message_ids: Iterable[str], format: str = "metadata",
+                                 metadata_headers: Optional[Sequence[str]] = None) -> list[Any]:
+        params: dict[str, Any] = {"format": format}
+        if metadata_headers:
+            params["metadataHeaders"] = metadata_headers
+        return await self.batch([
+            BatchRequest("GET", f"{API_PREFIX}/messages/{mid}", params, op="get_message") for mid in message_ids
+        ])
+
+    async def profile_and_labels(self, label_ids: Sequence[str]) -> tuple[Any, dict[str, Any]]:
+        """The profile plus per-label counters in a single multipart round trip."""
+        results = await self.batch(
+            [BatchRequest("GET", f"{API_PREFIX}/profile", op="get_profile")]
+            + [BatchRequest("GET", f"{API_PREFIX}/labels/{lid}", op="get_label") for lid in label_ids]
+        )
+        return results[0], dict(zip(label_ids, results[1:]))
+
+    async def batch_trash(self, message_ids: Iterable[str]) -> list[Any]:
+        return await self.batch([
+            BatchRequest("POST", f"{API_PREFIX}/messages/{mid}/trash", op="trash_message") for mid in message_ids
+        ])
+
+    async def batch_modify_each(self, message_ids: Iterable[str], add_label_ids: Optional[list[str]] = None,
+                                remove_label_ids: Optional[list[str]] = None) -> list[Any]:
+        body = {"addLabelIds": add_label_ids or [], "removeLabelIds": remove_label_ids or []}
+        return await self.batch([
+            BatchRequest("POST", f"{API_PREFIX}/messages/{mid}/modify", body=body, op="modify_message")
+            for mid in message_ids
+        ])
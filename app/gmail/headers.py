@@ -0,0 +1,49 @@
+# app/gmail/headers.py
+"""Message header parsing for metadata-format responses.
+
+Every metadata fetch asks for the same header set (METADATA_HEADERS) so a single call
+has everything sender aggregation and unsubscribing need. Headers are folded into a
+lowercase-keyed dict in one pass, and the From value is parsed by a precompiled,
+memoized normalizer: mailboxes are dominated by a few hundred senders, so the same
+From strings come round again and again.
+"""
+import functools
+import re
+from typing import Any, Optional
+from email.utils import parsedate_to_datetime
+
+METADATA_HEADERS = ('From', 'List-Unsubscribe', 'List-Unsubscribe-Post', 'List-Id', 'Precedence', 'Date')
+
+_ANGLE_ADDRESS = re.compile(r'<([^>]+)>')
+
+
+def parse_headers(headers: list[dict[str, Any]]) -> dict[str, str]:
+    """{lowercased name: value} for a Gmail `payload.headers` list; the first occurrence wins."""
+    return {h['name'].lower(): h['value'] for h in reversed(headers)}
+
+
+@functools.lru_cache(maxsize=65536)
+def parse_sender(sender_raw: str) -> tuple[str, str]:
+    """(email, display name) from a From value like 'Company <news@company.com>'."""
+    match = _ANGLE_ADDRESS.search(sender_raw)
+    email = match.group(1).lower() if match else sender_raw.lower()
+    if "<" in sender_raw:
+        name = sender_raw.split("<")[0].strip().replace('"', '')
+    else:
+        name = sender_raw.split("@")[0].title()
+    return email, name
+
+
+def date_ms(value: Optional[str]) -> int:
+    """Epoch ms from an RFC 2822 Date header, or 0 if it's missing or malformed."""
+    if not value:
+        return 0
+    try:
+        return int(parsedate_to_datetime(value).timestamp() * 1000)
+    except (TypeError, ValueError):
+        return 0
+
+
+def is_bulk(headers: dict[str, str]) -> bool:
+    """Mailing-list mail: it carries a List-Id or is marked `Precedence: bulk/list`."""
+    return bool(headers.get('list-id')) or headers.get('precedence', '').strip().lower() in ('bulk', 'list')
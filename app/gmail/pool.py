@@ -0,0 +1,87 @@
+# app/gmail/pool.py
+"""Per-user AsyncGmailClient cache with idle-TTL eviction.
+
+Building a client is cheap, but reusing one per user keeps its concurrency limit
+shared across that user's requests and avoids any per-request setup. Each client also
+carries its account's quota bucket and call counters, so quota is paced and accounted
+per account. All clients ride on the shared httpx connection pool, so TCP/TLS
+connections are reused as well.
+
+Eviction only drops the pool's own reference: a client that a scanner still holds is
+handed back to the next caller for that account instead of a fresh one, so an account
+never has two quota buckets or concurrency limits running side by side.
+"""
+import time
+import weakref
+from typing import Any, Callable, Optional
+
+from app.config import get_settings
+from app.gmail.client import AsyncGmailClient
+from app.db.base import User
+from app.gmail.ratelimit import CallStats
+
+
+class ClientPool:
+    def __init__(self, ttl_seconds: Optional[float] = None, max_size: int = 1000,
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else get_settings().GMAIL_CLIENT_TTL_SECONDS
+        self.max_size = max_size
+        self._clock = clock
+        self._entries: dict[int, list[Any]] = {}  # user_id -> [client, last_used]
+        # Evicted clients that are still checked out somewhere; gone once the last holder is
+        self._detached: "weakref.WeakValueDictionary[int, AsyncGmailClient]" = weakref.WeakValueDictionary()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user: User) -> AsyncGmailClient:
+        now = self._clock()
+        self._evict(now)
+        entry = self._entries.get(user.id)
+        if entry is None:
+            self.misses += 1
+            if len(self._entries) >= self.max_size:
+                self._detach(min(self._entries, key=lambda k: self._entries[k][1]))
+            client = self._detached.pop(user.id, None) or AsyncGmailClient(user.access_token, account=user.id)
+            self._entries[user.id] = [client, now]
+        else:
+            self.hits += 1
+            entry[1] = now
+            client = entry[0]
+        # Tokens rotate on refresh; a reused client just picks up the new one
+        client.access_token = user.access_token
+        return client
+
+    def usage(self, user_id: int) -> dict[str, Any]:
+        """Gmail traffic and quota headroom of one account's client (zeros if it has none)."""
+        client = self._lookup(user_id)
+        if client is None:
+            return {"active": False, **CallStats().as_dict(), "quota_available": None}
+        return {"active": True, **client.stats.as_dict(), "quota_available": int(client.quota.tokens)}
+
+    def update_token(self, user_id: int, access_token: str) -> None:
+        """Point a cached client at a refreshed token; calls already in flight keep the old one."""
+        client = self._lookup(user_id)
+        if client is not None:
+            client.access_token = access_token
+
+    def discard(self, user_id: int) -> None:
+        self._entries.pop(user_id, None)
+        self._detached.pop(user_id, None)
+
+    def _lookup(self, user_id: int) -> Optional[AsyncGmailClient]:
+        entry = self._entries.get(user_id)
+        return entry[0] if entry is not None else self._detached.get(user_id)
+
+    def _detach(self, user_id: int) -> None:
+        self._detached[user_id] = self._entries.pop(user_id)[0]
+
+    def _evict(self, now: float) -> None:
+        expired = [uid for uid, (_, last_used) in self._entries.items() if now - last_used > self.ttl_seconds]
+        for uid in expired:
+            self._detach(uid)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+client_pool = ClientPool()
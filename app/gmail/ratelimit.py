@@ -0,0 +1,117 @@
+# app/gmail/ratelimit.py
+"""Quota pacing, retry/backoff and call accounting for the async Gmail client."""
+import asyncio
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Awaitable, Callable, Iterator, Optional
+
+
+class TokenBucket:
+    """Paces spending of Gmail quota units (per-user limit is 250 units/second)."""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None, clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], Awaitable[None]] = asyncio.sleep) -> None:
+        self.rate = rate
+        self.capacity = capacity or rate
+        self.tokens = self.capacity
+        self._clock = clock
+        self._sleep = sleep
+        self._updated = clock()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, units: float) -> float:
+        """Wait until `units` can be spent; returns the seconds spent waiting."""
+        units = min(units, self.capacity)
+        waited = 0.0
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.tokens >= units:
+                    self.tokens -= units
+                    return waited
+                delay = (units - self.tokens) / self.rate
+                waited += delay
+                await self._sleep(delay)
+
+
+class RetryPolicy:
+    def __init__(self, max_retries: int = 5, base_delay: float = 0.5, max_delay: float = 32.0,
+                 rng: Callable[[], float] = random.random) -> None:
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._rng = rng
+
+    def delay(self, attempt: int) -> float:
+        """Full-jitter exponential backoff for the given (0-based) retry attempt."""
+        return self._rng() * min(self.max_delay, self.base_delay * 2.0 ** attempt)
+
+
+class AdaptiveBatchSize:
+    """AIMD sizing for multipart batches: halve on a high error rate, creep back up when clean."""
+
+    def __init__(self, maximum: int = 100, minimum: int = 10, step: int = 10, error_threshold: float = 0.05) -> None:
+        self.maximum = maximum
+        self.minimum = minimum
+        self.step = step
+        self.error_threshold = error_threshold
+        self.current = maximum
+
+    def record(self, sent: int, failed: int) -> None:
+        if not sent:
+            return
+        if failed / sent > self.error_threshold:
+            self.current = max(self.minimum, self.current // 2)
+        elif failed == 0:
+            self.current = min(self.maximum, self.current + self.step)
+
+
+class CallStats:
+    """Counters for Gmail traffic. Nested trackers roll their counts up to their parent."""
+
+    FIELDS = ("requests", "sub_requests", "retried", "dropped", "quota_units", "throttled_seconds")
+    requests: int
+    sub_requests: int
+    retried: int
+    dropped: int
+    quota_units: int
+    throttled_seconds: float
+
+    def __init__(self, parent: Optional["CallStats"] = None) -> None:
+        self.parent = parent
+        for field in self.FIELDS:
+            setattr(self, field, 0)
+
+    def add(self, field: str, amount: float = 1) -> None:
+        stats: Optional[CallStats] = self
+        while stats is not None:
+            setattr(stats, field, getattr(stats, field) + amount)
+            stats = stats.parent
+
+    def as_dict(self) -> dict[str, float]:
+        return {field: getattr(self, field) for field in self.FIELDS}
+
+
+_current_stats: ContextVar[Optional[CallStats]] = ContextVar("gmail_call_stats", default=None)
+
+
+def current_stats() -> Optional[CallStats]:
+    return _current_stats.get()
+
+
+@contextmanager
+def track_calls() -> Iterator[CallStats]:
+    """Collect Gmail call counters for everything awaited inside the block (jobs, actions)."""
+    stats = CallStats(parent=_current_stats.get())
+    token = _current_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _current_stats.reset(token)
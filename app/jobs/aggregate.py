@@ -0,0 +1,172 @@
+# app/jobs/aggregate.py
+"""Streaming per-sender aggregation.
+
+Pages of parsed message metadata are folded into running counters as they arrive, so
+memory grows with the number of distinct senders rather than the number of messages.
+"""
+import hashlib
+import json
+from typing import Any, Iterable, Optional
+
+from sqlalchemy import delete, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.db.base import MessageIndex, SenderStat
+from app.jobs.identity import registrable_domain
+
+CATEGORY_BY_LABEL = {
+    'CATEGORY_PROMOTIONS': 'promotions',
+    'CATEGORY_UPDATES': 'updates',
+    'CATEGORY_SOCIAL': 'social',
+    'CATEGORY_FORUMS': 'forums',
+    'CATEGORY_PERSONAL': 'primary',
+}
+
+
+def sender_id(email: str) -> str:
+    return hashlib.md5(email.encode()).hexdigest()[:8]
+
+
+def category_of(labels: Iterable[str]) -> Optional[str]:
+    return next((CATEGORY_BY_LABEL[label] for label in labels if label in CATEGORY_BY_LABEL), None)
+
+
+class SenderCounters:
+    __slots__ = (
+        "email", "name", "total", "unread", "first_seen", "last_seen", "last_read",
+        "categories", "list_unsubscribe", "list_unsubscribe_post",
+    )
+
+    def __init__(self, email: str, name: str) -> None:
+        self.email = email
+        self.name = name
+        self.total = 0
+        self.unread = 0
+        self.first_seen: Optional[int] = None
+        self.last_seen: Optional[int] = None
+        self.last_read: Optional[int] = None
+        self.categories: dict[str, int] = {}
+        self.list_unsubscribe = ""
+        self.list_unsubscribe_post = ""
+
+    def add(self, labels: Iterable[str], internal_date: int, list_unsubscribe: str = "",
+            list_unsubscribe_post: Optional[str] = "") -> None:
+        self.total += 1
+        if 'UNREAD' in labels:
+            self.unread += 1
+        elif internal_date and (self.last_read is None or internal_date > self.last_read):
+            self.last_read = internal_date
+        if internal_date:
+            if self.first_seen is None or internal_date < self.first_seen:
+                self.first_seen = internal_date
+            if self.last_seen is None or internal_date > self.last_seen:
+                self.last_seen = internal_date
+        category = category_of(labels)
+        if category:
+            self.categories[category] = self.categories.get(category, 0) + 1
+        if list_unsubscribe and not self.list_unsubscribe:
+            self.list_unsubscribe = list_unsubscribe
+            self.list_unsubscribe_post = list_unsubscribe_post or ""
+
+    def dominant_category(self) -> Optional[str]:
+        if not self.categories:
+            return None
+        return max(sorted(self.categories), key=lambda category: self.categories[category])
+
+    def to_row(self, user_id: int) -> dict[str, Any]:
+        return {
+            "user_id": user_id,
+            "email": self.email,
+            "sender_id": sender_id(self.email),
+            "domain": registrable_domain(self.email),
+            "name": self.name,
+            "total_emails": self.total,
+            "unread_count": self.unread,
+            "first_seen": self.first_seen,
+            "last_seen": self.last_seen,
+            "last_read": self.last_read,
+            "category": self.dominant_category(),
+            "category_mix": json.dumps(self.categories, sort_keys=True),
+            "list_unsubscribe": self.list_unsubscribe,
+            "list_unsubscribe_post": self.list_unsubscribe_post,
+        }
+
+
+class SenderAggregator:
+    def __init__(self) -> None:
+        self.senders: dict[str, SenderCounters] = {}
+        self.messages_seen = 0
+
+    @classmethod
+    async def load(cls, db: AsyncSession, user_id: int) -> "SenderAggregator":
+        """Rebuild counters from a sender_stats checkpoint (used when resuming a scan)."""
+        aggregator = cls()
+        result = await db.execute(select(SenderStat).where(SenderStat.user_id == user_id))
+        for stat in result.scalars().all():
+            counters = SenderCounters(stat.email, stat.name)
+            counters.total = stat.total_emails
+            counters.unread = stat.unread_count
+            counters.first_seen = stat.first_seen
+            counters.last_seen = stat.last_seen
+            counters.last_read = stat.last_read
+            counters.categories = json.loads(stat.category_mix)
+            counters.list_unsubscribe = stat.list_unsubscribe
+            counters.list_unsubscribe_post = stat.list_unsubscribe_post
+            aggregator.senders[stat.email] = counters
+            aggregator.messages_seen += stat.total_emails
+        return aggregator
+
+    def fold(self, page: Iterable[dict[str, Any]]) -> None:
+        """Fold one page of `GmailScanner.parse_message` rows into the counters."""
+        for msg in page:
+            self.messages_seen += 1
+            email = msg["sender"]
+            if not email:
+                continue
+            counters = self.senders.get(email)
+            if counters is None:
+                counters = self.senders[email] = SenderCounters(email, msg["sender_name"])
+            counters.add(
+                msg["labels"], msg["internal_date"], msg["list_unsubscribe"], msg.get("list_unsubscribe_post", "")
+            )
+
+    def rows(self, user_id: int) -> list[dict[str, Any]]:
+        return [c.to_row(user_id) for c in self.senders.values()]
+
+    async def save(self, db: AsyncSession, user_id: int) -> None:
+        """Replace the user's sender_stats with the aggregated counters."""
+        await db.execute(delete(SenderStat).where(SenderStat.user_id == user_id))
+        rows = self.rows(user_id)
+        if rows:
+            await db.execute(insert(SenderStat), rows)
+
+
+async def refresh_senders(db: AsyncSession, user_id: int, changed: Iterable[str]) -> None:
+    """Recompute sender_stats for `changed` senders from the message index (after a history delta)."""
+    emails = [e for e in set(changed) if e]
+    if not emails:
+        return
+    aggregator = SenderAggregator()
+    for start in range(0, len(emails), 500):
+        chunk = emails[start:start + 500]
+        result = await db.execute(
+            select(
+                MessageIndex.sender, MessageIndex.sender_name, MessageIndex.labels,
+                MessageIndex.internal_date, MessageIndex.list_unsubscribe, MessageIndex.list_unsubscribe_post,
+            ).where(MessageIndex.user_id == user_id, MessageIndex.sender.in_(chunk))
+        )
+        aggregator.fold(
+            {
+                "sender": sender, "sender_name": name, "labels": labels.split(),
+                "internal_date": internal_date, "list_unsubscribe": list_unsubscribe,
+                "list_unsubscribe_post": list_unsubscribe_post,
+            }
+            for sender, name, labels, internal_date, list_unsubscribe, list_unsubscribe_post in result.all()
+        )
+        await db.execute(
+            delete(SenderStat).where(SenderStat.user_id == user_id, SenderStat.email.in_(chunk))
+        )
+    rows = aggregator.rows(user_id)
+    if rows:
+        await db.execute(insert(SenderStat), rows)
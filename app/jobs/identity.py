@@ -0,0 +1,90 @@
+# app/jobs/identity.py
+"""Canonical sender identities, and Gmail `from:` queries that cover many of them at once.
+
+A sender's identity is its lowercased address with any `+tag` dropped from the local
+part, so VERP-style bounce addresses (news+8f3a@shop.com) and tagged aliases collapse
+into one sender. Senders are grouped further by registrable domain (shop.co.uk for
+news.shop.co.uk), which is what /senders/domains rolls up. The exact addresses seen
+are kept in the message index, because Gmail's `from:` only matches those.
+"""
+import functools
+from typing import Optional, Sequence
+
+# Second-level public suffixes common in mail; anything else is treated as a one-label TLD.
+# An approximation of the Public Suffix List, good enough for grouping senders.
+MULTI_LABEL_SUFFIXES = frozenset({
+    "co.uk", "org.uk", "ac.uk", "gov.uk", "me.uk", "ltd.uk", "plc.uk",
+    "com.au", "net.au", "org.au", "edu.au", "gov.au",
+    "co.nz", "org.nz", "co.jp", "ne.jp", "or.jp", "co.kr", "co.in", "net.in", "org.in",
+    "com.br", "com.mx", "com.ar", "com.cn", "com.hk", "com.sg", "com.tr", "com.tw",
+    "co.za", "co.il", "com.my", "com.ph", "com.pl",
+})
+
+
+@functools.lru_cache(maxsize=65536)
+def canonical_address(address: str) -> str:
+    """Lowercased address without a `+tag`: 'News+Promo@Shop.com' -> 'news@shop.com'."""
+    address = address.strip().lower()
+    local, at, domain = address.rpartition("@")
+    if not at:
+        return address
+    return f"{local.split('+', 1)[0] or local}@{domain}"
+
+
+@functools.lru_cache(maxsize=65536)
+def registrable_domain(address: str) -> str:
+    """Registrable domain of an address or hostname: 'a@mail.shop.co.uk' -> 'shop.co.uk'."""
+    host = address.rpartition("@")[2].strip().lower().rstrip(".")
+    labels = host.split(".")
+    if len(labels) <= 2:
+        return host
+    keep = 3 if ".".join(labels[-2:]) in MULTI_LABEL_SUFFIXES else 2
+    return ".".join(labels[-keep:])
+
+
+def from_query(addresses: Sequence[str]) -> str:
+    if len(addresses) == 1:
+        return f"from:{addresses[0]}"
+    return f"from:({' OR '.join(addresses)})"
+
+
+def _query_length(chars: int, count: int) -> int:
+    # len(from_query(addresses)) from the addresses' total length and count
+    return 5 + chars if count == 1 else 7 + chars + 4 * (count - 1)
+
+
+def from_query_groups(senders: Sequence[tuple[str, Optional[Sequence[str]]]],
+                      max_length: int) -> list[tuple[str, list[str]]]:
+    """Pack senders into as few `from:(a OR b ...)` queries as fit in `max_length` characters.
+
+    `senders` is a list of (sender, [addresses]); a sender's addresses always stay in one
+    query. Returns a list of (query, [sender, ...]). A sender with so many addresses that
+    they don't fit in one query on their own gets several queries to itself.
+    """
+    groups: list[tuple[str, list[str]]] = []
+    addresses: list[str] = []
+    members: list[str] = []
+    chars = 0
+    for sender, sender_addresses in senders:
+        sender_addresses = list(dict.fromkeys(sender_addresses or [sender]))
+        own = sum(map(len, sender_addresses))
+        if addresses and _query_length(chars + own, len(addresses) + len(sender_addresses)) > max_length:
+            groups.append((from_query(addresses), members))
+            addresses, members, chars = [], [], 0
+        if _query_length(own, len(sender_addresses)) > max_length:
+            part: list[str] = []
+            part_chars = 0
+            for address in sender_addresses:
+                if part and _query_length(part_chars + len(address), len(part) + 1) > max_length:
+                    groups.append((from_query(part), [sender]))
+                    part, part_chars = [], 0
+                part.append(address)
+                part_chars += len(address)
+            groups.append((from_query(part), [sender]))
+            continue
+        addresses.extend(sender_addresses)
+        members.append(sender)
+        chars += own
+    if addresses:
+        groups.append((from_query(addresses), members))
+    return groups
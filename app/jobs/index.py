@@ -0,0 +1,182 @@
+# app/jobs/index.py
+"""Read-side queries over the local message index and sender aggregates (no Gmail calls)."""
+import json
+from datetime import datetime, timezone
+from typing import Any, Iterable, Optional, Sequence
+
+from sqlalchemy import case, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.db.base import MessageIndex, SenderStat, SyncState
+from app.jobs import scoring
+
+PROMOTIONAL_CATEGORIES = ('promotions', 'updates')
+
+
+def _iso(ms: Optional[int]) -> Optional[str]:
+    if not ms:
+        return None
+    return datetime.fromtimestamp(ms / 1000, tz=timezone.utc).isoformat()
+
+
+def serialize_sender(stat: SenderStat, score: dict[str, Any]) -> dict[str, Any]:
+    """`score` is the sender's entry from `scoring.score_senders`."""
+    is_promotional = stat.category in PROMOTIONAL_CATEGORIES
+    return {
+        "id": stat.sender_id,
+        "email": stat.email,
+        "domain": stat.domain,
+        "name": stat.name,
+        "total_emails": stat.total_emails,
+        "unread_count": stat.unread_count,
+        "last_opened_date": _iso(stat.last_read),
+        "first_seen_date": _iso(stat.first_seen),
+        "last_seen_date": _iso(stat.last_seen),
+        "category_mix": json.loads(stat.category_mix),
+        "labels": ["Newsletter"] if is_promotional else [],
+        "suggested_action": score["suggested_action"],
+        "confidence": score["confidence"],
+        "risk_score": score["risk_score"],
+        "list_unsubscribe": stat.list_unsubscribe,
+        "list_unsubscribe_post": stat.list_unsubscribe_post,
+    }
+
+
+async def get_sync_state(db: AsyncSession, user_id: int) -> Optional[SyncState]:
+    return await db.get(SyncState, user_id)
+
+
+async def list_senders(db: AsyncSession, user_id: int, category: Optional[str] = None, offset: int = 0,
+                       limit: Optional[int] = 50) -> dict[str, Any]:
+    """Per-sender aggregates, heaviest senders first. `limit=None` returns all of them."""
+    stmt = (
+        select(SenderStat)
+        .where(SenderStat.user_id == user_id)
+        .order_by(SenderStat.total_emails.desc(), SenderStat.email)
+        .offset(offset)
+    )
+    if category:
+        stmt = stmt.where(SenderStat.category == category.lower())
+    if limit is not None:
+        stmt = stmt.limit(limit + 1)
+
+    stats = (await db.execute(stmt)).scalars().all()
+    next_page_token = str(offset + limit) if limit is not None and len(stats) > limit else None
+    stats = stats[:limit]
+    scores = await scoring.score_senders(db, user_id, [s.email for s in stats])
+    return {
+        "senders": [serialize_sender(s, scores[s.email]) for s in stats],
+        "next_page_token": next_page_token,
+    }
+
+
+async def list_domains(db: AsyncSession, user_id: int, category: Optional[str] = None, offset: int = 0,
+                       limit: int = 50) -> dict[str, Any]:
+    """Sender aggregates rolled up by registrable domain, heaviest domains first."""
+    total = func.sum(SenderStat.total_emails)
+    stmt = (
+        select(
+            SenderStat.domain,
+            func.count(SenderStat.email),
+            total,
+            func.sum(SenderStat.unread_count),
+            func.max(SenderStat.last_seen),
+        )
+        .where(SenderStat.user_id == user_id)
+        .group_by(SenderStat.domain)
+        .order_by(total.desc(), SenderStat.domain)
+        .offset(offset)
+        .limit(limit + 1)
+    )
+    if category:
+        stmt = stmt.where(SenderStat.category == category.lower())
+
+    rows = (await db.execute(stmt)).all()
+    has_more = len(rows) > limit
+    return {
+        "domains": [
+            {
+                "domain": domain,
+                "senders": senders,
+                "total_emails": emails or 0,
+                "unread_count": unread or 0,
+                "last_seen_date": _iso(last_seen),
+            }
+            for domain, senders, emails, unread, last_seen in rows[:limit]
+        ],
+        "next_page_token": str(offset + limit) if has_more else None,
+    }
+
+
+async def domain_senders(db: AsyncSession, user_id: int, domain: str) -> Sequence[str]:
+    """Every sender identity under a registrable domain, heaviest first."""
+    result = await db.execute(
+        select(SenderStat.email)
+        .where(SenderStat.user_id == user_id, SenderStat.domain == domain)
+        .order_by(SenderStat.total_emails.desc(), SenderStat.email)
+    )
+    return result.scalars().all()
+
+
+async def sender_addresses(db: AsyncSession, user_id: int, wanted: Iterable[str]) -> dict[str, list[str]]:
+    """{sender identity: [exact From addresses seen]}, for building `from:` queries.
+
+    Senders the index has never seen map to themselves.
+    """
+    addresses: dict[str, set[str]] = {sender: set() for sender in wanted}
+    senders = list(addresses)
+    for start in range(0, len(senders), 500):
+        result = await db.execute(
+            select(MessageIndex.sender, MessageIndex.address)
+            .where(MessageIndex.user_id == user_id, MessageIndex.sender.in_(senders[start:start + 500]))
+            .distinct()
+        )
+        for sender, address in result.all():
+            addresses[sender].add(address or sender)
+    return {sender: sorted(found) or [sender] for sender, found in addresses.items()}
+
+
+async def find_sender(db: AsyncSession, user_id: int, sid: str) -> Optional[dict[str, Any]]:
+    result = await db.execute(
+        select(SenderStat).where(SenderStat.user_id == user_id, SenderStat.sender_id == sid)
+    )
+    stat = result.scalars().first()
+    if stat is None:
+        return None
+    scores = await scoring.score_senders(db, user_id, [stat.email])
+    return serialize_sender(stat, scores[stat.email])
+
+
+async def summary(db: AsyncSession, user_id: int) -> dict[str, Any]:
+    state = await get_sync_state(db, user_id)
+    total, unread = (await db.execute(
+        select(
+            func.count(MessageIndex.id),
+            func.sum(case((MessageIndex.is_unread, 1), else_=0)),
+        ).where(MessageIndex.user_id == user_id)
+    )).one()
+
+    by_category = await db.execute(
+        select(MessageIndex.category, func.count(MessageIndex.id))
+        .where(MessageIndex.user_id == user_id, MessageIndex.is_unread, MessageIndex.category.is_not(None))
+        .group_by(MessageIndex.category)
+    )
+    unread_by_category = {cat.title(): n for cat, n in by_category.all()}
+
+    never_read, promotional = (await db.execute(
+        select(
+            func.sum(case((SenderStat.total_emails == SenderStat.unread_count, 1), else_=0)),
+            func.sum(case((SenderStat.category.in_(PROMOTIONAL_CATEGORIES), SenderStat.total_emails), else_=0)),
+        ).where(SenderStat.user_id == user_id)
+    )).one()
+
+    return {
+        "total_emails_scanned": total,
+        "total_unread": unread or 0,
+        "unread_by_category": unread_by_category,
+        "never_read_senders_count": never_read or 0,
+        "estimated_cleanup_potential_percent": round(100 * (promotional or 0) / total) if total else 0,
+        "last_scan_at": state.last_synced_at.replace(tzinfo=timezone.utc).isoformat()
+        if state and state.last_synced_at else None,
+    }
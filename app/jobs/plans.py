@@ -0,0 +1,157 @@
+# app/jobs/plans.py
+"""Persisted cleanup plans.
+
+A plan is the set of ActionPlan rows sharing one `plan_id`, one row per sender the plan
+would act on. Rows are derived from sender_stats, and the user's latest plan is patched
+in place whenever a sync changes those aggregates, so reading a plan never calls Gmail.
+"""
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Collection, Optional
+
+from sqlalchemy import func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.db.base import ActionPlan, MessageIndex, SenderStat
+from app.jobs import scoring
+
+
+def plan_entry(stat: SenderStat, score: dict[str, Any]) -> Optional[dict[str, Any]]:
+    """ActionPlan column values for one scored sender, or None if the plan should leave it alone."""
+    if score["suggested_action"] != "unsubscribe" or not stat.total_emails:
+        return None
+    return {
+        "action": "unsubscribe",
+        "reason": f"{stat.category} sender" if stat.category else "low-engagement sender",
+        "emails_affected": stat.total_emails,
+        "list_unsubscribe": stat.list_unsubscribe,
+        "list_unsubscribe_post": stat.list_unsubscribe_post,
+        "confidence": score["confidence"],
+        "risk_score": score["risk_score"],
+    }
+
+
+def serialize_entry(row: ActionPlan) -> dict[str, Any]:
+    return {
+        "sender": row.sender_email,
+        "emails_affected": row.emails_affected,
+        "recommended_action": row.action,
+        "list_unsubscribe": row.list_unsubscribe,
+        "list_unsubscribe_post": row.list_unsubscribe_post,
+        "confidence": row.confidence,
+        "risk_score": row.risk_score,
+    }
+
+
+async def latest_plan_id(db: AsyncSession, user_id: int) -> Optional[str]:
+    result = await db.execute(
+        select(ActionPlan.plan_id)
+        .where(ActionPlan.user_id == user_id)
+        .order_by(ActionPlan.created_at.desc(), ActionPlan.id.desc())
+        .limit(1)
+    )
+    return result.scalar()
+
+
+async def create_plan(db: AsyncSession, user_id: int) -> Optional[str]:
+    """Build a new plan from the current sender aggregates. Returns its id, or None if empty."""
+    plan_id = uuid.uuid4().hex
+    now = datetime.utcnow()
+    scores = await scoring.score_senders(db, user_id)
+    stats = (await db.execute(select(SenderStat).where(SenderStat.user_id == user_id))).scalars()
+    rows = [
+        ActionPlan(plan_id=plan_id, user_id=user_id, sender_email=stat.email, created_at=now, updated_at=now, **entry)
+        for stat in stats
+        if (entry := plan_entry(stat, scores[stat.email])) is not None
+    ]
+    if not rows:
+        return None
+    db.add_all(rows)
+    await db.commit()
+    return plan_id
+
+
+async def refresh_plan(db: AsyncSession, user_id: int,
+                       emails: Optional[Collection[str]] = None) -> Optional[str]:
+    """Re-derive the latest plan's rows for `emails` (every sender when None).
+
+    Senders that newly qualify are added, ones that no longer do are dropped and the rest
+    get their counts updated. The caller commits.
+    """
+    plan_id = await latest_plan_id(db, user_id)
+    if plan_id is None:
+        return None
+    stats_stmt = select(SenderStat).where(SenderStat.user_id == user_id)
+    rows_stmt = select(ActionPlan).where(ActionPlan.plan_id == plan_id)
+    if emails is not None:
+        emails = [e for e in set(emails) if e]
+        if not emails:
+            return plan_id
+        stats_stmt = stats_stmt.where(SenderStat.email.in_(emails))
+        rows_stmt = rows_stmt.where(ActionPlan.sender_email.in_(emails))
+
+    scores = await scoring.score_senders(db, user_id, emails)
+    entries = {stat.email: plan_entry(stat, scores[stat.email]) for stat in (await db.execute(stats_stmt)).scalars()}
+    rows = {r.sender_email: r for r in (await db.execute(rows_stmt)).scalars()}
+    created_at = (await db.execute(
+        select(func.min(ActionPlan.created_at)).where(ActionPlan.plan_id == plan_id)
+    )).scalar()
+    now = datetime.utcnow()
+    for email in entries.keys() | rows.keys():
+        entry = entries.get(email)
+        row = rows.get(email)
+        if entry is None:
+            if row is not None:
+                await db.delete(row)
+        elif row is None:
+            db.add(ActionPlan(
+                plan_id=plan_id, user_id=user_id, sender_email=email, created_at=created_at, updated_at=now, **entry
+            ))
+        else:
+            for key, value in entry.items():
+                setattr(row, key, value)
+            row.updated_at = now
+    return plan_id
+
+
+async def get_plan(db: AsyncSession, user_id: int, plan_id: str, offset: int = 0,
+                   limit: Optional[int] = None) -> Optional[dict[str, Any]]:
+    """One page of a stored plan, largest senders first. None if the plan does not exist."""
+    count, total_emails, created_at, updated_at = (await db.execute(
+        select(
+            func.count(ActionPlan.id),
+            func.sum(ActionPlan.emails_affected),
+            func.min(ActionPlan.created_at),
+            func.max(ActionPlan.updated_at),
+        ).where(ActionPlan.user_id == user_id, ActionPlan.plan_id == plan_id)
+    )).one()
+    if not count:
+        return None
+
+    stmt = (
+        select(ActionPlan)
+        .where(ActionPlan.plan_id == plan_id)
+        .order_by(ActionPlan.emails_affected.desc(), ActionPlan.sender_email)
+        .offset(offset)
+    )
+    if limit is not None:
+        stmt = stmt.limit(limit + 1)
+    rows = (await db.execute(stmt)).scalars().all()
+    next_page_token = str(offset + limit) if limit is not None and len(rows) > limit else None
+
+    indexed = (await db.execute(
+        select(func.count(MessageIndex.id)).where(MessageIndex.user_id == user_id)
+    )).scalar()
+    return {
+        "plan_id": plan_id,
+        "created_at": created_at.replace(tzinfo=timezone.utc).isoformat(),
+        "updated_at": updated_at.replace(tzinfo=timezone.utc).isoformat() if updated_at else None,
+        "senders": [serialize_entry(r) for r in rows[:limit]],
+        "next_page_token": next_page_token,
+        "summary": {
+            "senders": count,
+            "total_emails": total_emails or 0,
+            "estimated_cleanup_percent": round(100 * (total_emails or 0) / indexed) if indexed else 0,
+        },
+    }
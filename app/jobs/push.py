@@ -0,0 +1,188 @@
+# app/jobs/push.py
+"""Push-driven index updates through Gmail's users.watch.
+
+`watch()` registers the account's mailbox with GMAIL_PUSH_TOPIC. From then on Gmail
+publishes `{"emailAddress", "historyId"}` to Pub/Sub on every change, the push
+subscription POSTs it to /push/gmail (app.routes.push), and `notify()` starts a
+history-delta sync for that account right away. Sender aggregates, plans and the
+summary counters in the local index are current a moment after the change, and while
+the watch is active request handlers stop syncing on their own (MailboxSync.ensure_fresh).
+
+Notifications for one account never overlap: one arriving mid-sync marks the account
+dirty and exactly one more sync follows, however many arrived. A background loop renews
+watches before Gmail lets them lapse (after seven days) and registers new accounts.
+"""
+import asyncio
+from datetime import datetime, timedelta
+from typing import Any, Callable, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app import metrics
+from app.config import get_settings
+from app.db.base import SessionLocal, SyncState, User
+from app.jobs.runner import ScanJobRunner, runner as default_runner
+from app.jobs.scanner import GmailScanner, _forget_reads
+from app.jobs.sync import MailboxSync
+from app.oauth.tokens import token_manager
+
+
+class PushNotConfigured(Exception):
+    """GMAIL_PUSH_TOPIC is not set."""
+
+
+class PushSync:
+    def __init__(self, session_factory: Callable[[], AsyncSession] = SessionLocal,
+                 scanner_factory: Callable[[User], GmailScanner] = GmailScanner,
+                 runner: Optional[ScanJobRunner] = None, renew_lead_seconds: Optional[float] = None,
+                 renew_interval_seconds: Optional[float] = None) -> None:
+        settings = get_settings()
+        self._session_factory = session_factory
+        self._scanner_factory = scanner_factory
+        self._runner = runner or default_runner
+        self.renew_lead_seconds = renew_lead_seconds or settings.WATCH_RENEW_LEAD_SECONDS
+        self.renew_interval_seconds = renew_interval_seconds or settings.WATCH_RENEW_INTERVAL_SECONDS
+        self._syncing: dict[int, asyncio.Task[None]] = {}  # user_id -> sync task
+        self._dirty: set[int] = set()
+        self._loop_task: Optional[asyncio.Task[None]] = None
+        self.syncs = 0
+        self.failures = 0
+
+    # --- watch registration ---------------------------------------------------
+
+    async def watch(self, db: AsyncSession, user: User) -> dict[str, Any]:
+        """Register (or renew) the watch for `user`. Returns the watch expiry and its historyId."""
+        topic = get_settings().GMAIL_PUSH_TOPIC
+        if not topic:
+            raise PushNotConfigured("GMAIL_PUSH_TOPIC is not set")
+        res = await self._scanner_factory(user).watch(topic)
+        expires_at = datetime.utcfromtimestamp(int(res["expiration"]) / 1000)
+        state = await db.get(SyncState, user.id)
+        if state is None:
+            state = SyncState(user_id=user.id)
+            db.add(state)
+        state.watch_expires_at = expires_at
+        await db.commit()
+        # Changes made while no watch was active were never pushed; catch up on them now.
+        # An account without a history id needs a full scan first, which requests enqueue.
+        if state.history_id and int(res["historyId"]) > int(state.history_id):
+            self._schedule(user.id)
+        return {"topic": topic, "expires_at": expires_at.isoformat(), "history_id": str(res["historyId"])}
+
+    async def stop(self, db: AsyncSession, user: User) -> None:
+        await self._scanner_factory(user).stop_watch()
+        state = await db.get(SyncState, user.id)
+        if state is not None:
+            state.watch_expires_at = None
+            await db.commit()
+
+    async def renew_due(self) -> int:
+        """Watch every account whose watch is missing or expires within the lead time."""
+        if not get_settings().GMAIL_PUSH_TOPIC:
+            return 0
+        due_before = datetime.utcnow() + timedelta(seconds=self.renew_lead_seconds)
+        renewed = 0
+        async with self._session_factory() as db:
+            result = await db.execute(
+                select(User)
+                .outerjoin(SyncState, SyncState.user_id == User.id)
+                .where(
+                    User.access_token.is_not(None),
+                    (SyncState.watch_expires_at.is_(None)) | (SyncState.watch_expires_at < due_before),
+                )
+            )
+            for user in result.scalars().all():
+                try:
+                    await self.watch(db, await token_manager.ensure_fresh(user))
+                    renewed += 1
+                except Exception:
+                    self.failures += 1  # retried next round; the account falls back to on-request syncs
+                    await db.rollback()
+        return renewed
+
+    # --- notifications --------------------------------------------------------
+
+    async def notify(self, email_address: str, history_id: int) -> str:
+        """Handle one push notification. Returns what it led to (also counted in metrics)."""
+        async with self._session_factory() as db:
+            user = (await db.execute(select(User).where(User.email == email_address))).scalars().first()
+            state = await db.get(SyncState, user.id) if user is not None else None
+        if user is None:
+            outcome = "unknown_account"
+        elif state is not None and state.history_id and int(history_id) <= int(state.history_id):
+            outcome = "stale"  # already applied, e.g. a redelivery
+        elif user.id in self._syncing:
+            self._dirty.add(user.id)
+            outcome = "coalesced"
+        else:
+            self._schedule(user.id)
+            outcome = "scheduled"
+        metrics.GMAIL_PUSH_NOTIFICATIONS.inc(outcome=outcome)
+        return outcome
+
+    def _schedule(self, user_id: int) -> None:
+        if user_id in self._syncing:
+            self._dirty.add(user_id)
+            return
+        self._syncing[user_id] = asyncio.create_task(self._sync_until_clean(user_id))
+
+    async def _sync_until_clean(self, user_id: int) -> None:
+        try:
+            while True:
+                self._dirty.discard(user_id)
+                try:
+                    await self._sync(user_id)
+                except Exception:
+                    self.failures += 1  # the next notification (or renewal) retries from the stored historyId
+                if user_id not in self._dirty:
+                    return
+        finally:
+            # In the same step as the last dirty check: a done callback would run later, and
+            # a notification landing in between would be coalesced into a finished sync
+            self._syncing.pop(user_id, None)
+
+    async def _sync(self, user_id: int) -> None:
+        async with self._session_factory() as db:
+            user = await db.get(User, user_id)
+            if user is None:
+                return
+            user = await token_manager.ensure_fresh(user)
+            result = await MailboxSync(db, user, self._scanner_factory).run(allow_full=False)
+            if result["mode"] == "needs_full":
+                await self._runner.enqueue(db, user)
+        # Sampled senders and summaries read before the change are stale now
+        _forget_reads(user)
+        self.syncs += 1
+
+    async def wait(self) -> None:
+        """Wait for every sync in flight (tests, shutdown)."""
+        while self._syncing:
+            await asyncio.gather(*list(self._syncing.values()), return_exceptions=True)
+
+    # --- background renewal ---------------------------------------------------
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.renew_due()
+            except Exception:
+                self.failures += 1
+            await asyncio.sleep(self.renew_interval_seconds)
+
+    def start(self) -> None:
+        if self._loop_task is None or self._loop_task.done():
+            self._loop_task = asyncio.create_task(self._run())
+
+    async def shutdown(self) -> None:
+        tasks = [t for t in (self._loop_task, *self._syncing.values()) if t is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._loop_task = None
+
+    def stats(self) -> dict[str, int]:
+        return {"syncs": self.syncs, "syncing": len(self._syncing), "failures": self.failures}
+
+
+push_sync = PushSync()
@@ -0,0 +1,194 @@
+# app/jobs/runner.py
+"""In-process background runner for full-mailbox scans.
+
+Jobs live in the scan_jobs table. The runner only holds asyncio tasks; anything left
+`queued` or `running` (e.g. after a crash or restart) is picked up again by `resume()`
+and continues from its last checkpointed page token. Every account's scan starts right
+away and takes one scheduler turn per page (see app.jobs.scheduler), so a huge mailbox
+can't hold the others back.
+"""
+import asyncio
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Callable, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.cache import SingleFlight
+from app.db.base import ScanJob, SessionLocal, User
+from app.gmail.ratelimit import track_calls
+from app.jobs.scanner import GmailScanner
+from app.jobs.scheduler import FairScheduler, scheduler as default_scheduler
+from app.jobs.sync import MailboxSync, abandon_full_sync
+from app.oauth.tokens import token_manager
+
+ACTIVE_STATUSES = ("queued", "running")
+
+
+def job_progress(job: ScanJob) -> dict[str, Any]:
+    eta_seconds = None
+    if job.status == "running" and job.started_at and job.messages_processed and job.messages_total:
+        elapsed = (datetime.utcnow() - job.started_at).total_seconds()
+        rate = job.messages_processed / elapsed if elapsed > 0 else 0
+        if rate:
+            eta_seconds = round(max(job.messages_total - job.messages_processed, 0) / rate)
+
+    def iso(dt: Optional[datetime]) -> Optional[str]:
+        return dt.replace(tzinfo=timezone.utc).isoformat() if dt else None
+
+    return {
+        "id": job.id,
+        "status": job.status,
+        "pages_done": job.pages_done,
+        "messages_processed": job.messages_processed,
+        "messages_total": job.messages_total,
+        "eta_seconds": eta_seconds,
+        "retried": job.retried,
+        "dropped": job.dropped,
+        "resumable": job.page_token is not None,
+        "error": job.error,
+        "created_at": iso(job.created_at),
+        "started_at": iso(job.started_at),
+        "finished_at": iso(job.finished_at),
+    }
+
+
+class ScanJobRunner:
+    def __init__(self, session_factory: Callable[[], AsyncSession] = SessionLocal,
+                 scanner_factory: Callable[[User], GmailScanner] = GmailScanner,
+                 scheduler: Optional[FairScheduler] = None) -> None:
+        self._session_factory = session_factory
+        self._scanner_factory = scanner_factory
+        self._scheduler = scheduler or default_scheduler
+        self._tasks: dict[str, asyncio.Task[None]] = {}
+
+    @property
+    def in_flight(self) -> int:
+        """Scan tasks currently held by this process (running or waiting for a turn)."""
+        return len(self._tasks)
+
+    async def active_job(self, db: AsyncSession, user_id: int) -> Optional[ScanJob]:
+        result = await db.execute(
+            select(ScanJob)
+            .where(ScanJob.user_id == user_id, ScanJob.status.in_(ACTIVE_STATUSES))
+            .order_by(ScanJob.created_at.desc())
+        )
+        return result.scalars().first()
+
+    async def enqueue(self, db: AsyncSession, user: User) -> ScanJob:
+        """Queue a full scan for `user`, or return the one already in flight."""
+        job = await self.active_job(db, user.id)
+        if job is not None:
+            return job
+        job = ScanJob(
+            id=uuid.uuid4().hex, user_id=user.id, status="queued",
+            pages_done=0, messages_processed=0, retried=0, dropped=0, created_at=datetime.utcnow(),
+        )
+        db.add(job)
+        await db.commit()
+        self._start(job.id)
+        return job
+
+    async def cancel(self, db: AsyncSession, job_id: str) -> Optional[ScanJob]:
+        job = await db.get(ScanJob, job_id)
+        if job is None or job.status not in ACTIVE_STATUSES:
+            return job
+        job.status = "cancelled"
+        job.finished_at = datetime.utcnow()
+        job.page_token = None
+        await db.commit()
+        task = self._tasks.get(job_id)
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+        # Its staged rows go, and so does the history id: the next sync starts a full one over
+        await abandon_full_sync(db, job.user_id)
+        return job
+
+    async def resume(self) -> None:
+        """Restart every job a previous process left unfinished."""
+        async with self._session_factory() as db:
+            result = await db.execute(select(ScanJob.id).where(ScanJob.status.in_(ACTIVE_STATUSES)))
+            for job_id in result.scalars().all():
+                self._start(job_id)
+
+    async def shutdown(self) -> None:
+        """Stop running tasks without touching their status so `resume()` can pick them up."""
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def wait(self, job_id: str) -> None:
+        task = self._tasks.get(job_id)
+        if task is not None:
+            await asyncio.gather(task, return_exceptions=True)
+
+    def _start(self, job_id: str) -> None:
+        if job_id in self._tasks:
+            return
+        task = asyncio.create_task(self._run(job_id))
+        self._tasks[job_id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(job_id, None))
+
+    async def _run(self, job_id: str) -> None:
+        async with self._session_factory() as db:
+            job = await db.get(ScanJob, job_id)
+            if job is None or job.status not in ACTIVE_STATUSES:
+                return
+            job.status = "running"
+            job.started_at = job.started_at or datetime.utcnow()
+            await db.commit()
+            try:
+                # Inside the try: a deleted account or a failed token refresh fails the job
+                # instead of leaving it running forever
+                user = await db.get(User, job.user_id)
+                if user is None:
+                    raise LookupError(f"user {job.user_id} no longer exists")
+                user = await token_manager.ensure_fresh(user)
+                with track_calls():
+                    await MailboxSync(db, user, self._scanner_factory, self._scheduler).full_sync(job)
+            except asyncio.CancelledError:
+                await db.rollback()
+                raise
+            except Exception as e:
+                await db.rollback()
+                await self._finish(db, job, "failed", str(e))
+            else:
+                await self._finish(db, job, "completed")
+
+    async def _finish(self, db: AsyncSession, job: ScanJob, status: str, error: Optional[str] = None) -> None:
+        await db.refresh(job)
+        if job.status == "cancelled":
+            return
+        job.status = status
+        job.error = error
+        job.finished_at = datetime.utcnow()
+        await db.commit()
+
+
+runner = ScanJobRunner()
+
+
+# Dashboard panels load together; their freshness checks share one history sync per user
+index_refreshes = SingleFlight()
+
+
+async def refresh_index(user: User) -> dict[str, Any]:
+    """Cheap freshness check for request handlers; full scans go to the background runner.
+
+    The shared sync runs on a session of its own rather than the first caller's, which
+    the other callers don't own and which its request may close while they still wait.
+    """
+    result: dict[str, Any] = await index_refreshes.do(user.id, lambda: _refresh_index(user))
+    return result
+
+
+async def _refresh_index(user: User) -> dict[str, Any]:
+    async with SessionLocal() as db:
+        result = await MailboxSync(db, user, GmailScanner).ensure_fresh()
+        if result["mode"] == "needs_full":
+            job = await runner.enqueue(db, user)
+            result["job_id"] = job.id
+    return result
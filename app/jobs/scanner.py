@@ -1,266 +1,639 @@
 # app/jobs/scanner.py
-import re
+import asyncio
+import functools
 import hashlib
 from datetime import datetime, timezone
-from googleapiclient.discovery import build
-from google.oauth2.credentials import Credentials
+from typing import Any, AsyncIterator, Awaitable, Callable, Coroutine, Iterable, Optional, Sequence, TypeVar
 
+from app import metrics
+from app.cache import SingleFlight, TTLCache
+from app.config import get_settings
+from app.db.base import User
+from app.gmail.client import AsyncGmailClient, GmailAPIError
+from app.gmail.headers import METADATA_HEADERS, date_ms, is_bulk, parse_headers, parse_sender
+from app.gmail.pool import client_pool
+from app.gmail.ratelimit import track_calls
+from app.jobs.identity import canonical_address, from_query_groups, registrable_domain
+from app.jobs.scheduler import scheduler
+from app.jobs.undo import UndoJournal
+from app.jobs.unsubscribe import dispatcher as unsubscribe_dispatcher
+
+# Shared by every scanner: concurrent identical reads for one account go upstream once,
+# and their result is reused for READ_CACHE_TTL_SECONDS
+read_flight = SingleFlight(TTLCache(ttl_seconds=get_settings().READ_CACHE_TTL_SECONDS, maxsize=256))
+
+T = TypeVar("T")
+# (sender_email, action_type, list_unsubscribe, list_unsubscribe_post)
+PlanItem = tuple[str, str, Optional[str], Optional[str]]
+Progress = Callable[[dict[str, Any]], None]
+Mutate = Callable[[list[str]], Coroutine[Any, Any, list[str]]]
+
+
+def coalesced(cache: bool = True) -> Callable[[Callable[..., Awaitable[T]]], Callable[..., Awaitable[T]]]:
+    """Route a read method through `read_flight`, keyed by account, method and arguments."""
+    def decorate(method: Callable[..., Awaitable[T]]) -> Callable[..., Awaitable[T]]:
+        @functools.wraps(method)
+        async def wrapper(self: "GmailScanner", *args: Any, **kwargs: Any) -> T:
+            user_id = getattr(self.user, "id", None)
+            if user_id is None:
+                return await method(self, *args, **kwargs)
+            # The pooled client is per account; keying on it keeps injected clients apart
+            key = (user_id, self.client, method.__name__, args, tuple(sorted(kwargs.items())))
+            result: T = await read_flight.do(key, lambda: method(self, *args, **kwargs), cache)
+            return result
+        return wrapper
+    return decorate
+
+
+def _forget_reads(user: User) -> None:
+    user_id = getattr(user, "id", None)
+    if user_id is not None:
+        read_flight.forget(lambda key: key[0] == user_id)
+
+
+@metrics.instrument_methods
 class GmailScanner:
-    def __init__(self, user):
+    def __init__(self, user: User, client: Optional[AsyncGmailClient] = None) -> None:
         """Initialize with a User DB model containing the credentials."""
         self.user = user
-        self.creds = Credentials(
-            token=user.access_token,
-            refresh_token=user.refresh_token,
-            # We are defaulting development credentials for the demo platform
-            client_id="dummy", 
-            client_secret="dummy",
-            token_uri="https://oauth2.googleapis.com/token"
-        )
-        self.service = build('gmail', 'v1', credentials=self.creds)
+        self.client = client or client_pool.get(user)
 
-    def scrape_header(self, headers, name):
-        for h in headers:
-            if h['name'].lower() == name.lower():
-                return h['value']
-        return ""
+    def scrape_header(self, headers: list[dict[str, Any]], name: str) -> str:
+        return parse_headers(headers).get(name.lower(), "")
 
-    def extract_sender_email(self, sender_string):
+    def extract_sender_email(self, sender_string: str) -> str:
         """Extract clean email from strings like 'Company <news@company.com>'"""
-        match = re.search(r'<([^>]+)>', sender_string)
-        return match.group(1).lower() if match else sender_string.lower()
-        
-    def _parse_sender_name(self, sender_string):
-        if "<" in sender_string:
-            return sender_string.split("<")[0].strip().replace('"', '')
-        return sender_string.split("@")[0].title()
-
-    def get_scan_summary(self):
-        """Fetch real aggregate data from the user's Gmail profile."""
-        try:
-            profile = self.service.users().getProfile(userId='me').execute()
-            messages_total = profile.get('messagesTotal', 0)
-            
-            # For total unread, query the unread label
-            res = self.service.users().labels().get(userId='me', id='UNREAD').execute()
-            messages_unread = res.get('messagesUnread', 0)
-            
-            labels_to_check = {
-                'Promotions': 'CATEGORY_PROMOTIONS',
-                'Updates': 'CATEGORY_UPDATES',
-                'Social': 'CATEGORY_SOCIAL',
-                'Forums': 'CATEGORY_FORUMS',
-                'Primary': 'CATEGORY_PERSONAL'
-            }
-            unread_by_category = {}
-            for name, lid in labels_to_check.items():
-                try:
-                    cat_res = self.service.users().labels().get(userId='me', id=lid).execute()
-                    if cat_res.get('messagesUnread', 0) > 0:
-                        unread_by_category[name] = cat_res.get('messagesUnread', 0)
-                except:
-                    pass
-            
-            return {
-                "total_emails_scanned": messages_total,  # Represents total size visible
-                "total_unread": messages_unread,
-                "unread_by_category": unread_by_category,
-                "never_read_senders_count": 0, # Requires deep ML analysis
-                "estimated_cleanup_potential_percent": 15, # Static for demo
-                "last_scan_at": datetime.now(timezone.utc).isoformat()
-            }
-        except Exception as e:
-            # Fallback to demo mock data if API limits or errors trigger
-            return {
-                "total_emails_scanned": 15420,
-                "total_unread": 2105,
-                "never_read_senders_count": 42,
-                "estimated_cleanup_potential_percent": 35,
-                "last_scan_at": datetime.now(timezone.utc).isoformat()
+        return parse_sender(sender_string)[0]
+
+    def parse_message(self, response: dict[str, Any]) -> dict[str, Any]:
+        """Flatten a metadata-format message into a message index row."""
+        headers = parse_headers(response.get('payload', {}).get('headers', []))
+        address, sender_name = parse_sender(headers['from']) if headers.get('from') else ("", "")
+        return {
+            "id": response['id'],
+            "thread_id": response.get('threadId', ''),
+            "sender": canonical_address(address) if address else "",
+            "address": address,
+            "sender_name": sender_name,
+            "labels": response.get('labelIds', []),
+            "internal_date": int(response.get('internalDate') or 0) or date_ms(headers.get('date')),
+            "list_unsubscribe": headers.get('list-unsubscribe', ''),
+            "list_unsubscribe_post": headers.get('list-unsubscribe-post', ''),
+        }
+
+    async def list_message_ids(self, page_token: Optional[str] = None, page_size: int = 500,
+                               q: Optional[str] = None) -> tuple[list[str], Optional[str]]:
+        """Return one page of message ids and the token for the next page."""
+        res = await self.client.list_messages(q=q, page_token=page_token, max_results=page_size)
+        return [m['id'] for m in res.get('messages', [])], res.get('nextPageToken')
+
+    async def fetch_metadata(self, message_ids: Sequence[str]) -> list[dict[str, Any]]:
+        """Batch-fetch metadata for the given ids, 100 per batch request, batches in parallel."""
+        responses = await self.client.batch_get_messages(message_ids, metadata_headers=METADATA_HEADERS)
+        return [self.parse_message(r) for r in responses if not isinstance(r, GmailAPIError)]
+
+    @coalesced(cache=False)  # shared while in flight, never cached: the historyId must be current
+    async def get_profile(self) -> Any:
+        return await self.client.get_profile()
+
+    async def get_history_id(self) -> str:
+        return str((await self.get_profile())['historyId'])
+
+    async def watch(self, topic_name: str) -> Any:
+        """Register (or renew) push notifications for this mailbox; see app.jobs.push."""
+        return await self.client.watch(topic_name)
+
+    async def stop_watch(self) -> Any:
+        return await self.client.stop_watch()
+
+    async def list_history(self, start_history_id: str) -> dict[str, Any]:
+        """Collapse users.history.list since start_history_id into message-level deltas.
+
+        Raises GmailAPIError(404) when the history id is too old and a full sync is needed.
+        """
+        added: set[str] = set()
+        deleted: set[str] = set()
+        relabelled: dict[str, list[str]] = {}
+        history_id = start_history_id
+        page_token = None
+        while True:
+            res = await self.client.list_history(start_history_id, page_token)
+            for record in res.get('history', []):
+                for item in record.get('messagesAdded', []):
+                    added.add(item['message']['id'])
+                    deleted.discard(item['message']['id'])
+                for item in record.get('messagesDeleted', []):
+                    deleted.add(item['message']['id'])
+                    added.discard(item['message']['id'])
+                    relabelled.pop(item['message']['id'], None)
+                for key in ('labelsAdded', 'labelsRemoved'):
+                    for item in record.get(key, []):
+                        # history entries carry the message's full label set after the change
+                        relabelled[item['message']['id']] = item['message'].get('labelIds', [])
+            history_id = str(res.get('historyId', history_id))
+            page_token = res.get('nextPageToken')
+            if not page_token:
+                break
+        return {
+            "added": added,
+            "deleted": deleted,
+            "relabelled": {k: v for k, v in relabelled.items() if k not in added},
+            "history_id": history_id,
+        }
+
+    SUMMARY_CATEGORIES = {
+        'Promotions': 'CATEGORY_PROMOTIONS',
+        'Updates': 'CATEGORY_UPDATES',
+        'Social': 'CATEGORY_SOCIAL',
+        'Forums': 'CATEGORY_FORUMS',
+        'Primary': 'CATEGORY_PERSONAL'
+    }
+
+    @coalesced()
+    async def get_scan_summary(self) -> dict[str, Any]:
+        """Fetch real aggregate data from the user's Gmail profile.
+
+        Raises GmailAPIError when the profile can't be read; failures are never cached.
+        """
+        # Profile, UNREAD and the five category labels all go out in one batch round trip
+        profile, labels = await self.client.profile_and_labels(
+            ['UNREAD', *self.SUMMARY_CATEGORIES.values()]
+        )
+        if isinstance(profile, GmailAPIError):
+            raise profile
+        messages_total = profile.get('messagesTotal', 0)
+        unread = labels['UNREAD']
+        messages_unread = 0 if isinstance(unread, GmailAPIError) else unread.get('messagesUnread', 0)
+
+        unread_by_category: dict[str, int] = {}
+        for name, lid in self.SUMMARY_CATEGORIES.items():
+            cat_res = labels[lid]
+            # A missing/failed category label just drops out of the breakdown
+            if not isinstance(cat_res, GmailAPIError) and cat_res.get('messagesUnread', 0) > 0:
+                unread_by_category[name] = cat_res['messagesUnread']
+
+        return {
+            "total_emails_scanned": messages_total,  # Represents total size visible
+            "total_unread": messages_unread,
+            "unread_by_category": unread_by_category,
+            "never_read_senders_count": 0, # Requires deep ML analysis
+            "estimated_cleanup_potential_percent": 15, # Static for demo
+            "last_scan_at": datetime.now(timezone.utc).isoformat()
+        }
+
+    def _sample_query(self, category_filter: Optional[str] = None) -> str:
+        # Dynamically target categories if a filter is provided
+        if category_filter and category_filter.lower() != 'primary':
+            return f"category:{category_filter.lower()}"
+        return "{in:inbox category:promotions category:updates}"
+
+    def _fold_sampled(self, senders_map: dict[str, dict[str, Any]], response: dict[str, Any]) -> Optional[str]:
+        """Count one metadata response into `senders_map`; returns the sender's email, if any."""
+        headers = parse_headers(response.get('payload', {}).get('headers', []))
+        sender_raw = headers.get('from')
+
+        if not sender_raw:
+            return None
+
+        address, name = parse_sender(sender_raw)
+        email = canonical_address(address)
+        labels = response.get('labelIds', [])
+
+        if email not in senders_map:
+            is_unread = 'UNREAD' in labels
+            # Category tabs, or list mail (List-Id / Precedence: bulk) that landed in the primary tab
+            is_promotional = is_bulk(headers) or any(
+                c in labels for c in ['CATEGORY_PROMOTIONS', 'CATEGORY_UPDATES']
+            )
+            senders_map[email] = {
+                "id": hashlib.md5(email.encode()).hexdigest()[:8],
+                "email": email,
+                "domain": registrable_domain(email),
+                "name": name,
+                "total_emails": 1,
+                "unread_count": 1 if is_unread else 0,
+                "last_opened_date": datetime.now(timezone.utc).isoformat() if not is_unread else None,
+                "first_seen_date": datetime.now(timezone.utc).isoformat(),
+                "labels": ["Newsletter"] if is_promotional else [],
+                "suggested_action": "unsubscribe" if is_promotional else "keep",
+                "list_unsubscribe": headers.get('list-unsubscribe', ''),
+                "list_unsubscribe_post": headers.get('list-unsubscribe-post', ''),
             }
+        else:
+            senders_map[email]["total_emails"] += 1
+            if 'UNREAD' in labels:
+                senders_map[email]["unread_count"] += 1
+            if not senders_map[email]["list_unsubscribe"] and headers.get('list-unsubscribe'):
+                senders_map[email]["list_unsubscribe"] = headers['list-unsubscribe']
+                senders_map[email]["list_unsubscribe_post"] = headers.get('list-unsubscribe-post', '')
+        return email
 
-    def get_senders(self, max_results=15, category_filter=None, page_token=None):
+    async def _sample_page(self, q: str, page_token: Optional[str], max_results: int,
+                           senders_map: dict[str, dict[str, Any]]) -> tuple[set[str], int, Optional[str]]:
+        """List one page for `q` and fold its metadata (one batch request) into `senders_map`.
+
+        Returns (emails touched, messages listed, next page token).
+        """
+        results = await self.client.list_messages(q=q, page_token=page_token, max_results=max_results)
+        messages = results.get('messages', [])
+        touched: set[str] = set()
+        if messages:
+            responses = await self.client.batch_get_messages(
+                [m['id'] for m in messages], metadata_headers=METADATA_HEADERS
+            )
+            for response in responses:
+                if not isinstance(response, GmailAPIError):
+                    email = self._fold_sampled(senders_map, response)
+                    if email is not None:
+                        touched.add(email)
+        return touched, len(messages), results.get('nextPageToken')
+
+    @coalesced()
+    async def get_senders(self, max_results: int = 15, category_filter: Optional[str] = None,
+                          page_token: Optional[str] = None) -> dict[str, Any]:
         """Returns parsed sender objects by sampling recent inbox history using efficient batching."""
+        senders_map: dict[str, dict[str, Any]] = {}
+        _, listed, next_page_token = await self._sample_page(
+            self._sample_query(category_filter), page_token, max_results, senders_map
+        )
+        if not listed:
+            return {"senders": [], "next_page_token": None}
+        return {
+            "senders": list(senders_map.values()),
+            "next_page_token": next_page_token
+        }
+
+    async def stream_senders(self, category_filter: Optional[str] = None, max_messages: Optional[int] = None,
+                             page_size: int = 100) -> AsyncIterator[dict[str, Any]]:
+        """Sample like get_senders, but keep paging and yield after every metadata batch.
+
+        Each item carries the senders that batch changed (their running aggregates) and
+        the running totals, so a caller can render the first rows after one list call and
+        one batch request, however deep the sampling goes.
+        """
+        q = self._sample_query(category_filter)
+        senders_map: dict[str, dict[str, Any]] = {}
+        totals = {"batches": 0, "messages": 0, "senders": 0}
+        page_token: Optional[str] = None
+        while True:
+            if max_messages is not None:
+                page_size = min(page_size, max_messages - totals["messages"])
+            touched, listed, page_token = await self._sample_page(q, page_token, page_size, senders_map)
+            totals["batches"] += 1
+            totals["messages"] += listed
+            totals["senders"] = len(senders_map)
+            yield {"senders": [senders_map[email] for email in touched], "totals": dict(totals)}
+            if not page_token or not listed or (max_messages is not None and totals["messages"] >= max_messages):
+                return
+
+    # batchModify accepts up to 1000 ids per call
+    BULK_LIMIT = 1000
+    # Each action runs as one or more (query refinement, labels added, labels removed) passes.
+    # Splitting on in:inbox means every pass changes exactly the labels it claims to, so the
+    # undo journal can put them back: archived mail that gets trashed must not reappear in
+    # the inbox on undo.
+    ACTION_PASSES: dict[str, tuple[tuple[Optional[str], list[str], list[str]], ...]] = {
+        'delete': (('in:inbox', ['TRASH'], ['INBOX']), (None, ['TRASH'], [])),
+        'unsubscribe': (('in:inbox', [], ['INBOX']),),
+    }
+
+    async def _apply_labels(self, ids: list[str], add: list[str], remove: list[str],
+                            mode: str = 'bulk') -> tuple[list[str], int]:
+        """Apply a label change to `ids`. Returns (ids actually changed, API calls spent).
+
+        'bulk' sends one batchModify per 1000 ids; 'per_message' sends one trash/modify
+        sub-request per id inside 100-message multipart batches.
+        """
+        if not ids:
+            return [], 0
+        if mode == 'bulk':
+            chunks = [ids[i:i + self.BULK_LIMIT] for i in range(0, len(ids), self.BULK_LIMIT)]
+            outcomes = await asyncio.gather(
+                *(self.client.batch_modify(chunk, add, remove) for chunk in chunks), return_exceptions=True
+            )
+            for outcome in outcomes:
+                if isinstance(outcome, BaseException) and not isinstance(outcome, GmailAPIError):
+                    raise outcome
+            changed = [i for c, o in zip(chunks, outcomes) if not isinstance(o, BaseException) for i in c]
+            return changed, len(chunks)
+
+        if add == ['TRASH']:
+            responses = await self.client.batch_trash(ids)
+        else:
+            responses = await self.client.batch_modify_each(ids, add, remove)
+        return [i for i, r in zip(ids, responses) if not isinstance(r, GmailAPIError)], len(ids)
+
+    async def revert(self, journal: UndoJournal) -> tuple[int, int, UndoJournal]:
+        """Undo everything recorded in an UndoJournal with bulk batchModify calls.
+
+        Returns (messages restored, API calls spent, journal of what is still to restore);
+        the last is empty unless a batch failed, and can be reverted again later.
+        """
+        restored, calls, remaining = 0, 0, UndoJournal()
+        for add, remove, ids in journal.reversals():
+            changed, spent = await self._apply_labels(ids, add, remove, 'bulk')
+            restored += len(changed)
+            calls += spent
+            done = set(changed)
+            remaining.record(remove, add, [i for i in ids if i not in done])
+        _forget_reads(self.user)
+        return restored, calls, remaining
+
+    async def iter_message_pages(self, q: str, page_size: int = 500) -> AsyncIterator[list[str]]:
+        """Yield message ids for `q` one list page at a time."""
+        page_token: Optional[str] = None
+        while True:
+            ids, page_token = await self.list_message_ids(page_token, page_size, q)
+            if ids:
+                yield ids
+            if not page_token:
+                break
+
+    @staticmethod
+    def _drains(refinement: Optional[str], add: list[str], remove: list[str]) -> bool:
+        """Whether applying a pass takes its messages out of the pass's own query."""
+        return 'TRASH' in add or (refinement == 'in:inbox' and 'INBOX' in remove)
+
+    async def _drain_query(self, q: str, flush_at: int, mutate: Mutate, totals: dict[str, int]) -> None:
+        """Mutate everything matching `q` when the mutation itself takes messages out of `q`.
+
+        List page tokens are offsets into the live result set, so following them while
+        earlier pages drop out of it skips messages. Instead pages are listed from the top
+        until a batch is full (nothing has changed yet, so the offsets hold), the batch is
+        applied, and listing starts over until a listing runs out. Ids a batch failed to
+        change, or that the list index still returns straight after, are skipped so the
+        loop ends.
+        """
+        failed: set[str] = set()
+        previous: set[str] = set()
+        while True:
+            buffer: list[str] = []
+            page_token: Optional[str] = None
+            while True:
+                ids, page_token = await self.list_message_ids(page_token, q=q)
+                if ids:
+                    totals["pages"] += 1
+                fresh = [i for i in ids if i not in failed and i not in previous]
+                totals["messages_matched"] += len(fresh)
+                buffer.extend(fresh)
+                if not page_token or len(buffer) >= flush_at:
+                    break
+            changed = await mutate(buffer) if buffer else []
+            if not page_token:
+                return  # the listing ran out, so that batch was everything left
+            previous = set(buffer)
+            failed.update(previous.difference(changed))
+
+    async def _page_query(self, q: str, flush_at: int, mutate: Mutate, totals: dict[str, int]) -> None:
+        """Mutate everything matching `q`, listing the next page while a batch is applied."""
+        in_flight: Optional[asyncio.Task[list[str]]] = None
+        buffer: list[str] = []
         try:
-            # Dynamically target categories if a filter is provided
-            if category_filter and category_filter.lower() != 'primary':
-                q = f"category:{category_filter.lower()}"
-            else:
-                q = "{in:inbox category:promotions category:updates}"
-                
-            kwargs = {'userId': 'me', 'q': q, 'maxResults': max_results}
-            if page_token:
-                kwargs['pageToken'] = page_token
-                
-            results = self.service.users().messages().list(**kwargs).execute()
-            messages = results.get('messages', [])
-            next_page_token = results.get('nextPageToken')
-            
-            if not messages:
-                return {"senders": [], "next_page_token": None}
-                
-            senders_map = {}
-            
-            def process_msg(request_id, response, exception):
-                if exception is not None:
-                    return
-                
-                headers = response.get('payload', {}).get('headers', [])
-                sender_raw = self.scrape_header(headers, 'From')
-                list_unsubscribe = self.scrape_header(headers, 'List-Unsubscribe')
-                
-                if not sender_raw:
-                    return
-                    
-                email = self.extract_sender_email(sender_raw)
-                name = self._parse_sender_name(sender_raw)
-                labels = response.get('labelIds', [])
-                
-                if email not in senders_map:
-                    is_unread = 'UNREAD' in labels
-                    is_promotional = any(c in labels for c in ['CATEGORY_PROMOTIONS', 'CATEGORY_UPDATES'])
-                    senders_map[email] = {
-                        "id": hashlib.md5(email.encode()).hexdigest()[:8],
-                        "email": email,
-                        "name": name,
-                        "total_emails": 1,
-                        "unread_count": 1 if is_unread else 0,
-                        "last_opened_date": datetime.now(timezone.utc).isoformat() if not is_unread else None,
-                        "first_seen_date": datetime.now(timezone.utc).isoformat(),
-                        "labels": ["Newsletter"] if is_promotional else [],
-                        "suggested_action": "unsubscribe" if is_promotional else "keep",
-                        "list_unsubscribe": list_unsubscribe
-                    }
-                else:
-                    senders_map[email]["total_emails"] += 1
-                    if 'UNREAD' in labels:
-                        senders_map[email]["unread_count"] += 1
-
-            batch = self.service.new_batch_http_request()
-            for msg_ref in messages:
-                req = self.service.users().messages().get(
-                    userId='me', id=msg_ref['id'], format='metadata', metadataHeaders=['From']
+            async for ids in self.iter_message_pages(q):
+                totals["pages"] += 1
+                totals["messages_matched"] += len(ids)
+                buffer.extend(ids)
+                if len(buffer) < flush_at:
+                    continue
+                if in_flight is not None:
+                    await in_flight
+                in_flight = asyncio.create_task(mutate(buffer))
+                buffer = []
+            if in_flight is not None:
+                await in_flight
+            if buffer:
+                await mutate(buffer)
+        finally:
+            if in_flight is not None and not in_flight.done():
+                in_flight.cancel()
+
+    async def stream_mutation(self, q: str, action_type: str, mode: str = 'bulk',
+                              on_progress: Optional[Progress] = None,
+                              journal: Optional[UndoJournal] = None) -> dict[str, int]:
+        """Pipe every list page for `q` straight into mutation batches, with no volume cap.
+
+        In bulk mode ids are buffered up to one full batchModify (1000 ids); otherwise each
+        list page is mutated as it arrives. Passes whose change takes messages out of their
+        own query (trashing, archiving from the inbox) re-list from the first page after
+        every batch; others list the next page while the previous batch is being applied.
+        Either way memory stays bounded however many messages match. `on_progress`, if
+        given, is called with running counts after every batch; the ids each pass changed
+        are recorded on `journal` (an UndoJournal), if given.
+        """
+        totals = {"pages": 0, "batches": 0, "messages_matched": 0, "messages_affected": 0, "api_calls": 0}
+        flush_at = self.BULK_LIMIT if mode == 'bulk' else 1
+
+        async def mutate(ids: list[str], add: list[str], remove: list[str]) -> list[str]:
+            # Each batch is one fair-share turn, so a huge cleanup interleaves with other accounts
+            async with scheduler.turn(getattr(self.user, "id", None)):
+                changed, calls = await self._apply_labels(ids, add, remove, mode)
+            if journal is not None:
+                journal.record(add, remove, changed)
+            totals["batches"] += 1
+            totals["messages_affected"] += len(changed)
+            totals["api_calls"] += calls
+            if on_progress is not None:
+                on_progress({"batch_messages": len(ids), "batch_affected": len(changed), **totals})
+            return changed
+
+        with track_calls() as stats:
+            for refinement, add, remove in self.ACTION_PASSES.get(action_type, ()):
+                run = self._drain_query if self._drains(refinement, add, remove) else self._page_query
+                await run(
+                    f"{q} {refinement}" if refinement else q, flush_at,
+                    functools.partial(mutate, add=add, remove=remove), totals,
                 )
-                batch.add(req, callback=process_msg)
-                
-            batch.execute()
+            # Cached summaries and sender samples no longer match the mailbox
+            _forget_reads(self.user)
 
-            return {
-                "senders": list(senders_map.values()),
-                "next_page_token": next_page_token
-            }
-        except Exception as e:
-            raise e
-            
-    def execute_action(self, sender_email, action_type, list_unsubscribe=None):
-        """Mutate the user's live Gmail inbox by applying bulk actions."""
-        try:
-            if action_type == 'unsubscribe' and list_unsubscribe:
-                import re
-                import requests
-                
-                # Attempt to extract HTTP unsubscribe links from the header, e.g., <https://...>
-                http_links = re.findall(r'<(https?://[^>]+)>', list_unsubscribe)
-                for link in http_links:
-                    try:
-                        # Some endpoints expect POST, fallback to GET, wrap in quick timeout so UI doesn't hang
-                        resp = requests.post(link, timeout=5)
-                        if resp.status_code >= 400:
-                            requests.get(link, timeout=5)
-                        break # Successfully fired network protocol
-                    except Exception:
-                        pass
-                        
-            # Find all messages from this specific sender
-            query = f"from:{sender_email}"
-            results = self.service.users().messages().list(userId='me', q=query, maxResults=500).execute()
-            messages = results.get('messages', [])
-            
-            affected_count = 0
-            
-            def process_action(request_id, response, exception):
-                nonlocal affected_count
-                if exception is None:
-                    affected_count += 1
-
-            # Process in chunks of 100 to respect Google Batch limits
-            for i in range(0, len(messages), 100):
-                batch = self.service.new_batch_http_request()
-                chunk = messages[i:i + 100]
-                for msg in chunk:
-                    if action_type == 'delete':
-                        req = self.service.users().messages().trash(userId='me', id=msg['id'])
-                        batch.add(req, callback=process_action)
-                    elif action_type == 'unsubscribe':
-                        req = self.service.users().messages().modify(
-                            userId='me', 
-                            id=msg['id'], 
-                            body={'removeLabelIds': ['INBOX']}
+        totals["api_calls_saved"] = totals["messages_matched"] - totals["api_calls"] if mode == 'bulk' else 0
+        totals["retried"] = stats.retried
+        totals["dropped"] = stats.dropped
+        return totals
+
+    def _sender_queries(self, senders: Sequence[tuple[str, Optional[Sequence[str]]]]) -> list[tuple[str, list[str]]]:
+        """[(from: query, [sender, ...])] for (sender, addresses) pairs, within the query length limit."""
+        # Leave room for the longest refinement stream_mutation appends to each pass
+        reserve = max(
+            len(refinement or '') + 1 for passes in self.ACTION_PASSES.values() for refinement, _, _ in passes
+        )
+        return from_query_groups(senders, get_settings().GMAIL_MAX_QUERY_LENGTH - reserve)
+
+    async def _mutate_queries(self, queries: Iterable[str], action_type: str, mode: str,
+                              on_progress: Optional[Progress] = None,
+                              journal: Optional[UndoJournal] = None) -> dict[str, int]:
+        """stream_mutation over each query in turn, with the totals summed."""
+        totals: dict[str, int] = {}
+        for q in queries:
+            for key, value in (await self.stream_mutation(q, action_type, mode, on_progress, journal)).items():
+                totals[key] = totals.get(key, 0) + value
+        return totals
+
+    async def execute_action(self, sender_email: str, action_type: str, list_unsubscribe: Optional[str] = None,
+                             mode: str = 'bulk', on_progress: Optional[Progress] = None,
+                             journal: Optional[UndoJournal] = None, list_unsubscribe_post: Optional[str] = None,
+                             addresses: Optional[Sequence[str]] = None) -> dict[str, Any]:
+        """Mutate the user's live Gmail inbox by applying bulk actions.
+
+        `addresses` are the exact From addresses behind the sender identity (see
+        index.sender_addresses); they all go into one `from:(a OR b ...)` query.
+        """
+        unsubscribe = None
+        if action_type == 'unsubscribe' and list_unsubscribe:
+            # Handed to the background dispatcher; never delays the mutation below
+            unsubscribe_dispatcher.submit(self.client, sender_email, list_unsubscribe, list_unsubscribe_post,
+                                          getattr(self.user, "id", None))
+            unsubscribe = "queued"
+
+        # Every message from this sender, however many pages that takes
+        queries = [q for q, _ in self._sender_queries([(sender_email, addresses)])]
+        totals = await self._mutate_queries(queries, action_type, mode, on_progress, journal)
+
+        return {
+            "status": "success",
+            "action": action_type,
+            "sender": sender_email,
+            "mode": mode,
+            "unsubscribe": unsubscribe,
+            **totals
+        }
+
+    def _plan_groups(self, items: Iterable[PlanItem],
+                     addresses: dict[str, list[str]]) -> list[tuple[str, list[str], list[PlanItem]]]:
+        """Split plan items into (action_type, [queries], [items]) units, many senders per query."""
+        by_action: dict[str, dict[str, PlanItem]] = {}
+        for item in items:
+            by_action.setdefault(item[1], {}).setdefault(item[0], item)
+        units: list[tuple[str, list[str], list[PlanItem]]] = []
+        for action_type, by_sender in by_action.items():
+            for q, members in self._sender_queries([(s, addresses.get(s)) for s in by_sender]):
+                previous = units[-1] if units else None
+                if previous and previous[0] == action_type and previous[2] == [by_sender[members[0]]]:
+                    previous[1].append(q)  # one sender with more addresses than fit in one query
+                else:
+                    units.append((action_type, [q], [by_sender[s] for s in members]))
+        return units
+
+    async def execute_plan(self, items: Sequence[PlanItem], mode: str = 'bulk', concurrency: Optional[int] = None,
+                           on_result: Optional[Progress] = None, journal: Optional[UndoJournal] = None,
+                           addresses: Optional[dict[str, list[str]]] = None) -> dict[str, Any]:
+        """Apply a whole plan: `items` are (sender_email, action_type, list_unsubscribe, list_unsubscribe_post).
+
+        Senders sharing an action are packed into `from:(a OR b ...)` queries up to Gmail's
+        query length limit (GMAIL_MAX_QUERY_LENGTH), so a plan over N senders lists in a
+        handful of queries instead of N. `addresses` maps a sender identity to the exact
+        From addresses behind it (index.sender_addresses); by default each sender is its
+        own address. Groups are worked off by at most `concurrency` workers that all share
+        this scanner's client. If a group's mutation fails, its senders are retried one by
+        one, so a failing sender is reported on its own and the rest of the plan carries
+        on; any other error cancels the remaining workers and is raised. `on_result`, if
+        given, is called with each sender's outcome as soon as it finishes; `journal`
+        collects every change so the whole plan can be undone in one go. A sender listed
+        twice with the same action is worked on, and counted, once.
+        """
+        concurrency = concurrency or get_settings().PLAN_MAX_CONCURRENT_SENDERS
+        by_sender = addresses or {}
+        totals = {"senders": 0, "succeeded": 0, "failed": 0, "skipped": 0, "query_groups": 0,
+                  "messages_affected": 0, "api_calls": 0, "api_calls_saved": 0}
+
+        def report(outcome: dict[str, Any]) -> None:
+            if on_result is not None:
+                on_result(outcome)
+
+        def count(result: dict[str, Any]) -> None:
+            for key in ("messages_affected", "api_calls", "api_calls_saved"):
+                totals[key] += result[key]
+
+        for sender_email, action_type in dict.fromkeys((item[0], item[1]) for item in items):
+            if action_type not in self.ACTION_PASSES:
+                totals["skipped"] += 1
+                report({"sender": sender_email, "action": action_type, "status": "skipped"})
+        units = self._plan_groups([item for item in items if item[1] in self.ACTION_PASSES], by_sender)
+        totals["query_groups"] = len(units)
+        totals["senders"] = totals["skipped"] + sum(len(members) for _, _, members in units)
+        queue: asyncio.Queue[tuple[str, list[str], list[PlanItem]]] = asyncio.Queue()
+        for unit in units:
+            queue.put_nowait(unit)
+
+        async def one_by_one(action_type: str, members: list[PlanItem]) -> None:
+            for sender_email, _, list_unsubscribe, list_unsubscribe_post in members:
+                outcome: dict[str, Any] = {"sender": sender_email, "action": action_type}
+                try:
+                    result = await self.execute_action(
+                        sender_email, action_type, list_unsubscribe, mode, journal=journal,
+                        list_unsubscribe_post=list_unsubscribe_post, addresses=by_sender.get(sender_email),
+                    )
+                except GmailAPIError as e:
+                    outcome.update(status="failed", error=str(e))
+                    totals["failed"] += 1
+                else:
+                    outcome.update(result)
+                    totals["succeeded"] += 1
+                    count(result)
+                report(outcome)
+
+        async def worker() -> None:
+            while not queue.empty():
+                action_type, queries, members = queue.get_nowait()
+                if len(members) == 1:
+                    await one_by_one(action_type, members)
+                    continue
+                try:
+                    result = await self._mutate_queries(queries, action_type, mode, journal=journal)
+                except GmailAPIError:
+                    await one_by_one(action_type, members)
+                    continue
+                totals["succeeded"] += len(members)
+                count(result)
+                for sender_email, _, list_unsubscribe, list_unsubscribe_post in members:
+                    unsubscribe = None
+                    if action_type == 'unsubscribe' and list_unsubscribe:
+                        unsubscribe_dispatcher.submit(
+                            self.client, sender_email, list_unsubscribe, list_unsubscribe_post,
+                            getattr(self.user, "id", None),
                         )
-                        batch.add(req, callback=process_action)
-                if chunk:
-                    batch.execute()
-                    
-            return {
-                "status": "success",
-                "action": action_type,
-                "sender": sender_email,
-                "messages_affected": affected_count
-            }
-        except Exception as e:
-            raise e
+                        unsubscribe = "queued"
+                    # Message counts are per query; they can't be split between the senders in it
+                    report({"sender": sender_email, "action": action_type, "status": "success", "mode": mode,
+                            "unsubscribe": unsubscribe, "group_senders": len(members),
+                            "group_messages_affected": result["messages_affected"]})
 
-    def execute_category_wipe(self, category_label: str):
-        """Wipe emails in a specific category using batched deletion (up to 1000 messages)."""
-        try:
-            # Map friendly names to internal categories, or fallback to query
-            label_map = {
-                'promotions': 'CATEGORY_PROMOTIONS',
-                'updates': 'CATEGORY_UPDATES',
-                'social': 'CATEGORY_SOCIAL',
-                'forums': 'CATEGORY_FORUMS'
-            }
-            internal_label = label_map.get(category_label.lower())
-            if internal_label:
-                q = f"label:{internal_label}"
-            else:
-                q = f"category:{category_label.lower()}"
-                
-            messages = []
-            page_token = None
-            
-            for _ in range(2):
-                kwargs = {'userId': 'me', 'q': q, 'maxResults': 500}
-                if page_token:
-                    kwargs['pageToken'] = page_token
-                res = self.service.users().messages().list(**kwargs).execute()
-                messages.extend(res.get('messages', []))
-                page_token = res.get('nextPageToken')
-                if not page_token:
-                    break
-                    
-            if not messages:
-                return {"status": "success", "category": category_label, "messages_affected": 0}
-                
-            affected_count = 0
-            def process_action(request_id, response, exception):
-                nonlocal affected_count
-                if exception is None:
-                    affected_count += 1
-                    
-            for i in range(0, len(messages), 100):
-                batch = self.service.new_batch_http_request()
-                chunk = messages[i:i + 100]
-                for msg in chunk:
-                    req = self.service.users().messages().trash(userId='me', id=msg['id'])
-                    batch.add(req, callback=process_action)
-                if chunk:
-                    batch.execute()
-                    
-            return {
-                "status": "success",
-                "category": category_label,
-                "messages_affected": affected_count
-            }
-        except Exception as e:
-            raise e
+        with track_calls() as stats:
+            workers = [asyncio.create_task(worker()) for _ in range(min(concurrency, len(units)))]
+            try:
+                await asyncio.gather(*workers)
+            finally:
+                # A worker that raised leaves the others mid-batch; stop them before returning
+                for task in workers:
+                    task.cancel()
+                await asyncio.gather(*workers, return_exceptions=True)
+
+        totals["retried"] = stats.retried
+        totals["dropped"] = stats.dropped
+        return {"status": "success", "mode": mode, **totals}
+
+    async def execute_category_wipe(self, category_label: str, mode: str = 'bulk',
+                                    on_progress: Optional[Progress] = None,
+                                    journal: Optional[UndoJournal] = None) -> dict[str, Any]:
+        """Trash every email in a category, streaming list pages into mutation batches."""
+        # Map friendly names to internal categories, or fallback to query
+        label_map = {
+            'promotions': 'CATEGORY_PROMOTIONS',
+            'updates': 'CATEGORY_UPDATES',
+            'social': 'CATEGORY_SOCIAL',
+            'forums': 'CATEGORY_FORUMS'
+        }
+        internal_label = label_map.get(category_label.lower())
+        if internal_label:
+            q = f"label:{internal_label}"
+        else:
+            q = f"category:{category_label.lower()}"
+
+        totals = await self.stream_mutation(q, 'delete', mode, on_progress, journal)
+
+        return {
+            "status": "success",
+            "category": category_label,
+            "mode": mode,
+            **totals
+        }
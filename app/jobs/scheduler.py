@@ -0,0 +1,86 @@
+# app/jobs/scheduler.py
+"""Fair sharing of Gmail work across accounts.
+
+Scans and cleanups don't hold a slot for their whole run. They ask for one *turn* per
+unit of work: a scan page, or one mutation batch. When turns are scarce, the free slot
+goes to the accounts with queued work in round-robin order. An account working through
+500k messages then gets one turn in N while N accounts are busy, and a small mailbox
+that shows up mid-scan is served on the next free slot. Each account's Gmail quota is
+still paced separately by its own pooled client (see app.gmail.pool).
+"""
+import asyncio
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Hashable, Optional
+
+from app.config import get_settings
+
+
+class FairScheduler:
+    def __init__(self, slots: Optional[int] = None) -> None:
+        self.slots = slots or get_settings().SCHEDULER_MAX_CONCURRENT_TURNS
+        self.busy = 0
+        # account -> deque of futures, in round-robin order
+        self._waiting: OrderedDict[Hashable, deque[asyncio.Future[None]]] = OrderedDict()
+        self.granted: dict[Hashable, int] = {}  # account -> turns taken so far
+
+    @asynccontextmanager
+    async def turn(self, account: Hashable) -> AsyncIterator[None]:
+        await self._acquire(account)
+        try:
+            yield
+        finally:
+            self._release()
+
+    async def _acquire(self, account: Hashable) -> None:
+        if self.busy < self.slots and not self._waiting:
+            self._take(account)
+            return
+        future: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+        self._waiting.setdefault(account, deque()).append(future)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self._release()  # the turn was granted just as we were cancelled
+            else:
+                self._forget(account, future)
+            raise
+
+    def _take(self, account: Hashable) -> None:
+        self.busy += 1
+        self.granted[account] = self.granted.get(account, 0) + 1
+
+    def _release(self) -> None:
+        self.busy -= 1
+        while self.busy < self.slots and self._waiting:
+            account, queue = self._waiting.popitem(last=False)
+            future = queue.popleft()
+            if queue:
+                self._waiting[account] = queue  # back of the line
+            if future.cancelled():
+                continue
+            self._take(account)
+            future.set_result(None)
+
+    def _forget(self, account: Hashable, future: asyncio.Future[None]) -> None:
+        queue = self._waiting.get(account)
+        if queue is None:
+            return
+        try:
+            queue.remove(future)
+        except ValueError:
+            pass
+        if not queue:
+            del self._waiting[account]
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "slots": self.slots,
+            "busy": self.busy,
+            "waiting": {account: len(queue) for account, queue in self._waiting.items()},
+            "turns": dict(self.granted),
+        }
+
+
+scheduler = FairScheduler()
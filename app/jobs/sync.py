@@ -0,0 +1,255 @@
+# app/jobs/sync.py
+"""Keep the local message index in step with Gmail.
+
+The first run pages through the whole mailbox; afterwards only the deltas reported by
+users.history.list since the stored historyId are applied.
+
+A full sync builds its rows in a staging generation: message_index and sender_stats rows
+keyed by `staging_key(user_id)` instead of the user's id, which no reader ever asks for.
+The user's live rows keep serving (and taking history deltas) until the sync completes
+and the staged rows replace them in one transaction.
+"""
+from datetime import datetime, timedelta
+from typing import Any, Callable, Iterable, Optional, cast
+
+from sqlalchemy import CursorResult, delete, insert, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.config import get_settings
+from app.db.base import MessageIndex, ScanJob, SenderStat, SyncState, User
+from app.gmail.client import GmailAPIError
+from app.gmail.ratelimit import current_stats
+from app.jobs.aggregate import SenderAggregator, category_of, refresh_senders
+from app.jobs.plans import refresh_plan
+from app.jobs.scanner import GmailScanner
+from app.jobs.scheduler import FairScheduler, scheduler as default_scheduler
+
+
+def label_columns(labels: Iterable[str]) -> dict[str, Any]:
+    """Columns derived from a message's label ids."""
+    return {
+        "labels": " ".join(labels),
+        "is_unread": 'UNREAD' in labels,
+        "category": category_of(labels),
+    }
+
+
+def staging_key(user_id: int) -> int:
+    """The user_id a full sync's rows are written under until they are swapped in."""
+    return -user_id
+
+
+async def abandon_full_sync(db: AsyncSession, user_id: int) -> None:
+    """Drop a cancelled full sync's staged rows and its account's history id, so the
+    next sync starts a full one again instead of building on the old index."""
+    await db.execute(delete(MessageIndex).where(MessageIndex.user_id == staging_key(user_id)))
+    await db.execute(delete(SenderStat).where(SenderStat.user_id == staging_key(user_id)))
+    state = await db.get(SyncState, user_id)
+    if state is not None:
+        state.history_id = None
+    await db.commit()
+
+
+def to_index_row(user_id: int, parsed: dict[str, Any]) -> dict[str, Any]:
+    row = {k: v for k, v in parsed.items() if k != "labels"}
+    row.update(label_columns(parsed["labels"]))
+    row["user_id"] = user_id
+    return row
+
+
+class MailboxSync:
+    # One list page feeds exactly one 100-message metadata batch
+    PAGE_SIZE = 100
+    CHECKPOINT_PAGES = 5
+
+    def __init__(self, db: AsyncSession, user: User, scanner_factory: Callable[[User], GmailScanner],
+                 scheduler: Optional[FairScheduler] = None) -> None:
+        """`scanner_factory` is only called when Gmail actually has to be contacted."""
+        self.db = db
+        self.user = user
+        self._scanner_factory = scanner_factory
+        self._scheduler = scheduler or default_scheduler
+        self._scanner: Optional[GmailScanner] = None
+
+    @property
+    def scanner(self) -> GmailScanner:
+        if self._scanner is None:
+            self._scanner = self._scanner_factory(self.user)
+        return self._scanner
+
+    async def _state(self) -> SyncState:
+        state = await self.db.get(SyncState, self.user.id)
+        if state is None:
+            state = SyncState(user_id=self.user.id)
+            self.db.add(state)
+        return state
+
+    async def ensure_fresh(self, max_age_seconds: Optional[float] = None) -> dict[str, Any]:
+        """Apply history deltas if the index is older than `max_age_seconds` (settings default).
+
+        Never runs a full sync: returns {"mode": "needs_full"} so the caller can hand that
+        off to the background scan runner instead of holding a request open. While a
+        users.watch is active the index is kept current by push notifications (see
+        app.jobs.push), so this returns {"mode": "push"} without contacting Gmail, unless
+        nothing has synced for PUSH_MAX_INDEX_AGE_SECONDS (a notification may have been lost).
+        """
+        settings = get_settings()
+        if max_age_seconds is None:
+            max_age_seconds = settings.INDEX_SYNC_INTERVAL_SECONDS
+        state = await self._state()
+        now = datetime.utcnow()
+        if (state.history_id and state.watch_expires_at and state.watch_expires_at > now
+                and state.last_synced_at
+                and now - state.last_synced_at < timedelta(seconds=settings.PUSH_MAX_INDEX_AGE_SECONDS)):
+            return {"mode": "push"}
+        if state.last_synced_at and now - state.last_synced_at < timedelta(seconds=max_age_seconds):
+            return {"mode": "cached"}
+        return await self.run(allow_full=False)
+
+    async def run(self, allow_full: bool = True) -> dict[str, Any]:
+        state = await self._state()
+        if state.history_id:
+            try:
+                return await self.incremental_sync(state)
+            except GmailAPIError as e:
+                # 404 means the stored historyId fell out of Gmail's retention window
+                if e.status != 404:
+                    raise
+        if not allow_full:
+            return {"mode": "needs_full"}
+        return await self.full_sync()
+
+    async def full_sync(self, job: Optional[ScanJob] = None) -> dict[str, Any]:
+        """Page through the whole mailbox.
+
+        Rows go to the staging generation and replace the live ones only once the last
+        page is in. When a ScanJob is given, progress is recorded on it and every
+        CHECKPOINT_PAGES pages the staged rows, sender aggregates and next page token are
+        committed together, so a job with a stored page_token resumes from there instead
+        of starting over.
+        """
+        staging = staging_key(self.user.id)
+        if job is not None and job.page_token:
+            aggregator = await SenderAggregator.load(self.db, staging)
+            history_id: str = job.history_id
+            page_token: Optional[str] = job.page_token
+        else:
+            # Capture the history id *before* listing so changes made during the sync are replayed next time
+            profile = await self.scanner.get_profile()
+            history_id, page_token = str(profile['historyId']), None
+            # Leftovers of an earlier sync that never finished
+            await self.db.execute(delete(MessageIndex).where(MessageIndex.user_id == staging))
+            aggregator = SenderAggregator()
+            if job is not None:
+                job.history_id = history_id
+                job.messages_total = profile.get('messagesTotal')
+
+        # Retry/drop counters come from the caller's track_calls() block (the job runner)
+        stats = current_stats()
+        baseline = (job.retried or 0, job.dropped or 0) if job is not None else (0, 0)
+        pages = 0
+        while True:
+            # One fair-share turn per page; other accounts' work interleaves between pages
+            async with self._scheduler.turn(self.user.id):
+                ids, page_token = await self.scanner.list_message_ids(page_token, self.PAGE_SIZE)
+                rows = await self.scanner.fetch_metadata(ids)
+            aggregator.fold(rows)
+            await self._upsert(rows, staging)
+            pages += 1
+            if job is not None:
+                job.pages_done += 1
+                job.messages_processed += len(ids)
+                if stats is not None:
+                    job.retried = baseline[0] + stats.retried
+                    job.dropped = baseline[1] + stats.dropped
+                job.updated_at = datetime.utcnow()
+            if not page_token:
+                break
+            if pages % self.CHECKPOINT_PAGES == 0:
+                await aggregator.save(self.db, staging)
+                if job is not None:
+                    job.page_token = page_token
+                await self.db.commit()
+
+        await self._swap_in(aggregator, staging)
+        await refresh_plan(self.db, self.user.id)
+        state = await self._state()
+        now = datetime.utcnow()
+        state.history_id = history_id
+        state.last_full_sync_at = now
+        state.last_synced_at = now
+        if job is not None:
+            job.page_token = None
+        await self.db.commit()
+        return {"mode": "full", "indexed": aggregator.messages_seen, "senders": len(aggregator.senders)}
+
+    async def incremental_sync(self, state: SyncState) -> dict[str, Any]:
+        if not state.history_id:
+            raise ValueError("an incremental sync needs a stored historyId")
+        delta = await self.scanner.list_history(state.history_id)
+        touched = set(delta["deleted"]) | set(delta["relabelled"])
+        affected: set[str] = set()
+        if touched:
+            result = await self.db.execute(
+                select(MessageIndex.sender).where(
+                    MessageIndex.user_id == self.user.id, MessageIndex.id.in_(touched)
+                )
+            )
+            affected.update(result.scalars().all())
+
+        if delta["deleted"]:
+            await self.db.execute(
+                delete(MessageIndex).where(
+                    MessageIndex.user_id == self.user.id, MessageIndex.id.in_(delta["deleted"])
+                )
+            )
+
+        to_fetch = set(delta["added"])
+        for message_id, labels in delta["relabelled"].items():
+            updated = cast(CursorResult[Any], await self.db.execute(
+                update(MessageIndex)
+                .where(MessageIndex.user_id == self.user.id, MessageIndex.id == message_id)
+                .values(**label_columns(labels))
+            ))
+            if updated.rowcount == 0:
+                to_fetch.add(message_id)
+
+        if to_fetch:
+            rows = await self.scanner.fetch_metadata(sorted(to_fetch))
+            await self._upsert(rows)
+            affected.update(r["sender"] for r in rows)
+
+        await refresh_senders(self.db, self.user.id, affected)
+        await refresh_plan(self.db, self.user.id, affected)
+        state.history_id = delta["history_id"]
+        state.last_synced_at = datetime.utcnow()
+        await self.db.commit()
+        return {
+            "mode": "incremental",
+            "added": len(delta["added"]),
+            "deleted": len(delta["deleted"]),
+            "relabelled": len(delta["relabelled"]),
+        }
+
+    async def _swap_in(self, aggregator: SenderAggregator, staging: int) -> None:
+        """Replace the live index and sender aggregates with the staged ones (committed by the caller)."""
+        await self.db.execute(delete(MessageIndex).where(MessageIndex.user_id == self.user.id))
+        await self.db.execute(
+            update(MessageIndex).where(MessageIndex.user_id == staging).values(user_id=self.user.id)
+        )
+        await self.db.execute(delete(SenderStat).where(SenderStat.user_id == staging))
+        await aggregator.save(self.db, self.user.id)
+
+    async def _upsert(self, parsed: list[dict[str, Any]], user_id: Optional[int] = None) -> None:
+        if not parsed:
+            return
+        user_id = self.user.id if user_id is None else user_id
+        rows = [to_index_row(user_id, r) for r in parsed]
+        await self.db.execute(
+            delete(MessageIndex).where(
+                MessageIndex.user_id == user_id,
+                MessageIndex.id.in_([r["id"] for r in rows]),
+            )
+        )
+        await self.db.execute(insert(MessageIndex), rows)
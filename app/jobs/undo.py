@@ -0,0 +1,146 @@
+# app/jobs/undo.py
+"""Undo journal for executed actions.
+
+Every mutation pass records the ids it changed under the exact label change it applied.
+The journal is stored on an UndoWindow row as one compressed blob: Gmail message ids are
+16 hex digits, so each id packs into 8 bytes, and zlib squeezes the high-order bytes
+that sorted (roughly time-ordered) ids share. Undoing replays each group's label change
+in reverse with 1000-id batchModify calls.
+"""
+import json
+import re
+import secrets
+import struct
+import zlib
+from datetime import datetime, timedelta
+from typing import Any, Iterable, Iterator, Optional, Sequence, cast
+
+from sqlalchemy import CursorResult, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.config import get_settings
+from app.db.base import UndoWindow
+
+_HEX_ID = re.compile(r"[0-9a-f]{16}\Z")
+UNDOABLE = ("available", "partial")
+REVERTING = "reverting"
+
+
+def pack_ids(message_ids: Iterable[str]) -> bytes:
+    """Compact, order-insensitive encoding of a list of message ids."""
+    ids = sorted(message_ids)
+    if all(_HEX_ID.match(i) for i in ids):
+        return b"Q" + struct.pack(f">{len(ids)}Q", *(int(i, 16) for i in ids))
+    return b"T" + "\n".join(ids).encode()
+
+
+def unpack_ids(blob: bytes) -> list[str]:
+    kind, body = blob[:1], blob[1:]
+    if kind == b"Q":
+        return [f"{v:016x}" for v in struct.unpack(f">{len(body) // 8}Q", body)]
+    return body.decode().split("\n") if body else []
+
+
+class UndoJournal:
+    """Message ids an action changed, grouped by the (added, removed) labels applied to them."""
+
+    def __init__(self) -> None:
+        self.groups: dict[tuple[tuple[str, ...], tuple[str, ...]], list[str]] = {}  # (add, remove) -> [ids]
+
+    def record(self, add: Iterable[str], remove: Iterable[str], ids: Sequence[str]) -> None:
+        if ids:
+            self.groups.setdefault((tuple(add), tuple(remove)), []).extend(ids)
+
+    def __len__(self) -> int:
+        return sum(len(ids) for ids in self.groups.values())
+
+    def reversals(self) -> Iterator[tuple[list[str], list[str], list[str]]]:
+        """(labels to add, labels to remove, ids) that put each group back the way it was."""
+        for (add, remove), ids in self.groups.items():
+            yield list(remove), list(add), ids
+
+    def dumps(self) -> bytes:
+        header: list[dict[str, Any]] = []
+        blobs: list[bytes] = []
+        for (add, remove), ids in self.groups.items():
+            blob = pack_ids(ids)
+            header.append({"add": list(add), "remove": list(remove), "size": len(blob)})
+            blobs.append(blob)
+        head = json.dumps(header).encode()
+        return zlib.compress(struct.pack(">I", len(head)) + head + b"".join(blobs))
+
+    @classmethod
+    def loads(cls, payload: bytes) -> "UndoJournal":
+        journal = cls()
+        raw = zlib.decompress(payload)
+        (head_len,) = struct.unpack(">I", raw[:4])
+        offset = 4 + head_len
+        for group in json.loads(raw[4:offset]):
+            blob = raw[offset:offset + group["size"]]
+            offset += group["size"]
+            journal.record(group["add"], group["remove"], unpack_ids(blob))
+        return journal
+
+
+def window_status(window: UndoWindow, now: Optional[datetime] = None) -> str:
+    """available|partial (some messages still to restore)|reverting|undone|expired."""
+    now = now or datetime.utcnow()
+    if window.status in UNDOABLE and window.expires_at <= now:
+        return "expired"
+    return window.status
+
+
+def record(db: AsyncSession, user_id: int, action_type: str, journal: UndoJournal,
+           description: str = "") -> Optional[UndoWindow]:
+    """Open an undo window for `journal`. Returns the window, or None if nothing changed. The caller commits."""
+    if not len(journal):
+        return None
+    now = datetime.utcnow()
+    window = UndoWindow(
+        action_id=secrets.token_hex(16),
+        user_id=user_id,
+        action_type=action_type,
+        description=description,
+        message_count=len(journal),
+        journal=journal.dumps(),
+        status="available",
+        created_at=now,
+        expires_at=now + timedelta(seconds=get_settings().UNDO_WINDOW_SECONDS),
+    )
+    db.add(window)
+    return window
+
+
+async def find_window(db: AsyncSession, user_id: int, action_id: str) -> Optional[UndoWindow]:
+    result = await db.execute(
+        select(UndoWindow).where(UndoWindow.user_id == user_id, UndoWindow.action_id == action_id)
+    )
+    return result.scalars().first()
+
+
+async def claim(db: AsyncSession, window: UndoWindow, now: Optional[datetime] = None) -> bool:
+    """Mark `window` as being reverted, if it is still undoable. Returns whether this caller
+    got it: the check and the update are one statement, so of two concurrent undos only
+    one goes on to revert."""
+    now = now or datetime.utcnow()
+    result = cast(CursorResult[Any], await db.execute(
+        update(UndoWindow)
+        .where(UndoWindow.id == window.id, UndoWindow.status.in_(UNDOABLE), UndoWindow.expires_at > now)
+        .values(status=REVERTING)
+        .execution_options(synchronize_session="fetch")
+    ))
+    await db.commit()
+    return result.rowcount == 1
+
+
+def serialize_window(window: UndoWindow, now: Optional[datetime] = None) -> dict[str, Any]:
+    now = now or datetime.utcnow()
+    status = window_status(window, now)
+    return {
+        "action_id": window.action_id,
+        "action_type": window.action_type,
+        "status": status,
+        "message_count": window.message_count,
+        "expires_in_seconds": max(0, int((window.expires_at - now).total_seconds())) if status in UNDOABLE else 0,
+    }
@@ -0,0 +1,209 @@
+# app/jobs/unsubscribe.py
+"""Background unsubscribe dispatcher.
+
+Cleanup requests only queue unsubscribes here; the HTTP and mail traffic happens on
+asyncio tasks afterwards, so it never adds latency to the Gmail mutation. For each sender
+the List-Unsubscribe methods are tried in order of reliability:
+
+  1. RFC 8058 one-click: POST "List-Unsubscribe=One-Click" to the https URI, only when
+     the sender also advertised List-Unsubscribe-Post
+  2. mailto: an unsubscribe message sent through the user's Gmail (messages.send)
+  3. a plain GET of the http(s) URI, the legacy best effort
+
+Transient failures (network errors, 429 and 5xx) are retried with backoff. Requests go
+through one pooled HTTP client, at most UNSUBSCRIBE_MAX_CONCURRENCY at once and at most
+UNSUBSCRIBE_PER_DOMAIN per receiving domain. Each outcome is written to the audit log.
+"""
+import asyncio
+import base64
+import re
+import uuid
+from datetime import datetime
+from email.message import EmailMessage
+from typing import Any, Callable, Optional
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import httpx
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import get_settings
+from app.db.base import AuditLog, SessionLocal
+from app.gmail.client import AsyncGmailClient, GmailAPIError, RETRYABLE_STATUSES
+from app.gmail.ratelimit import RetryPolicy
+
+_URI = re.compile(r"<([^>]+)>")
+ONE_CLICK_BODY = {"List-Unsubscribe": "One-Click"}
+
+
+def parse_list_unsubscribe(header: Optional[str]) -> tuple[list[str], list[str]]:
+    """Split a List-Unsubscribe header into (http(s) URIs, mailto URIs), in header order."""
+    web: list[str] = []
+    mailto: list[str] = []
+    for uri in _URI.findall(header or ""):
+        uri = uri.strip()
+        scheme = uri.split(":", 1)[0].lower()
+        if scheme in ("https", "http"):
+            web.append(uri)
+        elif scheme == "mailto":
+            mailto.append(uri)
+    return web, mailto
+
+
+def is_one_click(list_unsubscribe_post: Optional[str]) -> bool:
+    return "list-unsubscribe=one-click" in (list_unsubscribe_post or "").replace(" ", "").lower()
+
+
+def mailto_message(uri: str, from_address: Optional[str] = None) -> str:
+    """Build the unsubscribe mail for a mailto: URI (RFC 6068 to/subject/body)."""
+    parts = urlsplit(uri)
+    query = {k.lower(): v[0] for k, v in parse_qs(parts.query).items()}
+    msg = EmailMessage()
+    msg["To"] = unquote(parts.path) or query.get("to", "")
+    if from_address:
+        msg["From"] = from_address
+    msg["Subject"] = query.get("subject", "unsubscribe")
+    msg.set_content(query.get("body", "unsubscribe"))
+    return base64.urlsafe_b64encode(msg.as_bytes()).decode()
+
+
+class _Transient(Exception):
+    pass
+
+
+class UnsubscribeRejected(Exception):
+    """The endpoint answered, but with a permanent failure."""
+
+
+class UnsubscribeDispatcher:
+    def __init__(self, session_factory: Callable[[], AsyncSession] = SessionLocal,
+                 http: Optional[httpx.AsyncClient] = None, retry: Optional[RetryPolicy] = None,
+                 max_concurrency: Optional[int] = None, per_domain: Optional[int] = None,
+                 timeout: Optional[float] = None) -> None:
+        settings = get_settings()
+        self._session_factory = session_factory
+        self._http = http
+        self._owns_http = http is None
+        self.retry = retry or RetryPolicy(max_retries=settings.UNSUBSCRIBE_MAX_RETRIES, base_delay=1.0)
+        self._max_concurrency = max_concurrency or settings.UNSUBSCRIBE_MAX_CONCURRENCY
+        self._per_domain = per_domain or settings.UNSUBSCRIBE_PER_DOMAIN
+        self._timeout = timeout or settings.UNSUBSCRIBE_TIMEOUT_SECONDS
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._domains: dict[str, asyncio.Semaphore] = {}
+        self._tasks: set[asyncio.Task[dict[str, Any]]] = set()
+
+    def _client(self) -> httpx.AsyncClient:
+        if self._http is None or self._http.is_closed:
+            self._http = httpx.AsyncClient(
+                timeout=self._timeout,
+                follow_redirects=True,
+                limits=httpx.Limits(max_connections=self._max_concurrency),
+            )
+        return self._http
+
+    def submit(self, gmail: AsyncGmailClient, sender: str, list_unsubscribe: str,
+               list_unsubscribe_post: Optional[str] = "",
+               user_id: Optional[int] = None) -> asyncio.Task[dict[str, Any]]:
+        """Queue an unsubscribe for `sender`; `gmail` is the user's AsyncGmailClient (for mailto),
+        `user_id` the account its audit entry belongs to."""
+        task = asyncio.create_task(self.dispatch(gmail, sender, list_unsubscribe, list_unsubscribe_post, user_id))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def dispatch(self, gmail: AsyncGmailClient, sender: str, list_unsubscribe: str,
+                       list_unsubscribe_post: Optional[str] = "", user_id: Optional[int] = None) -> dict[str, Any]:
+        web, mailto = parse_list_unsubscribe(list_unsubscribe)
+        attempts: list[tuple[str, str]] = []
+        if is_one_click(list_unsubscribe_post):
+            # RFC 8058 one-click is only defined for https URIs
+            attempts += [("one_click", uri) for uri in web if uri.lower().startswith("https:")][:1]
+        attempts += [("mailto", uri) for uri in mailto]
+        attempts += [("http", uri) for uri in web]
+
+        outcome: dict[str, Any] = {"sender": sender, "status": "skipped", "method": None, "tries": 0}
+        for method, uri in attempts:
+            outcome.update(method=method, uri=uri)
+            ok, tries, error = await self._with_retries(method, uri, gmail)
+            outcome["tries"] += tries
+            if ok:
+                outcome.update(status="ok", error=None)
+                break
+            outcome.update(status="failed", error=error)
+        await self._audit(outcome, user_id)
+        return outcome
+
+    async def _with_retries(self, method: str, uri: str, gmail: AsyncGmailClient) -> tuple[bool, int, Optional[str]]:
+        tries = 0
+        while True:
+            tries += 1
+            try:
+                await self._attempt(method, uri, gmail)
+                return True, tries, None
+            except _Transient as e:
+                if tries > self.retry.max_retries:
+                    return False, tries, str(e)
+                await asyncio.sleep(self.retry.delay(tries - 1))
+            except (httpx.HTTPError, GmailAPIError, UnsubscribeRejected) as e:
+                return False, tries, str(e)
+
+    async def _attempt(self, method: str, uri: str, gmail: AsyncGmailClient) -> None:
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self._max_concurrency)
+        slots = self._slots
+        if method == "mailto":
+            # AsyncGmailClient already retries rate limits and 5xx with backoff
+            async with slots:
+                await gmail.send_message(mailto_message(uri))
+            return
+
+        domain = urlsplit(uri).hostname or ""
+        limit = self._domains.get(domain)
+        if limit is None:
+            limit = self._domains[domain] = asyncio.Semaphore(self._per_domain)
+        async with limit, slots:
+            try:
+                if method == "one_click":
+                    resp = await self._client().post(uri, data=ONE_CLICK_BODY)
+                else:
+                    resp = await self._client().get(uri)
+            except httpx.TransportError as e:
+                raise _Transient(f"{type(e).__name__}: {e}")
+        if resp.status_code in RETRYABLE_STATUSES:
+            raise _Transient(f"HTTP {resp.status_code}")
+        if resp.status_code >= 400:
+            raise UnsubscribeRejected(f"HTTP {resp.status_code}")
+
+    async def _audit(self, outcome: dict[str, Any], user_id: Optional[int] = None) -> None:
+        details = f"Unsubscribe from {outcome['sender']}: {outcome['status']}"
+        if outcome["method"]:
+            details += f" via {outcome['method']} after {outcome['tries']} tries"
+        if outcome.get("error"):
+            details += f" ({outcome['error']})"
+        async with self._session_factory() as session:
+            session.add(AuditLog(
+                id=f"unsubscribe-{datetime.now().timestamp()}-{uuid.uuid4().hex[:8]}",
+                user_id=user_id,
+                event_type="unsubscribe",
+                details=details,
+            ))
+            await session.commit()
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._tasks)
+
+    async def wait(self) -> None:
+        """Wait for everything queued so far (tests, shutdown)."""
+        while self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
+
+    async def shutdown(self) -> None:
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*list(self._tasks), return_exceptions=True)
+        if self._owns_http and self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
+
+dispatcher = UnsubscribeDispatcher()
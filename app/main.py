@@ -12,18 +12,26 @@ from app.db.base import Base, engine
 from app.routes.reports import router as reports_router  # ensure file exists
 try:
     # Optional routers (only if you've added them)
-    from app.routes.actions import router as actions_router  # type: ignore
+    from app.routes.actions import router as actions_router
 except Exception:  # pragma: no cover
     actions_router = None  # type: ignore
 try:
-    from app.routes.insights import router as insights_router  # type: ignore
+    from app.routes.insights import router as insights_router
 except Exception:  # pragma: no cover
     insights_router = None  # type: ignore
 
 from app.routes.scan import router as scan_router
 from app.routes.senders import router as senders_router
 from app.routes.audit import router as audit_router
+from app.routes.metrics import router as metrics_router
+from app.routes.push import router as push_router
 from app.oauth.routes import router as oauth_router
+from app.jobs.runner import runner as scan_runner
+from app.jobs.push import push_sync
+from app.jobs.unsubscribe import dispatcher as unsubscribe_dispatcher
+from app.oauth.tokens import token_manager
+from app.gmail.client import close_http_client
+from app.metrics import MetricsMiddleware
 
 
 from app.config import get_settings
@@ -31,6 +39,9 @@ from app.config import get_settings
 
 def create_app() -> FastAPI:
     settings = get_settings()
+    if not settings.SESSION_SECRET:
+        # Anyone who knows the key can forge a session for any account
+        raise RuntimeError("SESSION_SECRET is not set; refusing to start with an unsigned session cookie")
     app = FastAPI(title=settings.APP_NAME)
 
     # CORS configuration
@@ -40,14 +51,18 @@ def create_app() -> FastAPI:
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=["X-Next-Cursor"],  # audit log paging
     )
     
-    # Required for OAuth flow state parameter
+    # Signed-in accounts and the OAuth flow state parameter
     app.add_middleware(
         SessionMiddleware,
-        secret_key="secret-session-key-for-dev-only"
+        secret_key=settings.SESSION_SECRET
     )
 
+    # Route latency for /metrics (outermost, so it times the other middleware too)
+    app.add_middleware(MetricsMiddleware)
+
     # Routers
     app.include_router(reports_router)
     if actions_router:
@@ -58,6 +73,8 @@ def create_app() -> FastAPI:
     app.include_router(senders_router)
     app.include_router(audit_router)
     app.include_router(oauth_router)
+    app.include_router(metrics_router)
+    app.include_router(push_router)  # Gmail push notifications
 
     @app.on_event("startup")
     async def startup_create_tables() -> None:
@@ -65,6 +82,19 @@ def create_app() -> FastAPI:
         if settings.DEV_CREATE_ALL:
             async with engine.begin() as conn:
                 await conn.run_sync(Base.metadata.create_all)
+        # Pick up scans a previous process left unfinished
+        await scan_runner.resume()
+        token_manager.start()
+        # Register and renew users.watch so Gmail pushes changes (no-op without GMAIL_PUSH_TOPIC)
+        push_sync.start()
+
+    @app.on_event("shutdown")
+    async def shutdown_background_work() -> None:
+        await push_sync.shutdown()
+        await token_manager.shutdown()
+        await scan_runner.shutdown()
+        await unsubscribe_dispatcher.shutdown()
+        await close_http_client()
 
     @app.get("/")
     def root() -> dict[str, str]:
@@ -0,0 +1,227 @@
+# app/metrics.py
+"""Minimal Prometheus-style metrics: counters, gauges and histograms with labels.
+
+Everything lives in process memory and is rendered in the text exposition format by
+GET /metrics (app.routes.metrics). There's no client library dependency; the three
+metric types below cover what we need.
+"""
+import functools
+import inspect
+import time
+from bisect import bisect_left
+from typing import Any, Awaitable, Callable, Iterable, Mapping, Sequence, TypeVar
+
+T = TypeVar("T")
+
+# Seconds; Gmail calls range from a few ms (cached) to tens of seconds (big batches, backoff)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SIZE_BUCKETS = (1, 5, 10, 25, 50, 75, 100)
+
+_registry: list["_Metric"] = []
+
+
+def _escape(value: object) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: Sequence[object], extra: Iterable[tuple[str, object]] = ()) -> str:
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    type = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (), register: bool = True) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: dict[tuple[str, ...], Any] = {}
+        if register:
+            _registry.append(self)
+
+    def _key(self, labels: Mapping[str, object]) -> tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def clear(self) -> None:
+        self._values.clear()
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        lines += self._samples()
+        return "\n".join(lines)
+
+    def _samples(self) -> list[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in sorted(self._values.items())
+        ]
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def inc(self, amount: float = 1, **labels: object) -> None:
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels: object) -> float:
+        return float(self._values.get(self._key(labels), 0))
+
+
+class Gauge(_Metric):
+    type = "gauge"
+
+    def set(self, value: float, **labels: object) -> None:
+        self._values[self._key(labels)] = value
+
+    def value(self, **labels: object) -> float:
+        return float(self._values.get(self._key(labels), 0))
+
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                 buckets: Iterable[float] = LATENCY_BUCKETS, register: bool = True) -> None:
+        super().__init__(name, documentation, labelnames, register)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels: object) -> None:
+        key = self._key(labels)
+        entry = self._values.get(key)
+        if entry is None:
+            entry = self._values[key] = [[0] * len(self.buckets), 0, 0.0]  # per-bucket counts, count, sum
+        index = bisect_left(self.buckets, value)
+        if index < len(self.buckets):
+            entry[0][index] += 1
+        entry[1] += 1
+        entry[2] += value
+
+    def count(self, **labels: object) -> int:
+        entry = self._values.get(self._key(labels))
+        return int(entry[1]) if entry else 0
+
+    def _samples(self) -> list[str]:
+        lines = []
+        for key, (counts, count, total) in sorted(self._values.items()):
+            cumulative = 0
+            for bound, n in zip(self.buckets, counts):
+                cumulative += n
+                lines.append(
+                    f"{self.name}_bucket{_format_labels(self.labelnames, key, [('le', _format_value(float(bound)))])} "
+                    f"{cumulative}"
+                )
+            lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, [('le', '+Inf')])} {count}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(float(total))}")
+        return lines
+
+
+def render(extra: Iterable[_Metric] = ()) -> str:
+    """Text exposition of every registered metric, plus `extra` (e.g. scrape-time gauges)."""
+    return "\n".join(m.render() for m in (*_registry, *extra)) + "\n"
+
+
+# --- Gmail transport (app.gmail.client) -----------------------------------------
+
+GMAIL_REQUEST_SECONDS = Histogram(
+    "gmail_request_duration_seconds", "Latency of Gmail REST calls and multipart batch envelopes.",
+    ("op", "status"),
+)
+GMAIL_BATCH_SIZE = Histogram(
+    "gmail_batch_size", "Sub-requests per multipart batch envelope.", (), buckets=SIZE_BUCKETS,
+)
+GMAIL_SUBREQUEST_FAILURES = Counter(
+    "gmail_subrequest_failures_total", "Batch sub-requests answered with an error.", ("op", "status"),
+)
+GMAIL_QUOTA_UNITS = Counter("gmail_quota_units_total", "Gmail quota units spent, per account.", ("account",))
+GMAIL_THROTTLED_SECONDS = Counter(
+    "gmail_throttled_seconds_total", "Time spent waiting on the per-account quota bucket.", ("account",),
+)
+GMAIL_RETRIES = Counter("gmail_retries_total", "Gmail calls or sub-requests retried after a transient error.", ("account",))
+GMAIL_DROPPED = Counter("gmail_dropped_total", "Gmail calls or sub-requests given up after max retries.", ("account",))
+
+GMAIL_PUSH_NOTIFICATIONS = Counter(
+    "gmail_push_notifications_total", "users.watch notifications received, by what they led to.", ("outcome",),
+)
+
+# --- Scanner and HTTP layers ----------------------------------------------------
+
+SCANNER_CALL_SECONDS = Histogram(
+    "scanner_call_duration_seconds", "Latency of GmailScanner operations.", ("method", "outcome"),
+)
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds", "Route latency, up to the last body chunk (streams included).",
+    ("method", "route", "status"),
+)
+
+
+def instrument_methods(cls: type[T]) -> type[T]:
+    """Class decorator: time every public coroutine method into SCANNER_CALL_SECONDS."""
+    for name, method in list(vars(cls).items()):
+        if name.startswith("_") or not inspect.iscoroutinefunction(method):
+            continue
+        setattr(cls, name, _timed(method))
+    return cls
+
+
+def _timed(method: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+    @functools.wraps(method)
+    async def wrapper(*args: Any, **kwargs: Any) -> Any:
+        start = time.perf_counter()
+        outcome = "error"
+        try:
+            result = await method(*args, **kwargs)
+            outcome = "ok"
+            return result
+        finally:
+            SCANNER_CALL_SECONDS.observe(time.perf_counter() - start, method=method.__name__, outcome=outcome)
+    return wrapper
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording HTTP_REQUEST_SECONDS per route template (not raw path)."""
+
+    def __init__(self, app: Any) -> None:
+        self.app = app
+
+    async def __call__(self, scope: dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+        status: dict[str, Any] = {"code": 500}
+
+        def observe() -> None:
+            route = scope.get("route")
+            HTTP_REQUEST_SECONDS.observe(
+                time.perf_counter() - start,
+                method=scope["method"],
+                route=getattr(route, "path", "unmatched"),
+                status=status["code"],
+            )
+
+        async def send_wrapper(message: dict[str, Any]) -> None:
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                observe()
+                status["done"] = True
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if not status.get("done"):
+                observe()
@@ -2,22 +2,28 @@
 import os
 import json
 from datetime import datetime, timezone
+from typing import Any
 from fastapi import APIRouter, Depends, Request, HTTPException
 from fastapi.responses import RedirectResponse
 from sqlalchemy.future import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from google_auth_oauthlib.flow import Flow
 from google.oauth2.credentials import Credentials
-from googleapiclient.discovery import build
 
 from app.db.base import get_async_session, User
-from app.config import get_settings
+from app.config import Settings, get_settings
+from app.gmail.client import get_http_client
+from app.gmail.pool import client_pool
+from app.jobs.scheduler import scheduler
+from app.oauth.session import get_current_user, linked_account_ids, sign_in, sign_out
 
 router = APIRouter(prefix="/oauth", tags=["oauth"])
 
+USERINFO_URL = "https://www.googleapis.com/oauth2/v2/userinfo"
+
 # Temporarily storing flow config via client_secret.json (or env vars)
 # For this demo we'll dynamically construct it from settings if present
-def build_client_config(settings):
+def build_client_config(settings: Settings) -> dict[str, Any]:
     client_id = os.environ.get("GOOGLE_CLIENT_ID", settings.GOOGLE_CLIENT_ID)
     client_secret = os.environ.get("GOOGLE_CLIENT_SECRET", settings.GOOGLE_CLIENT_SECRET)
     return {
@@ -33,7 +39,7 @@ def build_client_config(settings):
     }
 
 @router.get("/login")
-async def login(request: Request):
+async def login(request: Request) -> RedirectResponse:
     settings = get_settings()
     scopes = settings.GOOGLE_SCOPES.split(",")
     
@@ -52,7 +58,7 @@ async def login(request: Request):
 
 
 @router.get("/callback")
-async def callback(request: Request, db: AsyncSession = Depends(get_async_session)):
+async def callback(request: Request, db: AsyncSession = Depends(get_async_session)) -> Any:
     try:
         settings = get_settings()
         scopes = settings.GOOGLE_SCOPES.split(",")
@@ -73,9 +79,12 @@ async def callback(request: Request, db: AsyncSession = Depends(get_async_sessio
         
         creds = flow.credentials
         
-        # Fetch user info to store in db
-        service = build('oauth2', 'v2', credentials=creds)
-        user_info = service.userinfo().get().execute()
+        # Fetch user info to store in db (plain REST call on the shared pool, no discovery build)
+        resp = await get_http_client().get(
+            USERINFO_URL, headers={"Authorization": f"Bearer {creds.token}"}
+        )
+        resp.raise_for_status()
+        user_info = resp.json()
         email = user_info['email']
         name = user_info.get('name', '')
         
@@ -97,6 +106,8 @@ async def callback(request: Request, db: AsyncSession = Depends(get_async_sessio
         user.expires_at = current_expiry
         
         await db.commit()
+        # Later requests from this browser act on this account
+        sign_in(request, user)
         
         # Redirect back to UI dashboard
         return RedirectResponse("http://localhost:5173/")
@@ -105,10 +116,46 @@ async def callback(request: Request, db: AsyncSession = Depends(get_async_sessio
         return {"error": str(e), "traceback": traceback.format_exc(), "url": str(request.url)}
 
 @router.get("/me")
-async def get_current_user(db: AsyncSession = Depends(get_async_session)):
-    settings = get_settings()
-    result = await db.execute(select(User).where(User.email == settings.OWNER_EMAIL))
-    user = result.scalars().first()
+async def get_me(user: User = Depends(get_current_user)) -> dict[str, Any]:
     if not user:
         return {"authenticated": False}
-    return {"authenticated": True, "email": user.email, "name": user.name}
+    return {"authenticated": True, "id": user.id, "email": user.email, "name": user.name}
+
+@router.post("/logout")
+async def logout(request: Request) -> dict[str, Any]:
+    sign_out(request)
+    return {"authenticated": False}
+
+@router.get("/accounts")
+async def list_accounts(request: Request, user: User = Depends(get_current_user),
+                        db: AsyncSession = Depends(get_async_session)) -> dict[str, Any]:
+    """Accounts linked in this session, with each one's Gmail quota usage."""
+    ids = linked_account_ids(request)
+    if user and user.id not in ids:
+        ids.append(user.id)
+    turns = scheduler.stats()["turns"]
+    accounts = []
+    for account_id in ids:
+        account = await db.get(User, account_id)
+        if account is None:
+            continue
+        accounts.append({
+            "id": account.id,
+            "email": account.email,
+            "name": account.name,
+            "active": user is not None and account.id == user.id,
+            "usage": {**client_pool.usage(account.id), "scheduler_turns": turns.get(account.id, 0)},
+        })
+    return {"accounts": accounts}
+
+@router.post("/accounts/{account_id}/activate")
+async def activate_account(account_id: int, request: Request,
+                           db: AsyncSession = Depends(get_async_session)) -> dict[str, Any]:
+    # Only accounts this browser has signed in to can be switched to
+    if account_id not in linked_account_ids(request):
+        raise HTTPException(status_code=404, detail="Account not linked to this session")
+    account = await db.get(User, account_id)
+    if account is None:
+        raise HTTPException(status_code=404, detail="Account not linked to this session")
+    sign_in(request, account)
+    return {"authenticated": True, "id": account.id, "email": account.email, "name": account.name}
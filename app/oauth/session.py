@@ -0,0 +1,57 @@
+# app/oauth/session.py
+"""Which mailbox a request acts on.
+
+The OAuth callback records the signed-in account in the (signed cookie) session, along
+with every other account linked in the same browser, so one session can switch between
+mailboxes. Requests without a session are anonymous unless OWNER_FALLBACK=true, which
+makes them act as OWNER_EMAIL; only single-account deployments nobody else can reach
+should turn it on.
+"""
+from typing import Optional
+
+from fastapi import Depends, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.config import get_settings
+from app.db.base import User, get_async_session
+from app.oauth.tokens import token_manager
+
+SESSION_USER = "user_id"
+SESSION_ACCOUNTS = "account_ids"
+
+
+def sign_in(request: Request, user: User) -> None:
+    """Make `user` the session's active account and remember it as linked."""
+    request.session[SESSION_USER] = user.id
+    linked = request.session.get(SESSION_ACCOUNTS, [])
+    if user.id not in linked:
+        request.session[SESSION_ACCOUNTS] = [*linked, user.id]
+
+
+def sign_out(request: Request) -> None:
+    request.session.pop(SESSION_USER, None)
+    request.session.pop(SESSION_ACCOUNTS, None)
+
+
+def linked_account_ids(request: Request) -> list[int]:
+    return list(request.session.get(SESSION_ACCOUNTS, []))
+
+
+async def resolve_user(request: Request, db: AsyncSession) -> Optional[User]:
+    user_id = request.session.get(SESSION_USER)
+    if user_id is not None:
+        return await db.get(User, user_id)
+    settings = get_settings()
+    if not settings.OWNER_FALLBACK:
+        return None
+    result = await db.execute(select(User).where(User.email == settings.OWNER_EMAIL))
+    return result.scalars().first()
+
+
+async def get_current_user(request: Request, db: AsyncSession = Depends(get_async_session)) -> Optional[User]:
+    """FastAPI dependency: the session's active User (token refreshed if due), or None."""
+    user = await resolve_user(request, db)
+    if user is not None:
+        await token_manager.ensure_fresh(user)
+    return user
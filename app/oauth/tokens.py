@@ -0,0 +1,144 @@
+# app/oauth/tokens.py
+"""Access-token refresh ahead of expiry.
+
+A background loop refreshes every token that expires within TOKEN_REFRESH_LEAD_SECONDS.
+It writes the new token to the users table and hands it to the account's pooled Gmail
+client, so long-running scans switch to it between calls. Request handlers also check
+through `ensure_fresh`, which costs nothing unless the loop fell behind. Concurrent
+refreshes for one account collapse into a single call to Google's token endpoint.
+"""
+import asyncio
+import time
+from typing import Callable, Optional
+
+import httpx
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.config import get_settings
+from app.db.base import SessionLocal, User
+from app.gmail.client import get_http_client
+from app.gmail.pool import ClientPool, client_pool
+
+TOKEN_URL = "https://oauth2.googleapis.com/token"
+
+
+class TokenRefreshError(Exception):
+    """Google refused the refresh (e.g. the grant was revoked); the user has to sign in again."""
+
+
+class TokenManager:
+    def __init__(self, session_factory: Callable[[], AsyncSession] = SessionLocal,
+                 http: Optional[httpx.AsyncClient] = None, pool: ClientPool = client_pool,
+                 lead_seconds: Optional[float] = None, interval_seconds: Optional[float] = None,
+                 clock: Callable[[], float] = time.time) -> None:
+        settings = get_settings()
+        self._session_factory = session_factory
+        self._http = http
+        self._pool = pool
+        self.lead_seconds = lead_seconds if lead_seconds is not None else settings.TOKEN_REFRESH_LEAD_SECONDS
+        self.interval_seconds = interval_seconds or settings.TOKEN_REFRESH_INTERVAL_SECONDS
+        self._clock = clock
+        self._inflight: dict[int, asyncio.Task[tuple[str, int]]] = {}  # user_id -> refresh task
+        self._loop_task: Optional[asyncio.Task[None]] = None
+        self.refreshes = 0
+        self.coalesced = 0
+        self.failures = 0
+
+    def needs_refresh(self, user: User) -> bool:
+        if not user.refresh_token or user.expires_at is None:
+            return False
+        return user.expires_at - self._clock() <= self.lead_seconds
+
+    async def ensure_fresh(self, user: User) -> User:
+        """Refresh `user`'s token first if it is (about to be) expired. Never raises."""
+        if self.needs_refresh(user):
+            try:
+                await self.refresh(user)
+            except (TokenRefreshError, httpx.HTTPError):
+                pass  # the Gmail call will surface the 401; a stale token is no worse than none
+        return user
+
+    async def refresh(self, user: User) -> str:
+        """Refresh now, joining the refresh already in flight for this user if there is one."""
+        task = self._inflight.get(user.id)
+        if task is None:
+            task = asyncio.create_task(self._refresh(user.id, user.refresh_token))
+            self._inflight[user.id] = task
+            task.add_done_callback(lambda _: self._inflight.pop(user.id, None))
+        else:
+            self.coalesced += 1
+        # shielded so one cancelled caller doesn't cancel the refresh for everyone else
+        access_token, expires_at = await asyncio.shield(task)
+        user.access_token = access_token
+        user.expires_at = expires_at
+        return access_token
+
+    async def _refresh(self, user_id: int, refresh_token: str) -> tuple[str, int]:
+        settings = get_settings()
+        try:
+            resp = await (self._http or get_http_client()).post(TOKEN_URL, data={
+                "grant_type": "refresh_token",
+                "refresh_token": refresh_token,
+                "client_id": settings.GOOGLE_CLIENT_ID,
+                "client_secret": settings.GOOGLE_CLIENT_SECRET,
+            })
+            if resp.status_code >= 400:
+                raise TokenRefreshError(f"HTTP {resp.status_code}: {resp.text[:200]}")
+        except Exception:
+            self.failures += 1
+            raise
+        payload = resp.json()
+        access_token: str = payload["access_token"]
+        expires_at = int(self._clock()) + int(payload.get("expires_in", 3600))
+
+        async with self._session_factory() as session:
+            user = await session.get(User, user_id)
+            if user is not None:
+                user.access_token = access_token
+                user.expires_at = expires_at
+                if payload.get("refresh_token"):  # Google may rotate it
+                    user.refresh_token = payload["refresh_token"]
+                await session.commit()
+        self._pool.update_token(user_id, access_token)
+        self.refreshes += 1
+        return access_token, expires_at
+
+    async def refresh_due(self) -> int:
+        """Refresh every stored token expiring within the lead time. Returns how many were refreshed."""
+        async with self._session_factory() as session:
+            result = await session.execute(
+                select(User).where(
+                    User.refresh_token.is_not(None),
+                    User.expires_at.is_not(None),
+                    User.expires_at <= int(self._clock()) + self.lead_seconds,
+                )
+            )
+            users = result.scalars().all()
+        outcomes = await asyncio.gather(*(self.refresh(u) for u in users), return_exceptions=True)
+        return sum(1 for o in outcomes if not isinstance(o, BaseException))
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.refresh_due()
+            except Exception:
+                self.failures += 1  # e.g. the database isn't reachable yet; try again next round
+            await asyncio.sleep(self.interval_seconds)
+
+    def start(self) -> None:
+        if self._loop_task is None or self._loop_task.done():
+            self._loop_task = asyncio.create_task(self._run())
+
+    async def shutdown(self) -> None:
+        tasks = [t for t in (self._loop_task, *self._inflight.values()) if t is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._loop_task = None
+
+    def stats(self) -> dict[str, int]:
+        return {"refreshes": self.refreshes, "coalesced": self.coalesced, "failures": self.failures}
+
+
+token_manager = TokenManager()
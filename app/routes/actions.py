@@ -1,127 +1,324 @@
 # app/routes/actions.py
+import asyncio
+import json
+from typing import Any, AsyncIterator, Awaitable, Callable, List, Optional
 from datetime import datetime, timezone
 from fastapi import APIRouter, HTTPException, Depends
+from fastapi.responses import StreamingResponse
+from sqlalchemy import update
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.db.base import get_async_session, AuditLog
-from app.routes.senders import get_senders
+from app.db.base import get_async_session, AuditLog, SessionLocal, UndoWindow, User
+from app.oauth.session import get_current_user
+from app.jobs import index, plans, undo
+from app.jobs.scanner import GmailScanner, Progress
+from app.jobs.runner import refresh_index
 
 router = APIRouter(prefix="", tags=["actions"])
 
+# The pieces an action route hands to _execute
+Run = Callable[..., Awaitable[dict[str, Any]]]
+Audit = Callable[[AsyncSession, dict[str, Any]], Awaitable[None]]
+Salvage = Callable[[AsyncSession], Awaitable[Optional[str]]]
+
+_EMPTY_PLAN_SENDERS = [{
+    "sender": "clean-inbox-demo@example.com",
+    "emails_affected": 0,
+    "recommended_action": "keep",
+    "confidence": 1.0,
+    "risk_score": 0.0
+}]
+
 @router.post("/plan/generate")
-async def generate_plan(db: AsyncSession = Depends(get_async_session)):
-    senders = await get_senders(db)
-    
-    plan_senders = []
-    total_affected = 0
-    for s in senders:
-        if s.get("suggested_action") == "unsubscribe":
-            total_affected += s["total_emails"]
-            plan_senders.append({
-                "sender": s["email"],
-                "emails_affected": s["total_emails"],
-                "recommended_action": "unsubscribe",
-                "confidence": 0.95,  # Real logic would use ML models
-                "risk_score": 0.05
-            })
-            
-    if not plan_senders:
-        plan_senders.append({
-            "sender": "clean-inbox-demo@example.com",
-            "emails_affected": 0,
-            "recommended_action": "keep",
-            "confidence": 1.0,
-            "risk_score": 0.0
-        })
+async def generate_plan(rebuild: bool = False, user: User = Depends(get_current_user),
+                        db: AsyncSession = Depends(get_async_session)) -> dict[str, Any]:
+    if not user or not user.access_token:
+        raise HTTPException(status_code=401, detail="User not authenticated")
 
-    return {
-        "plan_id": "active-plan-842",
-        "created_at": datetime.now(timezone.utc).isoformat(),
-        "senders": plan_senders,
-        "summary": {
-            "total_emails": total_affected,
-            "estimated_cleanup_percent": 12
+    # Syncing also patches the latest stored plan, so it is reused unless a rebuild is asked for
+    await refresh_index(user)
+    plan_id = None if rebuild else await plans.latest_plan_id(db, user.id)
+    if plan_id is None:
+        plan_id = await plans.create_plan(db, user.id)
+
+    plan = await plans.get_plan(db, user.id, plan_id) if plan_id else None
+    if plan is None:
+        return {
+            "plan_id": None,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "senders": _EMPTY_PLAN_SENDERS,
+            "summary": {"senders": 0, "total_emails": 0, "estimated_cleanup_percent": 0}
         }
-    }
+    return plan
 
 @router.get("/plan/{plan_id}")
-async def get_plan(plan_id: str, db: AsyncSession = Depends(get_async_session)):
-    return await generate_plan(db)
+async def get_plan(plan_id: str, page_token: Optional[str] = None, limit: Optional[int] = None,
+                   user: User = Depends(get_current_user),
+                   db: AsyncSession = Depends(get_async_session)) -> dict[str, Any]:
+    if not user or not user.access_token:
+        raise HTTPException(status_code=401, detail="User not authenticated")
+
+    offset = int(page_token) if page_token and page_token.isdigit() else 0
+    plan = await plans.get_plan(db, user.id, plan_id, offset, limit)
+    if plan is None:
+        raise HTTPException(status_code=404, detail="Plan not found")
+    return plan
 
-from typing import Optional
 from pydantic import BaseModel
 
 class ActionRequest(BaseModel):
     target_email: str
     action_type: str
     list_unsubscribe: Optional[str] = None
+    list_unsubscribe_post: Optional[str] = None
+    # "bulk" = batchModify (1000 ids per call), "per_message" = one sub-request per message
+    mode: str = "bulk"
+    # Stream per-page progress as NDJSON instead of waiting for the final result
+    stream: bool = False
+
+MUTATION_MODES = ("bulk", "per_message")
+
+class PlanItem(BaseModel):
+    # Same shape as the entries returned by /plan/generate
+    sender: str
+    recommended_action: str
+    list_unsubscribe: Optional[str] = None
+    list_unsubscribe_post: Optional[str] = None
+
+class PlanExecutionRequest(BaseModel):
+    senders: List[PlanItem]
+    mode: str = "bulk"
+    # Stream one {"event": "sender"} line per finished sender
+    stream: bool = False
+
+def _stream_progress(run: Run, audit: Audit, salvage: Salvage, event: str = "progress") -> StreamingResponse:
+    """NDJSON body: one {"event": <event>} line per progress callback, then the audited result.
+
+    If the action fails, the error line carries the `undo_id` of whatever it had changed already.
+    """
+    async def body() -> AsyncIterator[str]:
+        queue: asyncio.Queue[Optional[dict[str, Any]]] = asyncio.Queue()
+
+        async def worker() -> None:
+            try:
+                result = await run(lambda progress: queue.put_nowait({"event": event, **progress}))
+                async with SessionLocal() as session:
+                    await audit(session, result)
+                queue.put_nowait({"event": "done", **result})
+            except Exception as e:
+                async with SessionLocal() as session:
+                    undo_id = await salvage(session)
+                queue.put_nowait({"event": "error", "detail": str(e), "undo_id": undo_id})
+            finally:
+                queue.put_nowait(None)
+
+        task = asyncio.create_task(worker())
+        while (item := await queue.get()) is not None:
+            yield json.dumps(item) + "\n"
+        await task
+
+    return StreamingResponse(body(), media_type="application/x-ndjson")
+
+def _open_undo_window(session: AsyncSession, user: User, action_type: str, journal: undo.UndoJournal,
+                      execution_result: dict[str, Any], description: str) -> None:
+    """Store the action's journal and hand its id back to the client as `undo_id`."""
+    window = undo.record(session, user.id, action_type, journal, description)
+    execution_result["undo_id"] = window.action_id if window else None
+
+async def _open_partial_undo_window(session: AsyncSession, user: User, action_type: str, journal: undo.UndoJournal,
+                                    description: str) -> Optional[str]:
+    """After an action failed partway: store the journal of what it did change, so those
+    messages can still be put back. Returns the window's id, or None if nothing changed."""
+    window = undo.record(session, user.id, action_type, journal, f"{description} (failed partway)")
+    if window is None:
+        return None
+    await session.commit()
+    return window.action_id
+
+async def _execute(run: Run, audit: Audit, salvage: Salvage, db: AsyncSession, stream: bool = False,
+                   event: str = "progress") -> Any:
+    """Run an action and audit it, streaming progress if asked. A failure after some
+    messages were changed answers 502 with the `undo_id` for those changes."""
+    if stream:
+        return _stream_progress(run, audit, salvage, event)
+    try:
+        execution_result = await run()
+    except Exception as e:
+        undo_id = await salvage(db)
+        if undo_id is None:
+            raise
+        raise HTTPException(status_code=502, detail={"error": str(e), "undo_id": undo_id})
+    await audit(db, execution_result)
+    return execution_result
 
 @router.post("/plan/execute")
-async def execute_plan(request: ActionRequest, db: AsyncSession = Depends(get_async_session)):
-    settings = get_settings()
-    result = await db.execute(select(User).where(User.email == settings.OWNER_EMAIL))
-    user = result.scalars().first()
-    
+async def execute_plan(request: ActionRequest, user: User = Depends(get_current_user),
+                       db: AsyncSession = Depends(get_async_session)) -> Any:
     if not user or not user.access_token:
         raise HTTPException(status_code=401, detail="User not authenticated")
+    if request.mode not in MUTATION_MODES:
+        raise HTTPException(status_code=400, detail=f"mode must be one of {', '.join(MUTATION_MODES)}")
 
     scanner = GmailScanner(user)
-    import asyncio
-    
-    execution_result = await asyncio.to_thread(scanner.execute_action, request.target_email, request.action_type, request.list_unsubscribe)
-    
-    # Immutable audit logging for executed system actions
-    new_log = AuditLog(
-        id=f"action-{datetime.now().timestamp()}",
-        event_type=f"execute_{request.action_type}",
-        details=f"Successfully processed {execution_result['messages_affected']} emails for {target_email}."
-    )
-    db.add(new_log)
-    await db.commit()
-    
-    return execution_result
+    journal = undo.UndoJournal()
+    # Every exact address the index has seen behind this sender identity
+    addresses = (await index.sender_addresses(db, user.id, [request.target_email]))[request.target_email]
+
+    async def run(on_progress: Optional[Progress] = None) -> dict[str, Any]:
+        return await scanner.execute_action(
+            request.target_email, request.action_type, request.list_unsubscribe, request.mode, on_progress, journal,
+            request.list_unsubscribe_post, addresses,
+        )
+
+    async def audit(session: AsyncSession, execution_result: dict[str, Any]) -> None:
+        _open_undo_window(session, user, request.action_type, journal, execution_result,
+                          f"{request.action_type} {request.target_email}")
+        # Immutable audit logging for executed system actions
+        session.add(AuditLog(
+            id=f"action-{datetime.now().timestamp()}",
+            user_id=user.id,
+            event_type=f"execute_{request.action_type}",
+            details=f"Successfully processed {execution_result['messages_affected']} emails for {request.target_email} "
+                    f"across {execution_result['pages']} pages in {execution_result['api_calls']} API calls "
+                    f"({execution_result['api_calls_saved']} saved by bulk mode)."
+        ))
+        await session.commit()
+
+    async def salvage(session: AsyncSession) -> Optional[str]:
+        return await _open_partial_undo_window(session, user, request.action_type, journal,
+                                               f"{request.action_type} {request.target_email}")
+
+    return await _execute(run, audit, salvage, db, request.stream)
+
+@router.post("/plan/execute-all")
+async def execute_whole_plan(request: PlanExecutionRequest, user: User = Depends(get_current_user),
+                             db: AsyncSession = Depends(get_async_session)) -> Any:
+    if not user or not user.access_token:
+        raise HTTPException(status_code=401, detail="User not authenticated")
+    if request.mode not in MUTATION_MODES:
+        raise HTTPException(status_code=400, detail=f"mode must be one of {', '.join(MUTATION_MODES)}")
+
+    # One scanner (and so one pooled client and quota budget) for the whole plan
+    scanner = GmailScanner(user)
+    items = [(s.sender, s.recommended_action, s.list_unsubscribe, s.list_unsubscribe_post) for s in request.senders]
+    journal = undo.UndoJournal()
+    addresses = await index.sender_addresses(db, user.id, [s.sender for s in request.senders])
+
+    async def run(on_result: Optional[Progress] = None) -> dict[str, Any]:
+        return await scanner.execute_plan(items, request.mode, on_result=on_result, journal=journal,
+                                          addresses=addresses)
+
+    async def audit(session: AsyncSession, execution_result: dict[str, Any]) -> None:
+        _open_undo_window(session, user, "plan", journal, execution_result,
+                          f"plan over {execution_result['senders']} senders")
+        # One summarized entry for the whole plan
+        session.add(AuditLog(
+            id=f"plan-{datetime.now().timestamp()}",
+            user_id=user.id,
+            event_type="execute_plan",
+            details=f"Executed plan over {execution_result['senders']} senders "
+                    f"({execution_result['succeeded']} succeeded, {execution_result['failed']} failed, "
+                    f"{execution_result['skipped']} skipped) in {execution_result['query_groups']} query groups: "
+                    f"{execution_result['messages_affected']} emails processed in {execution_result['api_calls']} "
+                    f"API calls."
+        ))
+        await session.commit()
+
+    async def salvage(session: AsyncSession) -> Optional[str]:
+        return await _open_partial_undo_window(session, user, "plan", journal, f"plan over {len(items)} senders")
+
+    return await _execute(run, audit, salvage, db, request.stream, event="sender")
 
 @router.post("/action/undo/{action_id}")
-def undo_action(action_id: str):
+async def undo_action(action_id: str, user: User = Depends(get_current_user),
+                      db: AsyncSession = Depends(get_async_session)) -> dict[str, Any]:
+    if not user or not user.access_token:
+        raise HTTPException(status_code=401, detail="User not authenticated")
+
+    window = await undo.find_window(db, user.id, action_id)
+    if window is None:
+        raise HTTPException(status_code=404, detail="Action not found")
+    status = undo.window_status(window)
+    if status not in undo.UNDOABLE:
+        raise HTTPException(status_code=409, detail=f"Action can no longer be undone ({status})")
+    previous = window.status
+    if not await undo.claim(db, window):
+        raise HTTPException(status_code=409, detail="Action can no longer be undone (reverting)")
+
+    try:
+        restored, api_calls, remaining = await GmailScanner(user).revert(undo.UndoJournal.loads(window.journal))
+    except Exception:
+        # Nothing is recorded as restored, so the whole journal can be replayed on a retry
+        await db.execute(
+            update(UndoWindow).where(UndoWindow.id == window.id).values(status=previous)
+            .execution_options(synchronize_session="fetch")
+        )
+        await db.commit()
+        raise
+    partial = len(remaining) > 0
+    if partial:
+        # Keep what is left so the undo can be retried while the window is open
+        window.status = "partial"
+        window.journal = remaining.dumps()
+    else:
+        window.status = "undone"
+        window.undone_at = datetime.utcnow()
+    db.add(AuditLog(
+        id=f"undo-{datetime.now().timestamp()}",
+        user_id=user.id,
+        event_type="undo",
+        details=f"Restored {restored} of {window.message_count} emails from {window.description} "
+                f"in {api_calls} API calls" + (f"; {len(remaining)} still to restore." if partial else ".")
+    ))
+    await db.commit()
     return {
         "action_id": action_id,
-        "status": "undone",
-        "message": "Action successfully reversed"
+        "status": window.status,
+        "partial": partial,
+        "messages_restored": restored,
+        "messages_remaining": len(remaining),
+        "api_calls": api_calls,
+        "message": "Action partially reversed; retry to restore the rest" if partial else "Action successfully reversed"
     }
 
 @router.get("/undo/status/{action_id}")
-def get_undo_status(action_id: str):
-    return {
-        "action_id": action_id,
-        "status": "available",
-        "expires_in_seconds": 3600
-    }
+async def get_undo_status(action_id: str, user: User = Depends(get_current_user),
+                          db: AsyncSession = Depends(get_async_session)) -> dict[str, Any]:
+    if not user or not user.access_token:
+        raise HTTPException(status_code=401, detail="User not authenticated")
+
+    window = await undo.find_window(db, user.id, action_id)
+    if window is None:
+        raise HTTPException(status_code=404, detail="Action not found")
+    return undo.serialize_window(window)
 
 @router.delete("/categories/{category_name}")
-async def wipe_category(category_name: str, db: AsyncSession = Depends(get_async_session)):
-    from app.config import get_settings
-    from sqlalchemy.future import select
-    from app.db.base import User
-    from app.jobs.scanner import GmailScanner
-    
-    settings = get_settings()
-    result = await db.execute(select(User).where(User.email == settings.OWNER_EMAIL))
-    user = result.scalars().first()
-    
+async def wipe_category(category_name: str, mode: str = "bulk", stream: bool = False,
+                        user: User = Depends(get_current_user),
+                        db: AsyncSession = Depends(get_async_session)) -> Any:
     if not user or not user.access_token:
         raise HTTPException(status_code=401, detail="User not authenticated")
 
+    if mode not in MUTATION_MODES:
+        raise HTTPException(status_code=400, detail=f"mode must be one of {', '.join(MUTATION_MODES)}")
+
     scanner = GmailScanner(user)
-    import asyncio
-    
-    execution_result = await asyncio.to_thread(scanner.execute_category_wipe, category_name)
-    
-    # Immutable audit logging
-    new_log = AuditLog(
-        id=f"wipe-{datetime.now().timestamp()}",
-        event_type="wipe_category",
-        details=f"Successfully trashed {execution_result['messages_affected']} emails in {category_name}."
-    )
-    db.add(new_log)
-    await db.commit()
-    
-    return execution_result
\ No newline at end of file
+    journal = undo.UndoJournal()
+
+    async def run(on_progress: Optional[Progress] = None) -> dict[str, Any]:
+        return await scanner.execute_category_wipe(category_name, mode, on_progress, journal)
+
+    async def audit(session: AsyncSession, execution_result: dict[str, Any]) -> None:
+        _open_undo_window(session, user, "wipe_category", journal, execution_result, f"wipe {category_name}")
+        # Immutable audit logging
+        session.add(AuditLog(
+            id=f"wipe-{datetime.now().timestamp()}",
+            user_id=user.id,
+            event_type="wipe_category",
+            details=f"Successfully trashed {execution_result['messages_affected']} emails in {category_name}."
+        ))
+        await session.commit()
+
+    async def salvage(session: AsyncSession) -> Optional[str]:
+        return await _open_partial_undo_window(session, user, "wipe_category", journal, f"wipe {category_name}")
+
+    return await _execute(run, audit, salvage, db, stream)
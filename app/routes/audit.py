@@ -1,28 +1,147 @@
 # app/routes/audit.py
-from datetime import datetime, timezone
-from fastapi import APIRouter
-
-router = APIRouter(prefix="/audit", tags=["audit"])
+import base64
+import csv
+import io
+import json
+from datetime import datetime
+from typing import Any, AsyncIterator, List, Optional, Sequence
 
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Select, and_, or_
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from fastapi import Depends
-from app.db.base import get_async_session, AuditLog
+
+from app.db.base import get_async_session, AuditLog, SessionLocal, User
+from app.oauth.session import get_current_user
+
+router = APIRouter(prefix="/audit", tags=["audit"])
+
+MAX_PAGE_SIZE = 500
+EXPORT_CHUNK = 1000
+EXPORT_FORMATS = ("ndjson", "csv")
+CSV_COLUMNS = ("id", "timestamp", "event_type", "details")
+
+
+def encode_cursor(log: AuditLog) -> str:
+    return base64.urlsafe_b64encode(f"{log.timestamp.isoformat()}|{log.id}".encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, str]:
+    try:
+        timestamp, log_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|", 1)
+        return datetime.fromisoformat(timestamp), log_id
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def audit_query(user_id: int, event_type: Optional[List[str]] = None, since: Optional[datetime] = None,
+                until: Optional[datetime] = None,
+                after: Optional[tuple[datetime, str]] = None) -> Select[Any]:
+    """Newest-first select of one account's AuditLog rows; `after` is a (timestamp, id)
+    keyset position to continue from."""
+    stmt = (
+        select(AuditLog)
+        .where(AuditLog.user_id == user_id)
+        .order_by(AuditLog.timestamp.desc(), AuditLog.id.desc())
+    )
+    if event_type:
+        stmt = stmt.where(AuditLog.event_type.in_(event_type))
+    if since is not None:
+        stmt = stmt.where(AuditLog.timestamp >= since)
+    if until is not None:
+        stmt = stmt.where(AuditLog.timestamp < until)
+    if after is not None:
+        timestamp, log_id = after
+        stmt = stmt.where(or_(
+            AuditLog.timestamp < timestamp,
+            and_(AuditLog.timestamp == timestamp, AuditLog.id < log_id),
+        ))
+    return stmt
+
+
+def serialize_log(log: AuditLog) -> dict[str, Any]:
+    return {
+        "id": log.id,
+        "timestamp": log.timestamp,
+        "event_type": log.event_type,
+        "details": log.details
+    }
+
 
 @router.get("/logs")
-async def get_audit_logs(db: AsyncSession = Depends(get_async_session)):
-    result = await db.execute(select(AuditLog).order_by(AuditLog.timestamp.desc()).limit(50))
-    logs = result.scalars().all()
-    
-    if not logs:
-        return []
-        
-    return [
-        {
-            "id": log.id,
-            "timestamp": log.timestamp,
-            "event_type": log.event_type,
-            "details": log.details
-        }
-        for log in logs
-    ]
+async def get_audit_logs(
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    event_type: Optional[List[str]] = Query(None),
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_session),
+) -> list[dict[str, Any]]:
+    """One page of the signed-in account's logs, newest first. The body stays a plain list;
+    the cursor for the next page comes back in the X-Next-Cursor header (absent on the last page)."""
+    if not user:
+        raise HTTPException(status_code=401, detail="User not authenticated")
+    after = decode_cursor(cursor) if cursor else None
+    stmt = audit_query(user.id, event_type, since, until, after).limit(limit + 1)
+    logs = (await db.execute(stmt)).scalars().all()
+    if len(logs) > limit:
+        logs = logs[:limit]
+        response.headers["X-Next-Cursor"] = encode_cursor(logs[-1])
+    return [serialize_log(log) for log in logs]
+
+
+async def _iter_logs(user_id: int, event_type: Optional[List[str]], since: Optional[datetime],
+                     until: Optional[datetime]) -> AsyncIterator[Sequence[AuditLog]]:
+    """Every matching log of the account, fetched EXPORT_CHUNK rows at a time by keyset, so memory stays flat."""
+    after: Optional[tuple[datetime, str]] = None
+    async with SessionLocal() as session:
+        while True:
+            stmt = audit_query(user_id, event_type, since, until, after).limit(EXPORT_CHUNK)
+            logs = (await session.execute(stmt)).scalars().all()
+            # Rows already streamed don't need to stay in the identity map
+            session.expunge_all()
+            if not logs:
+                return
+            yield logs
+            if len(logs) < EXPORT_CHUNK:
+                return
+            after = (logs[-1].timestamp, logs[-1].id)
+
+
+@router.get("/logs/export")
+async def export_audit_logs(
+    format: str = "ndjson",
+    event_type: Optional[List[str]] = Query(None),
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    user: User = Depends(get_current_user),
+) -> StreamingResponse:
+    if not user:
+        raise HTTPException(status_code=401, detail="User not authenticated")
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {', '.join(EXPORT_FORMATS)}")
+
+    async def ndjson() -> AsyncIterator[str]:
+        async for logs in _iter_logs(user.id, event_type, since, until):
+            yield "".join(
+                json.dumps({**serialize_log(log), "timestamp": log.timestamp.isoformat()}) + "\n" for log in logs
+            )
+
+    async def csv_rows() -> AsyncIterator[str]:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(CSV_COLUMNS)
+        async for logs in _iter_logs(user.id, event_type, since, until):
+            writer.writerows((log.id, log.timestamp.isoformat(), log.event_type, log.details) for log in logs)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        yield buffer.getvalue()  # just the header when nothing matched
+
+    if format == "csv":
+        return StreamingResponse(csv_rows(), media_type="text/csv",
+                                 headers={"Content-Disposition": 'attachment; filename="audit_logs.csv"'})
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
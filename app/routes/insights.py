@@ -1,12 +1,16 @@
+from typing import Any
+
 from fastapi import APIRouter, Depends
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.db.base import get_async_session
+from app.db.base import get_async_session, User
+from app.oauth.session import get_current_user
 from app.routes.senders import get_senders
 
 router = APIRouter(prefix="/insights", tags=["insights"])
 
 @router.get("/unsubscribe-candidates")
-async def get_unsubscribe_candidates(db: AsyncSession = Depends(get_async_session)):
-    payload = await get_senders(db=db)
+async def get_unsubscribe_candidates(user: User = Depends(get_current_user),
+                                     db: AsyncSession = Depends(get_async_session)) -> list[dict[str, Any]]:
+    payload = await get_senders(user=user, db=db)
     senders = payload.get("senders", [])
     return [s for s in senders if s["suggested_action"] == "unsubscribe"]
\ No newline at end of file
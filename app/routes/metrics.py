@@ -0,0 +1,81 @@
+# app/routes/metrics.py
+from typing import Sequence, Union
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from app import metrics
+from app.gmail.pool import client_pool
+from app.jobs.push import push_sync
+from app.jobs.runner import index_refreshes, runner
+from app.jobs.scanner import read_flight
+from app.jobs.scheduler import scheduler
+from app.jobs.unsubscribe import dispatcher
+from app.oauth.tokens import token_manager
+from app.routes.scan import summary_cache
+from app.routes.senders import sender_cache
+
+router = APIRouter(tags=["metrics"])
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _gauge(name: str, documentation: str, labelnames: Sequence[str] = ()) -> metrics.Gauge:
+    return metrics.Gauge(name, documentation, labelnames, register=False)
+
+
+def _counter(name: str, documentation: str, labelnames: Sequence[str] = ()) -> metrics.Counter:
+    # Built fresh per scrape, so one inc() exports the running total the object keeps
+    return metrics.Counter(name, documentation, labelnames, register=False)
+
+
+def runtime_metrics() -> list[Union[metrics.Gauge, metrics.Counter]]:
+    """Point-in-time values and running totals read from the live objects at scrape time."""
+    jobs = _gauge("background_tasks_in_flight", "Background work held by this process.", ("kind",))
+    jobs.set(runner.in_flight, kind="scan_jobs")
+    jobs.set(dispatcher.in_flight, kind="unsubscribes")
+
+    stats = scheduler.stats()
+    turns = _gauge("scheduler_turns", "Fair-scheduler slots: configured, busy and waiting turns.", ("state",))
+    turns.set(stats["slots"], state="slots")
+    turns.set(stats["busy"], state="busy")
+    turns.set(sum(stats["waiting"].values()), state="waiting")
+    accounts = _gauge("scheduler_accounts_waiting", "Accounts with Gmail work queued for a turn.")
+    accounts.set(len(stats["waiting"]))
+
+    cache_hits = _counter("cache_hits_total", "In-process cache hits since start.", ("cache",))
+    cache_misses = _counter("cache_misses_total", "In-process cache misses since start.", ("cache",))
+    cache_size = _gauge("cache_entries", "Entries currently cached.", ("cache",))
+    caches = (("scan_summary", summary_cache), ("senders", sender_cache), ("scanner_reads", read_flight.cache))
+    for name, cache in caches:
+        if cache is None:
+            continue
+        cache_stats = cache.stats()
+        cache_hits.inc(cache_stats["hits"], cache=name)
+        cache_misses.inc(cache_stats["misses"], cache=name)
+        cache_size.set(cache_stats["size"], cache=name)
+
+    saved = _counter("coalesced_calls_saved_total", "Upstream calls avoided by request coalescing.", ("layer",))
+    saved.inc(read_flight.stats()["calls_saved"], layer="scanner_reads")
+    saved.inc(index_refreshes.stats()["calls_saved"], layer="index_refreshes")
+
+    clients = _gauge("gmail_pooled_clients", "Per-account Gmail clients in the pool.")
+    clients.set(len(client_pool))
+
+    tokens = _counter("oauth_token_refreshes_total", "Access-token refreshes since start, by kind.", ("kind",))
+    for kind, value in token_manager.stats().items():
+        tokens.inc(value, kind=kind)
+
+    push_stats = push_sync.stats()
+    push = _counter("gmail_push_syncs_total", "History syncs triggered by push notifications, by outcome.",
+                    ("outcome",))
+    push.inc(push_stats["syncs"], outcome="synced")
+    push.inc(push_stats["failures"], outcome="failed")
+    syncing = _gauge("gmail_push_syncs_in_flight", "Push-triggered history syncs running now.")
+    syncing.set(push_stats["syncing"])
+    return [jobs, turns, accounts, cache_hits, cache_misses, cache_size, saved, clients, tokens, push, syncing]
+
+
+@router.get("/metrics", include_in_schema=False)
+async def get_metrics() -> PlainTextResponse:
+    return PlainTextResponse(metrics.render(runtime_metrics()), media_type=CONTENT_TYPE)
@@ -0,0 +1,84 @@
+# app/routes/push.py
+import base64
+import binascii
+import json
+import secrets
+from typing import Any, Optional
+
+from fastapi import APIRouter, Body, Depends, HTTPException, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import metrics
+from app.config import get_settings
+from app.db.base import get_async_session, SyncState, User
+from app.jobs.push import PushNotConfigured, push_sync
+from app.oauth.session import get_current_user
+
+router = APIRouter(prefix="/push", tags=["push"])
+
+
+def _decode(envelope: dict[str, Any]) -> Optional[tuple[str, int]]:
+    """(emailAddress, historyId) from a Pub/Sub push envelope, or None if it isn't one."""
+    try:
+        data = json.loads(base64.b64decode(envelope["message"]["data"]))
+        return data["emailAddress"], int(data["historyId"])
+    except (KeyError, TypeError, ValueError, binascii.Error):
+        return None
+
+
+@router.post("/gmail", status_code=204)
+async def receive_gmail_notification(envelope: dict = Body(...), token: Optional[str] = None) -> Response:
+    """Pub/Sub push endpoint for Gmail watch notifications.
+
+    The subscription's push URL carries `?token=PUSH_VERIFICATION_TOKEN`. Without both
+    GMAIL_PUSH_TOPIC and a token configured the endpoint doesn't exist (404), so it can't
+    be used to trigger syncs. The sync runs in the background, so Pub/Sub gets its ack at
+    once; anything 2xx acks, so a notification for an account we don't know is acked too
+    rather than redelivered forever.
+    """
+    settings = get_settings()
+    if not settings.GMAIL_PUSH_TOPIC or not settings.PUSH_VERIFICATION_TOKEN:
+        raise HTTPException(status_code=404, detail="Push notifications are not configured")
+    if not secrets.compare_digest(token or "", settings.PUSH_VERIFICATION_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid push token")
+    notification = _decode(envelope)
+    if notification is None:
+        metrics.GMAIL_PUSH_NOTIFICATIONS.inc(outcome="invalid")
+        raise HTTPException(status_code=400, detail="Not a Gmail push notification")
+    await push_sync.notify(*notification)
+    return Response(status_code=204)
+
+
+@router.post("/watch")
+async def start_watch(user: User = Depends(get_current_user),
+                      db: AsyncSession = Depends(get_async_session)) -> dict[str, Any]:
+    if not user or not user.access_token:
+        raise HTTPException(status_code=401, detail="User not authenticated")
+    try:
+        return await push_sync.watch(db, user)
+    except PushNotConfigured:
+        raise HTTPException(status_code=409, detail="GMAIL_PUSH_TOPIC is not configured")
+
+
+@router.delete("/watch", status_code=204)
+async def stop_watch(user: User = Depends(get_current_user), db: AsyncSession = Depends(get_async_session)) -> Response:
+    if not user or not user.access_token:
+        raise HTTPException(status_code=401, detail="User not authenticated")
+    await push_sync.stop(db, user)
+    return Response(status_code=204)
+
+
+@router.get("/status")
+async def get_push_status(user: User = Depends(get_current_user),
+                          db: AsyncSession = Depends(get_async_session)) -> dict[str, Any]:
+    if not user:
+        raise HTTPException(status_code=401, detail="User not authenticated")
+    state = await db.get(SyncState, user.id)
+    expires_at = state.watch_expires_at if state is not None else None
+    return {
+        "topic": get_settings().GMAIL_PUSH_TOPIC or None,
+        "watch_expires_at": expires_at.isoformat() if expires_at else None,
+        "history_id": state.history_id if state is not None else None,
+        "last_synced_at": state.last_synced_at.isoformat() if state is not None and state.last_synced_at else None,
+        **push_sync.stats(),
+    }
@@ -38,7 +38,7 @@ startxref
     return pdf.encode("latin-1")
 
 @router.get("/latest")
-def latest_report():
+def latest_report() -> JSONResponse:
     now = datetime.now(timezone.utc).isoformat()
     return JSONResponse(
         {
@@ -53,9 +53,9 @@ def latest_report():
     )
 
 @router.get("/latest.pdf")
-def latest_report_pdf():
+def latest_report_pdf() -> StreamingResponse:
     now = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S UTC")
-    content = _minimal_pdf_bytes(f"Gmail Inbox Cleaner — Report ({now})")
+    content = _minimal_pdf_bytes(f"Gmail Inbox Cleaner - Report ({now})")
     return StreamingResponse(
         iter([content]),
         media_type="application/pdf",
@@ -1,21 +1,27 @@
 # app/routes/scan.py
 from datetime import datetime, timezone
+from typing import Any
+
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.future import select
 
-from app.db.base import get_async_session, User
-from app.jobs.scanner import GmailScanner
+from app.cache import TTLCache
+from app.db.base import get_async_session, ScanJob, User
+from app.gmail.client import GmailAPIError
+from app.jobs import index
+from app.jobs.scanner import GmailScanner, read_flight
+from app.jobs.runner import index_refreshes, job_progress, refresh_index, runner
 from app.config import get_settings
+from app.oauth.session import get_current_user
 
 router = APIRouter(prefix="/scan", tags=["scan"])
 
+# Live Gmail summaries served while the first full scan is still filling the index
+summary_cache = TTLCache(ttl_seconds=get_settings().SUMMARY_CACHE_TTL_SECONDS)
+
 @router.get("/summary")
-async def get_scan_summary(db: AsyncSession = Depends(get_async_session)):
-    settings = get_settings()
-    result = await db.execute(select(User).where(User.email == settings.OWNER_EMAIL))
-    user = result.scalars().first()
-    
+async def get_scan_summary(user: User = Depends(get_current_user),
+                           db: AsyncSession = Depends(get_async_session)) -> dict[str, Any]:
     if not user or not user.access_token:
         # Return graceful mock if OAuth isn't complete (User UX)
         return {
@@ -26,7 +32,52 @@ async def get_scan_summary(db: AsyncSession = Depends(get_async_session)):
             "last_scan_at": datetime.now(timezone.utc).isoformat()
         }
         
-    # Execute actual read-only Gmail Scan
-    scanner = GmailScanner(user)
-    import asyncio
-    return await asyncio.to_thread(scanner.get_scan_summary)
+    # Serve from the local message index once it has been filled
+    sync = await refresh_index(user)
+    if sync["mode"] != "needs_full":
+        return await index.summary(db, user.id)
+
+    summary: dict[str, Any] = summary_cache.get(user.id)
+    if summary is None:
+        try:
+            summary = await GmailScanner(user).get_scan_summary()
+        except GmailAPIError as e:
+            # Nothing is cached, so the next load asks Gmail again
+            raise HTTPException(status_code=503 if e.retryable else 502, detail=str(e))
+        summary_cache.set(user.id, summary)
+    return summary
+
+@router.get("/coalescing/stats")
+async def get_coalescing_stats(user: User = Depends(get_current_user)) -> dict[str, Any]:
+    """How many upstream Gmail reads and index syncs concurrent identical requests saved."""
+    if not user:
+        raise HTTPException(status_code=401, detail="User not authenticated")
+    return {"scanner_reads": read_flight.stats(), "index_refreshes": index_refreshes.stats()}
+
+@router.post("/jobs")
+async def start_scan_job(user: User = Depends(get_current_user),
+                         db: AsyncSession = Depends(get_async_session)) -> dict[str, Any]:
+    if not user or not user.access_token:
+        raise HTTPException(status_code=401, detail="User not authenticated")
+
+    job = await runner.enqueue(db, user)
+    return job_progress(job)
+
+async def _user_job(db: AsyncSession, user: User, job_id: str) -> ScanJob:
+    job = await db.get(ScanJob, job_id)
+    # Another account's job is reported as missing rather than forbidden
+    if job is None or user is None or job.user_id != user.id:
+        raise HTTPException(status_code=404, detail="Scan job not found")
+    return job
+
+@router.get("/jobs/{job_id}")
+async def get_scan_job(job_id: str, user: User = Depends(get_current_user),
+                       db: AsyncSession = Depends(get_async_session)) -> dict[str, Any]:
+    return job_progress(await _user_job(db, user, job_id))
+
+@router.post("/jobs/{job_id}/cancel")
+async def cancel_scan_job(job_id: str, user: User = Depends(get_current_user),
+                          db: AsyncSession = Depends(get_async_session)) -> dict[str, Any]:
+    job = await _user_job(db, user, job_id)
+    await runner.cancel(db, job_id)
+    return job_progress(job)
@@ -1,43 +1,146 @@
-from typing import Optional
+import json
+from typing import Any, AsyncIterator, Optional
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.future import select
 
-from app.db.base import get_async_session, User
+from app.cache import TTLCache
+from app.db.base import get_async_session, SessionLocal, User
+from app.jobs import index
+from app.jobs.runner import refresh_index
 from app.jobs.scanner import GmailScanner
 from app.config import get_settings
+from app.oauth.session import get_current_user
 
 router = APIRouter(prefix="/senders", tags=["senders"])
 
+# (user_id, sender_id) -> serialized sender, filled by every listing
+sender_cache = TTLCache(
+    ttl_seconds=get_settings().SENDER_CACHE_TTL_SECONDS,
+    maxsize=get_settings().SENDER_CACHE_MAX_ENTRIES,
+)
+
 @router.get("")
-async def get_senders(category: Optional[str] = None, page_token: Optional[str] = None, db: AsyncSession = Depends(get_async_session)):
-    settings = get_settings()
-    result = await db.execute(select(User).where(User.email == settings.OWNER_EMAIL))
-    user = result.scalars().first()
-    
+async def get_senders(category: Optional[str] = None, page_token: Optional[str] = None,
+                      user: User = Depends(get_current_user),
+                      db: AsyncSession = Depends(get_async_session)) -> dict[str, Any]:
+    if not user or not user.access_token:
+        raise HTTPException(status_code=401, detail="User not authenticated")
+
+    # Apply Gmail history deltas (at most once per sync interval), then serve from the local index;
+    # the very first full scan runs as a background job (see /scan/jobs)
+    await refresh_index(user)
+    offset = int(page_token) if page_token and page_token.isdigit() else 0
+    page = await index.list_senders(db, user.id, category, offset)
+    for sender in page["senders"]:
+        sender_cache.set((user.id, sender["id"]), sender)
+    return page
+
+STREAM_FORMATS = {"sse": "text/event-stream", "ndjson": "application/x-ndjson"}
+STREAM_PAGE_SIZE = 100
+
+async def _index_batches(user_id: int, category: Optional[str]) -> AsyncIterator[dict[str, Any]]:
+    """The index listing, one page of senders at a time, with running totals."""
+    totals = {"batches": 0, "senders": 0, "emails": 0}
+    offset = 0
+    async with SessionLocal() as session:
+        while True:
+            page = await index.list_senders(session, user_id, category, offset, STREAM_PAGE_SIZE)
+            totals["batches"] += 1
+            totals["senders"] += len(page["senders"])
+            totals["emails"] += sum(s["total_emails"] for s in page["senders"])
+            yield {"senders": page["senders"], "totals": dict(totals)}
+            if not page["next_page_token"]:
+                return
+            offset += STREAM_PAGE_SIZE
+
+def _encode(event: str, payload: dict[str, Any], format: str) -> str:
+    if format == "sse":
+        return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+    return json.dumps({"event": event, **payload}) + "\n"
+
+@router.get("/stream")
+async def stream_senders(category: Optional[str] = None, format: str = "sse", max_messages: Optional[int] = None,
+                         user: User = Depends(get_current_user),
+                         db: AsyncSession = Depends(get_async_session)) -> StreamingResponse:
+    """Senders as they become available: one `senders` event per batch, then `done`.
+
+    Served from the local index once it is filled. Until then (the first full scan is
+    running in the background) the inbox is sampled live, one event per metadata batch,
+    up to `max_messages` (SENDER_STREAM_MAX_MESSAGES by default).
+    """
+    if not user or not user.access_token:
+        raise HTTPException(status_code=401, detail="User not authenticated")
+    if format not in STREAM_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {', '.join(STREAM_FORMATS)}")
+
+    sync = await refresh_index(user)
+    if sync["mode"] != "needs_full":
+        source, batches = "index", _index_batches(user.id, category)
+    else:
+        limit = max_messages or get_settings().SENDER_STREAM_MAX_MESSAGES
+        source, batches = "live", GmailScanner(user).stream_senders(category, max_messages=limit)
+
+    async def body() -> AsyncIterator[str]:
+        totals: dict[str, int] = {}
+        try:
+            async for batch in batches:
+                totals = batch["totals"]
+                if source == "index":
+                    for sender in batch["senders"]:
+                        sender_cache.set((user.id, sender["id"]), sender)
+                yield _encode("senders", {"source": source, **batch}, format)
+        except Exception as e:
+            yield _encode("error", {"detail": str(e)}, format)
+            return
+        yield _encode("done", {"source": source, "totals": totals}, format)
+
+    # no-transform/X-Accel-Buffering keep proxies from holding events back
+    headers = {"Cache-Control": "no-cache, no-transform", "X-Accel-Buffering": "no"}
+    return StreamingResponse(body(), media_type=STREAM_FORMATS[format], headers=headers)
+
+@router.get("/cache/stats")
+async def get_sender_cache_stats(user: User = Depends(get_current_user)) -> dict[str, Any]:
+    if not user:
+        raise HTTPException(status_code=401, detail="User not authenticated")
+    return sender_cache.stats()
+
+@router.get("/domains")
+async def get_sender_domains(category: Optional[str] = None, page_token: Optional[str] = None,
+                             user: User = Depends(get_current_user),
+                             db: AsyncSession = Depends(get_async_session)) -> dict[str, Any]:
+    """Senders rolled up by registrable domain (news.shop.com and shop.com are one row)."""
+    if not user or not user.access_token:
+        raise HTTPException(status_code=401, detail="User not authenticated")
+
+    await refresh_index(user)
+    offset = int(page_token) if page_token and page_token.isdigit() else 0
+    return await index.list_domains(db, user.id, category, offset)
+
+@router.get("/domains/{domain}")
+async def get_domain_senders(domain: str, user: User = Depends(get_current_user),
+                             db: AsyncSession = Depends(get_async_session)) -> dict[str, Any]:
+    """The sender identities under one domain, e.g. to feed a whole company into /plan/execute-all."""
     if not user or not user.access_token:
         raise HTTPException(status_code=401, detail="User not authenticated")
 
-    scanner = GmailScanner(user)
-    import asyncio
-    real_senders = await asyncio.to_thread(scanner.get_senders, 50, category, page_token)
-    return real_senders
+    senders = await index.domain_senders(db, user.id, domain.lower())
+    if not senders:
+        raise HTTPException(status_code=404, detail="Domain not found")
+    return {"domain": domain.lower(), "senders": senders}
 
 @router.get("/{sender_id}")
-async def get_sender(sender_id: str, db: AsyncSession = Depends(get_async_session)):
-    settings = get_settings()
-    result = await db.execute(select(User).where(User.email == settings.OWNER_EMAIL))
-    user = result.scalars().first()
-    
+async def get_sender(sender_id: str, user: User = Depends(get_current_user),
+                     db: AsyncSession = Depends(get_async_session)) -> dict[str, Any]:
     if not user or not user.access_token:
         raise HTTPException(status_code=401, detail="User not authenticated")
 
-    scanner = GmailScanner(user)
-    import asyncio
-    real_senders = await asyncio.to_thread(scanner.get_senders, 50)
-    
-    for sender in real_senders:
-        if sender["id"] == sender_id:
-            return sender
+    sender: Optional[dict[str, Any]] = sender_cache.get((user.id, sender_id))
+    if sender is None:
+        sender = await index.find_sender(db, user.id, sender_id)
+        if sender:
+            sender_cache.set((user.id, sender_id), sender)
+    if sender:
+        return sender
             
     raise HTTPException(status_code=404, detail="Sender not found in recent history")
@@ -0,0 +1,61 @@
+# benchmarks/bench_client_setup.py
+"""Per-request Gmail client setup cost, before and after the per-user client pool.
+
+Run from the repo root:  python -m benchmarks.bench_client_setup [iterations]
+
+"before" is what every route used to do: googleapiclient.discovery.build('gmail', 'v1')
+for each request (the discovery document is parsed and a new HTTP stack created each
+time). "after" is GmailScanner(user), which pulls a pooled AsyncGmailClient.
+"""
+import sys
+import time
+
+
+class _User:
+    def __init__(self, user_id):
+        self.id = user_id
+        self.access_token = f"token-{user_id}"
+        self.refresh_token = None
+
+
+def _per_call_us(fn, iterations):
+    fn()  # warm-up (imports, first parse)
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def main(iterations=200):
+    from app.jobs.scanner import GmailScanner
+
+    users = [_User(i) for i in range(10)]
+    results = {}
+
+    try:
+        from google.oauth2.credentials import Credentials
+        from googleapiclient.discovery import build
+
+        def before():
+            creds = Credentials(token="t")
+            build('gmail', 'v1', credentials=creds, cache_discovery=False)
+
+        results["build() per request"] = _per_call_us(before, max(iterations // 10, 5))
+    except ImportError:
+        print("googleapiclient not installed; skipping the 'before' measurement")
+
+    counter = iter(range(10**9))
+    results["pooled GmailScanner(user)"] = _per_call_us(
+        lambda: GmailScanner(users[next(counter) % len(users)]), iterations * 50
+    )
+
+    width = max(len(k) for k in results)
+    for name, us in results.items():
+        print(f"{name:<{width}}  {us:10.1f} us/request")
+    if len(results) == 2:
+        before_us, after_us = results.values()
+        print(f"{'speedup':<{width}}  {before_us / after_us:10.0f}x")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
@@ -0,0 +1,295 @@
+# benchmarks/bench_gmail.py
+"""Scanner throughput and latency against the fake Gmail server.
+
+Run from the repo root:  python -m benchmarks.bench_gmail [options]
+
+Each scenario runs a GmailScanner operation against a freshly seeded FakeMailbox
+(tests.fakes.gmail), so runs are deterministic: same mailbox size and seed, same
+messages, same API calls. By default the fake is mounted in-process over
+httpx.ASGITransport; --server runs it under uvicorn on a local port and goes through
+real HTTP instead. --latency/--jitter add simulated server time per round trip and
+--error-rate injects transient errors into that fraction of operations.
+
+Reported per scenario: p50/p99 latency, throughput (messages handled per second),
+and per-run HTTP round trips, Gmail operations and quota units.
+
+    python -m benchmarks.bench_gmail --json bench.json                      # on main
+    python -m benchmarks.bench_gmail --compare bench.json --threshold 0.2   # on a branch
+
+--compare exits with status 1 if any scenario got slower (p50), lost throughput, or
+started making more API calls than the baseline. Call counts are exact, so any
+increase is a regression; timings are allowed `--threshold` of noise.
+"""
+import argparse
+import asyncio
+import json
+import platform
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+SENDERS = [f"news{n}@shop{n % 7}.com" for n in range(40)]
+TOP_SENDER = "deals@shop.com"
+CATEGORIES = [("CATEGORY_PROMOTIONS", 0.4), ("CATEGORY_UPDATES", 0.2), ("CATEGORY_SOCIAL", 0.1),
+              ("CATEGORY_PERSONAL", 0.3)]
+
+
+class _User:
+    # No id: scanner read coalescing is keyed per account, and a benchmark wants every call to go upstream
+    id = None
+    email = "bench@example.com"
+    access_token = "bench-token"
+
+
+def seed_mailbox(mailbox, size, seed=0):
+    """Fill `mailbox` with `size` messages; a fifth come from TOP_SENDER, the rest spread over SENDERS."""
+    rng = random.Random(seed)
+    labels, weights = zip(*CATEGORIES)
+    for n in range(size):
+        sender = TOP_SENDER if n % 5 == 0 else rng.choice(SENDERS)
+        message_labels = ["INBOX", rng.choices(labels, weights)[0]]
+        if rng.random() < 0.6:
+            message_labels.append("UNREAD")
+        mailbox.add_message(
+            f"Sender <{sender}>", message_labels, internal_date=1_700_000_000_000 + n,
+            headers={"List-Unsubscribe": f"<mailto:unsubscribe@{sender.split('@')[1]}>"},
+            message_id=f"m{n:07d}",
+        )
+
+
+# Each scenario: (name, default runs, mutates the mailbox, coroutine fn(scanner, mailbox) -> messages handled)
+
+async def _senders(scanner, mailbox):
+    result = await scanner.get_senders(max_results=100)
+    return sum(s["total_emails"] for s in result["senders"])
+
+
+async def _summary(scanner, mailbox):
+    result = await scanner.get_scan_summary()
+    return result["total_emails_scanned"]
+
+
+async def _action(scanner, mailbox):
+    result = await scanner.execute_action(TOP_SENDER, "delete")
+    return result["messages_affected"]
+
+
+async def _plan(scanner, mailbox):
+    result = await scanner.execute_plan([(sender, "delete", None, None) for sender in SENDERS])
+    return result["messages_affected"]
+
+
+async def _category_wipe(scanner, mailbox):
+    result = await scanner.execute_category_wipe("promotions")
+    return result["messages_affected"]
+
+
+SCENARIOS = [
+    ("get_senders", 20, False, _senders),
+    ("get_scan_summary", 20, False, _summary),
+    ("execute_action", 5, True, _action),
+    ("execute_plan", 5, True, _plan),
+    ("execute_category_wipe", 5, True, _category_wipe),
+]
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile; with few runs, p99 is simply the slowest one."""
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * pct // 100))
+    return ordered[int(rank) - 1]
+
+
+class _Server:
+    """The fake Gmail app under uvicorn, in a thread with its own event loop."""
+
+    def __init__(self, app):
+        import uvicorn
+
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            self.port = sock.getsockname()[1]
+        self.server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=self.port, log_level="warning"))
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        while not self.server.started:
+            time.sleep(0.01)
+        return f"http://127.0.0.1:{self.port}"
+
+    def __exit__(self, *exc):
+        self.server.should_exit = True
+        self.thread.join()
+
+
+async def _run_once(fn, mailbox, base_url, app, retry_delay):
+    import httpx
+
+    from app.gmail.client import AsyncGmailClient
+    from app.gmail.ratelimit import RetryPolicy, TokenBucket
+    from app.jobs.scanner import GmailScanner
+
+    transport = None if base_url else httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url=base_url or "http://fake-gmail") as http:
+        # Quota pacing off: we're measuring our own overhead and call pattern, not Google's rate limit
+        client = AsyncGmailClient(
+            "bench-token", http=http, quota=TokenBucket(10**9), retry=RetryPolicy(base_delay=retry_delay),
+            account="bench",
+        )
+        start = time.perf_counter()
+        handled = await fn(GmailScanner(_User(), client), mailbox)
+        return time.perf_counter() - start, handled, client.stats
+
+
+async def run_scenario(fn, runs, mutates, args, base_url=None, mailbox=None):
+    from tests.fakes.gmail import FakeMailbox, create_fake_gmail_app
+
+    box = mailbox or FakeMailbox()
+    app = None if base_url else create_fake_gmail_app(box)
+
+    def reseed():
+        box.messages.clear()
+        box.history.clear()
+        seed_mailbox(box, args.messages, args.seed)
+
+    reseed()
+    await _run_once(fn, box, base_url, app, args.retry_delay)  # warm-up: imports, connection setup
+    timings, handled, round_trips, operations, quota, retried, dropped = [], 0, 0, 0, 0, 0, 0
+    for run in range(runs):
+        if mutates or run == 0:
+            reseed()
+        box.calls.clear()
+        box.round_trips = box.quota_used = 0
+        box.latency, box.latency_jitter = args.latency / 1000, args.jitter / 1000
+        box.error_rate = args.error_rate
+        box.rng.seed(args.seed)
+        box.latency_rng.seed(args.seed)
+
+        elapsed, count, stats = await _run_once(fn, box, base_url, app, args.retry_delay)
+        timings.append(elapsed)
+        handled += count
+        round_trips += box.round_trips
+        operations += sum(n for op, n in box.calls.items() if op != "injected_errors")
+        quota += box.quota_used
+        retried += stats.retried
+        dropped += stats.dropped
+
+    total = sum(timings)
+    return {
+        "runs": runs,
+        "p50_ms": round(percentile(timings, 50) * 1000, 3),
+        "p99_ms": round(percentile(timings, 99) * 1000, 3),
+        "messages_per_run": handled / runs,
+        "messages_per_s": round(handled / total, 1) if total else 0.0,
+        "round_trips_per_run": round_trips / runs,
+        "operations_per_run": operations / runs,
+        "quota_units_per_run": quota / runs,
+        "retried": retried,
+        "dropped": dropped,
+    }
+
+
+async def run_suite(args):
+    selected = [s for s in SCENARIOS if not args.only or s[0] in args.only]
+    results = {}
+    if args.server:
+        from tests.fakes.gmail import FakeMailbox, create_fake_gmail_app
+
+        mailbox = FakeMailbox()
+        with _Server(create_fake_gmail_app(mailbox)) as base_url:
+            for name, runs, mutates, fn in selected:
+                results[name] = await run_scenario(fn, args.runs or runs, mutates, args, base_url, mailbox)
+    else:
+        for name, runs, mutates, fn in selected:
+            results[name] = await run_scenario(fn, args.runs or runs, mutates, args)
+    return results
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline, threshold):
+    """Human-readable regressions of `results` against a baseline report's results."""
+    regressions = []
+    for name, now in results.items():
+        before = baseline.get(name)
+        if before is None:
+            continue
+        for field in ("round_trips_per_run", "operations_per_run", "quota_units_per_run"):
+            if now[field] > before[field]:
+                regressions.append(f"{name}: {field} {before[field]:g} -> {now[field]:g}")
+        if now["p50_ms"] > before["p50_ms"] * (1 + threshold):
+            regressions.append(f"{name}: p50 {before['p50_ms']:.1f}ms -> {now['p50_ms']:.1f}ms")
+        if now["messages_per_s"] < before["messages_per_s"] * (1 - threshold):
+            regressions.append(f"{name}: throughput {before['messages_per_s']:g} -> {now['messages_per_s']:g} msg/s")
+    return regressions
+
+
+def print_table(results):
+    header = f"{'scenario':<22} {'runs':>4} {'p50 ms':>9} {'p99 ms':>9} {'msg/s':>10} {'trips':>7} {'ops':>7} {'quota':>8}"
+    print(header)
+    print("-" * len(header))
+    for name, r in results.items():
+        print(f"{name:<22} {r['runs']:>4} {r['p50_ms']:>9.1f} {r['p99_ms']:>9.1f} {r['messages_per_s']:>10.0f} "
+              f"{r['round_trips_per_run']:>7g} {r['operations_per_run']:>7g} {r['quota_units_per_run']:>8g}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--messages", type=int, default=2000, help="mailbox size (default 2000)")
+    parser.add_argument("--latency", type=float, default=0.0, help="simulated ms per round trip")
+    parser.add_argument("--jitter", type=float, default=0.0, help="extra uniform random ms per round trip")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of operations failing with 429")
+    parser.add_argument("--retry-delay", type=float, default=0.001, help="retry backoff base, seconds")
+    parser.add_argument("--runs", type=int, default=0, help="runs per scenario (default: per-scenario)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--only", nargs="*", choices=[s[0] for s in SCENARIOS], help="scenarios to run")
+    parser.add_argument("--server", action="store_true", help="serve the fake over real HTTP (uvicorn)")
+    parser.add_argument("--json", metavar="PATH", help="write the report here")
+    parser.add_argument("--compare", metavar="PATH", help="baseline report to check for regressions")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed timing noise (default 0.2 = 20%%)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    results = asyncio.run(run_suite(args))
+    print_table(results)
+
+    report = {
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "config": {k: v for k, v in vars(args).items() if k not in ("json", "compare", "threshold")},
+        "results": results,
+    }
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if baseline.get("config", {}).get("messages") != args.messages:
+            print("warning: baseline was recorded with a different mailbox size")
+        regressions = compare(results, baseline["results"], args.threshold)
+        print(f"\nvs {baseline.get('commit') or args.compare}: ", end="")
+        if regressions:
+            print(f"{len(regressions)} regression(s)")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print("no regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,96 @@
+# benchmarks/bench_headers.py
+"""Metadata header parsing, before and after the one-pass header map.
+
+Run from the repo root:  python -m benchmarks.bench_headers [header_sets] [senders]
+
+Both sides pull the same fields out of synthetic metadata-format header lists (the
+six METADATA_HEADERS, shuffled the way real messages order them differently) and
+parse the From value into (email, name). "before" is what GmailScanner used to do:
+a linear scrape_header scan per field, lowercasing both names on every comparison,
+and a fresh re.search per From value. "after" is app.gmail.headers: one dict
+comprehension per message and the memoized sender parser. `senders` (default 5000)
+sets how many distinct From values the header sets cycle through.
+"""
+import random
+import re
+import sys
+import time
+
+FIELDS = ('From', 'List-Unsubscribe', 'List-Unsubscribe-Post', 'List-Id', 'Precedence')
+
+
+def _header_sets(n, senders, rng):
+    froms = [f'"Shop {i}" <news{i}@shop{i % 97}.com>' if i % 3 else f"alerts{i}@bank.com" for i in range(senders)]
+    sets = []
+    for i in range(n):
+        headers = [
+            {"name": "From", "value": froms[rng.randrange(senders)]},
+            {"name": "Date", "value": "Mon, 20 Nov 2023 10:00:00 +0000"},
+            {"name": "List-Unsubscribe", "value": "<https://shop.example.com/u>"},
+            {"name": "List-Unsubscribe-Post", "value": "List-Unsubscribe=One-Click"},
+            {"name": "list-id", "value": "<news.shop.example.com>"},
+            {"name": "Precedence", "value": "bulk"},
+        ]
+        rng.shuffle(headers)
+        sets.append(headers)
+    return sets
+
+
+def _before(header_sets):
+    def scrape_header(headers, name):
+        for h in headers:
+            if h['name'].lower() == name.lower():
+                return h['value']
+        return ""
+
+    out = []
+    for headers in header_sets:
+        fields = [scrape_header(headers, name) for name in FIELDS]
+        sender_raw = fields[0]
+        match = re.search(r'<([^>]+)>', sender_raw)
+        email = match.group(1).lower() if match else sender_raw.lower()
+        if "<" in sender_raw:
+            name = sender_raw.split("<")[0].strip().replace('"', '')
+        else:
+            name = sender_raw.split("@")[0].title()
+        out.append((email, name, *fields[1:]))
+    return out
+
+
+def _after(header_sets):
+    from app.gmail.headers import parse_headers, parse_sender
+
+    keys = [name.lower() for name in FIELDS[1:]]
+    out = []
+    for headers in header_sets:
+        parsed = parse_headers(headers)
+        out.append((*parse_sender(parsed['from']), *(parsed.get(k, "") for k in keys)))
+    return out
+
+
+def main(n=1_000_000, senders=5000):
+    from app.gmail.headers import parse_sender
+
+    header_sets = _header_sets(n, senders, random.Random(0))
+    parse_sender.cache_clear()  # the memo has to warm up inside the timed run, like a real scan
+
+    timings = {}
+    for label, fn in (("scrape_header + re.search", _before), ("parse_headers + parse_sender", _after)):
+        start = time.perf_counter()
+        results = fn(header_sets)
+        timings[label] = time.perf_counter() - start
+        if label.startswith("scrape"):
+            expected = results
+        elif results != expected:
+            raise SystemExit("parsers disagree")
+
+    width = max(len(k) for k in timings)
+    for label, seconds in timings.items():
+        print(f"{label:<{width}}  {seconds:7.2f} s  {n / seconds / 1e6:6.2f} M header sets/s")
+    before, after = timings.values()
+    print(f"{'speedup':<{width}}  {before / after:7.1f}x  ({parse_sender.cache_info().hits / n:.1%} sender memo hits)")
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:3]]
+    main(*args)
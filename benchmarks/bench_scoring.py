@@ -0,0 +1,68 @@
+# benchmarks/bench_scoring.py
+"""Sender scoring throughput.
+
+Run from the repo root:  python -m benchmarks.bench_scoring [senders]
+
+Fills an in-memory SQLite sender_stats table with synthetic senders, then times the
+columnar load (one query) and the NumPy scoring pass separately.
+"""
+import asyncio
+import json
+import random
+import sys
+import time
+
+NOW = 1_760_000_000_000
+CATEGORIES = ("promotions", "updates", "social", "forums", "primary")
+
+
+def _rows(n, rng, day_ms):
+    for i in range(n):
+        total = rng.randint(1, 500)
+        first_seen = NOW - rng.randint(1, 700) * day_ms
+        yield {
+            "user_id": 1, "email": f"sender{i}@example.com", "sender_id": "x", "name": "",
+            "total_emails": total, "unread_count": rng.randint(0, total),
+            "first_seen": first_seen, "last_seen": NOW,
+            "last_read": rng.choice((None, rng.randint(first_seen, NOW))),
+            "category_mix": json.dumps({rng.choice(CATEGORIES): total}),
+            "list_unsubscribe": rng.choice(("", "<https://example.com/u>")),
+        }
+
+
+async def run(n):
+    from sqlalchemy import insert
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+    from app.db.base import Base, SenderStat
+    from app.jobs import scoring
+
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with async_sessionmaker(engine)() as db:
+        await db.execute(insert(SenderStat), list(_rows(n, random.Random(0), scoring.DAY_MS)))
+        await db.commit()
+
+        start = time.perf_counter()
+        emails, columns = await scoring.load_columns(db, 1)
+        loaded = time.perf_counter()
+        confidence, risk, act = scoring.score_matrix(scoring.feature_matrix(columns, NOW))
+        scored = time.perf_counter()
+        scoring.score_columns(columns, NOW)
+        serialized = time.perf_counter()
+    await engine.dispose()
+
+    print(f"senders           {len(emails):>10,}")
+    print(f"load columns      {(loaded - start) * 1e3:10.1f} ms")
+    print(f"scoring pass      {(scored - loaded) * 1e3:10.1f} ms")
+    print(f"per-sender dicts  {(serialized - scored) * 1e3:10.1f} ms")
+    print(f"suggested         {int(act.sum()):>10,} unsubscribe")
+
+
+def main(n=100_000):
+    asyncio.run(run(n))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
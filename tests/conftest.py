@@ -0,0 +1,85 @@
+# tests/conftest.py
+import os
+import sys
+from pathlib import Path
+
+import pytest
+import pytest_asyncio
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+# Add repo root to sys.path so `import app` works in tests
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+
+def pytest_configure(config):
+    # create_app() refuses to start without one; this runs before test modules import app.main
+    os.environ.setdefault("SESSION_SECRET", "test-session-secret")
+
+
+@pytest_asyncio.fixture
+async def session_factory():
+    """Session factory bound to a fresh in-memory database with every table created."""
+    from sqlalchemy.pool import StaticPool
+    from app.db.base import Base
+
+    engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield async_sessionmaker(engine, expire_on_commit=False)
+    await engine.dispose()
+
+
+@pytest_asyncio.fixture
+async def db(session_factory):
+    async with session_factory() as session:
+        yield session
+
+
+@pytest_asyncio.fixture
+async def fake_gmail():
+    """A FakeMailbox and an AsyncGmailClient talking to it over ASGI."""
+    import httpx
+    from app.gmail.client import AsyncGmailClient
+    from app.gmail.ratelimit import RetryPolicy, TokenBucket
+    from tests.fakes.gmail import FakeMailbox, create_fake_gmail_app
+
+    mailbox = FakeMailbox()
+    transport = httpx.ASGITransport(app=create_fake_gmail_app(mailbox))
+    async with httpx.AsyncClient(transport=transport, base_url="http://fake-gmail") as http:
+        # Quota pacing off and near-instant backoff so tests run at full speed
+        client = AsyncGmailClient(
+            "test-token", http=http, quota=TokenBucket(10**9), retry=RetryPolicy(base_delay=0.001)
+        )
+        yield mailbox, client
+
+
+@pytest.fixture
+def fake_user():
+    """Stands in for a User where only the access token matters (GmailScanner with a client)."""
+    from types import SimpleNamespace
+
+    return SimpleNamespace(access_token="t")
+
+
+@pytest_asyncio.fixture
+async def api_client(db, monkeypatch):
+    """An httpx client for create_app() over ASGI, with request handlers on `db`.
+
+    Requests without a session act as test@example.com through the owner fallback.
+    """
+    import httpx
+    from app.config import get_settings
+    from app.db.base import get_async_session
+    from app.main import create_app
+
+    monkeypatch.setattr(get_settings(), "OWNER_EMAIL", "test@example.com")
+    monkeypatch.setattr(get_settings(), "OWNER_FALLBACK", True)
+    app = create_app()
+
+    async def override():
+        yield db
+
+    app.dependency_overrides[get_async_session] = override
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://app") as client:
+        yield client
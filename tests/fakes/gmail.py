@@ -0,0 +1,336 @@
+# tests/fakes/gmail.py
+"""In-memory stand-in for the Gmail REST API, for tests and local benchmarks.
+
+`create_fake_gmail_app()` returns an ASGI app serving the subset of endpoints used by
+AsyncGmailClient (including multipart batches). Mount it with httpx.ASGITransport or
+run it under uvicorn. Every operation is counted in `FakeMailbox.calls`, and every
+HTTP round trip in `FakeMailbox.round_trips`; `quota_used` sums the quota units the real
+API would have charged.
+"""
+import asyncio
+import base64
+import random
+import re
+import time
+import uuid
+from collections import Counter
+from email import message_from_bytes
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response
+
+from app.gmail.batch import decode_requests, encode_responses, new_boundary
+from app.gmail.client import QUOTA_UNITS
+from app.gmail.headers import parse_sender
+
+PREFIX = "/gmail/v1/users/me"
+_TERM = re.compile(r"\{[^}]*\}|\S+:\([^)]*\)|\S+")
+
+ROUTES = [
+    ("GET", re.compile(r"^/profile$"), "get_profile"),
+    ("GET", re.compile(r"^/labels/(?P<id>[^/]+)$"), "get_label"),
+    ("GET", re.compile(r"^/messages$"), "list_messages"),
+    ("POST", re.compile(r"^/messages/batchModify$"), "batch_modify"),
+    ("POST", re.compile(r"^/messages/batchDelete$"), "batch_delete"),
+    ("POST", re.compile(r"^/messages/send$"), "send_message"),
+    ("GET", re.compile(r"^/messages/(?P<id>[^/]+)$"), "get_message"),
+    ("POST", re.compile(r"^/messages/(?P<id>[^/]+)/modify$"), "modify_message"),
+    ("POST", re.compile(r"^/messages/(?P<id>[^/]+)/trash$"), "trash_message"),
+    ("GET", re.compile(r"^/history$"), "list_history"),
+    ("POST", re.compile(r"^/watch$"), "watch"),
+    ("POST", re.compile(r"^/stop$"), "stop_watch"),
+]
+WATCH_TTL_MS = 7 * 24 * 3600 * 1000  # Gmail watches lapse after seven days unless renewed
+
+
+def _error(status, message, reason="failedPrecondition"):
+    return status, {"error": {"code": status, "message": message, "errors": [{"reason": reason}]}}
+
+
+def _sort_key(msg):
+    # newest first, like Gmail
+    return -int(msg["internalDate"]), msg["id"]
+
+
+def _from_matches(value, address):
+    # A whole address matches only itself; a bare domain matches it and its subdomains
+    if "@" in value:
+        return address == value
+    domain = address.rpartition("@")[2]
+    return domain == value or domain.endswith("." + value)
+
+
+def _as_list(value):
+    if value is None:
+        return []
+    return value if isinstance(value, list) else [value]
+
+
+class FakeMailbox:
+    def __init__(self, email="me@example.com"):
+        self.email = email
+        self.messages = {}
+        self.history = []  # (history_id, record)
+        self.history_id = 1000
+        self.oldest_history_id = 1000
+        self.calls = Counter()
+        self.round_trips = 0
+        self.quota_used = 0
+        self.sent = []  # email.message.Message objects posted to messages.send
+        # Error injection: fail the next N operations, and/or a random fraction of them
+        self.fail_next = 0
+        self.error_rate = 0.0
+        self.error_status = 429
+        self.rng = random.Random(0)
+        # Simulated network/server time per HTTP round trip: latency + uniform(0, jitter) seconds
+        self.latency = 0.0
+        self.latency_jitter = 0.0
+        self.latency_rng = random.Random(1)
+        # users.watch: while a topic is set, every history record is handed to `on_change`
+        # (see tests.fakes.pubsub.FakePubSub.attach) as (topic, notification)
+        self.watch_topic = None
+        self.watch_expiration = None
+        self.on_change = None
+
+    # --- seeding --------------------------------------------------------------
+
+    def add_message(self, sender, labels=("INBOX",), internal_date=None, headers=None, message_id=None):
+        message_id = message_id or uuid.uuid4().hex[:16]
+        all_headers = [{"name": "From", "value": sender}]
+        for name, value in (headers or {}).items():
+            all_headers.append({"name": name, "value": value})
+        self.messages[message_id] = {
+            "id": message_id,
+            "threadId": message_id,
+            "labelIds": list(labels),
+            "internalDate": str(internal_date if internal_date is not None else 1_700_000_000_000 + len(self.messages)),
+            "headers": all_headers,
+        }
+        self._record({"messagesAdded": [{"message": self._ref(message_id)}]})
+        return message_id
+
+    def _ref(self, message_id):
+        msg = self.messages[message_id]
+        return {"id": message_id, "threadId": msg["threadId"], "labelIds": list(msg["labelIds"])}
+
+    def _record(self, record):
+        self.history_id += 1
+        self.history.append((self.history_id, record))
+        if self.watch_topic and self.on_change is not None:
+            self.on_change(self.watch_topic, {"emailAddress": self.email, "historyId": self.history_id})
+
+    # --- query matching --------------------------------------------------------
+
+    def _match_term(self, msg, term):
+        key, _, value = term.partition(":")
+        labels = msg["labelIds"]
+        if not value:
+            return True
+        if value.startswith("(") and value.endswith(")"):
+            options = [v for v in value[1:-1].split() if v.upper() != "OR"]
+            return any(self._match_term(msg, f"{key}:{v}") for v in options)
+        key, value = key.lower(), value.lower()
+        if key == "from":
+            return _from_matches(value, parse_sender(self._header(msg, "From"))[0])
+        if key == "label":
+            return value.upper() in labels
+        if key == "category":
+            return ("CATEGORY_PERSONAL" if value == "primary" else f"CATEGORY_{value.upper()}") in labels
+        if key == "in":
+            return value.upper() in labels
+        if key == "is":
+            return value.upper() in labels
+        return True
+
+    def _matches(self, msg, q):
+        terms = _TERM.findall(q or "")
+        if "TRASH" in msg["labelIds"] and "in:trash" not in [t.lower() for t in terms]:
+            return False
+        for term in terms:
+            if term.startswith("{"):
+                if not any(self._match_term(msg, t) for t in term[1:-1].split()):
+                    return False
+            elif not self._match_term(msg, term):
+                return False
+        return True
+
+    def _header(self, msg, name):
+        for h in msg["headers"]:
+            if h["name"].lower() == name.lower():
+                return h["value"]
+        return ""
+
+    async def delay(self):
+        if self.latency or self.latency_jitter:
+            await asyncio.sleep(self.latency + self.latency_rng.random() * self.latency_jitter)
+
+    # --- endpoints ---------------------------------------------------------------
+
+    def handle(self, method, path, params, body):
+        if path.startswith(PREFIX):
+            path = path[len(PREFIX):]
+        for route_method, pattern, name in ROUTES:
+            match = pattern.match(path)
+            if match and route_method == method:
+                if self.fail_next > 0 or (self.error_rate and self.rng.random() < self.error_rate):
+                    self.fail_next = max(0, self.fail_next - 1)
+                    self.calls["injected_errors"] += 1
+                    return _error(self.error_status, "Rate Limit Exceeded", "rateLimitExceeded")
+                self.calls[name] += 1
+                self.quota_used += QUOTA_UNITS[name]
+                return getattr(self, name)(params or {}, body or {}, **match.groupdict())
+        return _error(404, f"no route for {method} {path}", "notFound")
+
+    def get_profile(self, params, body):
+        return 200, {
+            "emailAddress": self.email,
+            "messagesTotal": len(self.messages),
+            "threadsTotal": len(self.messages),
+            "historyId": str(self.history_id),
+        }
+
+    def get_label(self, params, body, id):
+        tagged = [m for m in self.messages.values() if id in m["labelIds"]]
+        return 200, {
+            "id": id,
+            "messagesTotal": len(tagged),
+            "messagesUnread": sum(1 for m in tagged if "UNREAD" in m["labelIds"]),
+        }
+
+    def list_messages(self, params, body):
+        max_results = min(int(params.get("maxResults", 100)), 500)
+        label_ids = _as_list(params.get("labelIds"))
+        matched = [
+            m for m in sorted(self.messages.values(), key=_sort_key)
+            if self._matches(m, params.get("q")) and all(label in m["labelIds"] for label in label_ids)
+        ]
+        # Page tokens are offsets into the live result set, as Gmail's behave: messages that
+        # stop matching between pages shift the rest forward, and paging on skips them.
+        offset = int(params.get("pageToken") or 0)
+        page = matched[offset:offset + max_results]
+        result = {"resultSizeEstimate": len(matched)}
+        if page:
+            result["messages"] = [{"id": m["id"], "threadId": m["threadId"]} for m in page]
+        if offset + max_results < len(matched):
+            result["nextPageToken"] = str(offset + max_results)
+        return 200, result
+
+    def get_message(self, params, body, id):
+        msg = self.messages.get(id)
+        if msg is None:
+            return _error(404, "Requested entity was not found.", "notFound")
+        wanted = {h.lower() for h in _as_list(params.get("metadataHeaders"))}
+        headers = [h for h in msg["headers"] if not wanted or h["name"].lower() in wanted]
+        return 200, {
+            "id": msg["id"],
+            "threadId": msg["threadId"],
+            "labelIds": list(msg["labelIds"]),
+            "internalDate": msg["internalDate"],
+            "historyId": str(self.history_id),
+            "payload": {"headers": headers},
+        }
+
+    def _relabel(self, message_id, add, remove):
+        labels = self.messages[message_id]["labelIds"]
+        added = [label for label in add if label not in labels]
+        removed = [label for label in remove if label in labels]
+        labels[:] = [label for label in labels if label not in removed] + added
+        if added:
+            self._record({"labelsAdded": [{"message": self._ref(message_id), "labelIds": added}]})
+        if removed:
+            self._record({"labelsRemoved": [{"message": self._ref(message_id), "labelIds": removed}]})
+
+    def modify_message(self, params, body, id):
+        if id not in self.messages:
+            return _error(404, "Requested entity was not found.", "notFound")
+        self._relabel(id, body.get("addLabelIds", []), body.get("removeLabelIds", []))
+        return 200, self._ref(id)
+
+    def trash_message(self, params, body, id):
+        if id not in self.messages:
+            return _error(404, "Requested entity was not found.", "notFound")
+        self._relabel(id, ["TRASH"], ["INBOX"])
+        return 200, self._ref(id)
+
+    def batch_modify(self, params, body):
+        ids = body.get("ids", [])
+        if len(ids) > 1000:
+            return _error(400, "Too many ids", "invalidArgument")
+        for message_id in ids:
+            if message_id in self.messages:
+                self._relabel(message_id, body.get("addLabelIds", []), body.get("removeLabelIds", []))
+        return 204, None
+
+    def send_message(self, params, body):
+        raw = base64.urlsafe_b64decode(body.get("raw", "") + "==")
+        self.sent.append(message_from_bytes(raw))
+        return 200, {"id": uuid.uuid4().hex[:16], "labelIds": ["SENT"]}
+
+    def batch_delete(self, params, body):
+        ids = body.get("ids", [])
+        if len(ids) > 1000:
+            return _error(400, "Too many ids", "invalidArgument")
+        for message_id in ids:
+            if message_id in self.messages:
+                self._record({"messagesDeleted": [{"message": self._ref(message_id)}]})
+                del self.messages[message_id]
+        return 204, None
+
+    def list_history(self, params, body):
+        start = int(params.get("startHistoryId", 0))
+        if start < self.oldest_history_id:
+            return _error(404, "Requested entity was not found.", "notFound")
+        records = [
+            {"id": str(hid), **record} for hid, record in self.history if hid > start
+        ]
+        return 200, {"history": records, "historyId": str(self.history_id)}
+
+    def watch(self, params, body):
+        if not body.get("topicName"):
+            return _error(400, "Invalid topicName", "invalidArgument")
+        self.watch_topic = body["topicName"]
+        self.watch_expiration = int(time.time() * 1000) + WATCH_TTL_MS
+        return 200, {"historyId": str(self.history_id), "expiration": str(self.watch_expiration)}
+
+    def stop_watch(self, params, body):
+        self.watch_topic = self.watch_expiration = None
+        return 204, None
+
+
+def create_fake_gmail_app(mailbox=None):
+    mailbox = mailbox or FakeMailbox()
+    app = FastAPI(title="Fake Gmail")
+    app.state.mailbox = mailbox
+
+    def respond(status, payload):
+        if payload is None:
+            return Response(status_code=status)
+        return JSONResponse(payload, status_code=status)
+
+    @app.post("/batch/gmail/v1")
+    async def batch(request: Request):
+        mailbox.round_trips += 1
+        await mailbox.delay()
+        parts = decode_requests(request.headers["content-type"], await request.body())
+        if len(parts) > 100:
+            return respond(*_error(400, "Too many requests in batch", "invalidArgument"))
+        results = [(cid, *mailbox.handle(req.method, req.path, req.params, req.body)) for cid, req in parts]
+        boundary = new_boundary()
+        return Response(
+            encode_responses(results, boundary),
+            media_type=f"multipart/mixed; boundary={boundary}",
+        )
+
+    @app.api_route("/gmail/v1/{path:path}", methods=["GET", "POST", "DELETE"])
+    async def rest(path: str, request: Request):
+        mailbox.round_trips += 1
+        await mailbox.delay()
+        params = {}
+        for key, value in request.query_params.multi_items():
+            params.setdefault(key, []).append(value)
+        params = {k: v if len(v) > 1 else v[0] for k, v in params.items()}
+        raw = await request.body()
+        body = await request.json() if raw else None
+        return respond(*mailbox.handle(request.method, f"/gmail/v1/{path}", params, body))
+
+    return app
@@ -0,0 +1,106 @@
+# tests/fakes/pubsub.py
+"""In-memory stand-in for Cloud Pub/Sub push delivery, for tests and local development.
+
+Gmail's users.watch publishes `{"emailAddress", "historyId"}` to a Pub/Sub topic, and a
+push subscription POSTs each message to our webhook wrapped in the standard push
+envelope. `FakePubSub` does the same: `attach(mailbox)` makes a FakeMailbox with an
+active watch publish on every change, and each subscription delivers its messages
+through an httpx client (ASGITransport in tests), retrying with backoff until the
+endpoint answers 2xx. Like the real service, delivery is at-least-once.
+"""
+import asyncio
+import base64
+import itertools
+import json
+from datetime import datetime, timezone
+
+ACK_STATUSES = (102, 200, 201, 202, 204)
+
+
+class _Subscription:
+    def __init__(self, name, endpoint, http):
+        self.name = name
+        self.endpoint = endpoint
+        self.http = http
+        self.queue = asyncio.Queue()
+        self.task = None
+
+
+class FakePubSub:
+    def __init__(self, retry_delay=0.01, max_attempts=5):
+        self.retry_delay = retry_delay
+        self.max_attempts = max_attempts
+        self._subscriptions = {}  # topic -> [_Subscription]
+        self._ids = itertools.count(1)
+        self.published = 0
+        self.delivered = 0
+        self.retried = 0
+        self.dead_lettered = 0  # given up on after max_attempts
+
+    def subscribe(self, topic, name, endpoint, http):
+        """Push every message published to `topic` to `endpoint` (a URL on `http`)."""
+        self._subscriptions.setdefault(topic, []).append(_Subscription(name, endpoint, http))
+
+    def attach(self, mailbox):
+        mailbox.on_change = self.publish
+
+    def publish(self, topic, data, attributes=None):
+        """Queue `data` (a JSON-able dict) on every subscription of `topic`. Returns the message id."""
+        message_id = str(next(self._ids))
+        message = {
+            "data": base64.b64encode(json.dumps(data).encode()).decode(),
+            "attributes": attributes or {},
+            "messageId": message_id,
+            "publishTime": datetime.now(timezone.utc).isoformat(),
+        }
+        self.published += 1
+        for subscription in self._subscriptions.get(topic, []):
+            subscription.queue.put_nowait(message)
+            self._start(subscription)
+        return message_id
+
+    def _start(self, subscription):
+        if subscription.task is not None and not subscription.task.done():
+            return
+        try:
+            subscription.task = asyncio.get_running_loop().create_task(self._deliver(subscription))
+        except RuntimeError:
+            pass  # published outside an event loop; `drain()` starts delivery
+
+    async def _deliver(self, subscription):
+        while True:
+            message = await subscription.queue.get()
+            try:
+                envelope = {"message": message, "subscription": subscription.name}
+                for attempt in range(self.max_attempts):
+                    if attempt:
+                        self.retried += 1
+                        await asyncio.sleep(self.retry_delay * 2 ** (attempt - 1))
+                    try:
+                        resp = await subscription.http.post(subscription.endpoint, json=envelope)
+                    except Exception:
+                        continue
+                    if resp.status_code in ACK_STATUSES:
+                        self.delivered += 1
+                        break
+                else:
+                    self.dead_lettered += 1
+            finally:
+                subscription.queue.task_done()
+
+    async def drain(self):
+        """Wait until every published message has been acked or given up on."""
+        for subscriptions in self._subscriptions.values():
+            for subscription in subscriptions:
+                self._start(subscription)
+                await subscription.queue.join()
+
+    async def close(self):
+        tasks = [s.task for subs in self._subscriptions.values() for s in subs if s.task is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stats(self):
+        return {"published": self.published, "delivered": self.delivered, "retried": self.retried,
+                "dead_lettered": self.dead_lettered}
@@ -0,0 +1,85 @@
+from datetime import datetime
+from types import SimpleNamespace
+from urllib.parse import parse_qs, urlsplit
+
+import httpx
+import pytest
+import pytest_asyncio
+
+from app.config import get_settings
+from app.db.base import ScanJob, User
+
+
+class _FakeFlow:
+    """Stands in for google_auth_oauthlib's Flow: the auth code doubles as the access token."""
+
+    def __init__(self):
+        self.credentials = None
+
+    def fetch_token(self, authorization_response):
+        code = parse_qs(urlsplit(authorization_response).query)["code"][0]
+        self.credentials = SimpleNamespace(token=code, refresh_token=f"refresh-{code}", expiry=None)
+
+
+def _userinfo(request):
+    token = request.headers["Authorization"].split()[-1]
+    return httpx.Response(200, json={"email": f"{token}@example.com", "name": token.title()})
+
+
+@pytest_asyncio.fixture
+async def app_client(api_client, monkeypatch):
+    import app.oauth.routes as oauth
+
+    userinfo_http = httpx.AsyncClient(transport=httpx.MockTransport(_userinfo))
+    monkeypatch.setattr(oauth.Flow, "from_client_config", lambda *a, **k: _FakeFlow())
+    monkeypatch.setattr(oauth, "get_http_client", lambda: userinfo_http)
+    monkeypatch.setattr(get_settings(), "OWNER_EMAIL", "owner@example.com")
+    yield api_client
+    await userinfo_http.aclose()
+
+
+@pytest.mark.asyncio
+async def test_each_session_acts_on_its_own_account(app_client, db, monkeypatch):
+    owner = User(email="owner@example.com", access_token="t")
+    db.add(owner)
+    await db.commit()
+
+    assert (await app_client.get("/oauth/callback?code=alice")).status_code == 307
+    assert (await app_client.get("/oauth/me")).json()["email"] == "alice@example.com"
+
+    # signing in to a second account switches to it and keeps the first one linked
+    await app_client.get("/oauth/callback?code=bob")
+    assert (await app_client.get("/oauth/me")).json()["email"] == "bob@example.com"
+    accounts = (await app_client.get("/oauth/accounts")).json()["accounts"]
+    assert [(a["email"], a["active"]) for a in accounts] == [
+        ("alice@example.com", False), ("bob@example.com", True),
+    ]
+    assert accounts[0]["usage"]["quota_units"] == 0
+
+    alice = accounts[0]["id"]
+    assert (await app_client.post(f"/oauth/accounts/{alice}/activate")).json()["email"] == "alice@example.com"
+    assert (await app_client.get("/oauth/me")).json()["email"] == "alice@example.com"
+    assert (await db.get(User, alice)).refresh_token == "refresh-alice"
+
+    # an account never signed in to from this browser can't be switched to
+    assert (await app_client.post(f"/oauth/accounts/{owner.id}/activate")).status_code == 404
+
+    # without a session the owner fallback applies, only while it is switched on
+    await app_client.post("/oauth/logout")
+    assert (await app_client.get("/oauth/me")).json()["email"] == "owner@example.com"
+    monkeypatch.setattr(get_settings(), "OWNER_FALLBACK", False)
+    assert (await app_client.get("/oauth/me")).json() == {"authenticated": False}
+
+
+@pytest.mark.asyncio
+async def test_scan_jobs_are_private_to_their_account(app_client, db):
+    await app_client.get("/oauth/callback?code=alice")
+    other = User(email="mallory@example.com", access_token="t")
+    db.add(other)
+    await db.commit()
+    db.add(ScanJob(id="j1", user_id=other.id, status="completed", pages_done=0, messages_processed=0,
+                   retried=0, dropped=0, created_at=datetime.utcnow()))
+    await db.commit()
+
+    assert (await app_client.get("/scan/jobs/j1")).status_code == 404
+    assert (await app_client.post("/scan/jobs/j1/cancel")).status_code == 404
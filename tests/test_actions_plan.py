@@ -0,0 +1,46 @@
+import pytest
+
+from app.db.base import User
+from app.jobs import plans
+from app.jobs.scanner import GmailScanner
+from app.jobs.sync import MailboxSync
+
+
+@pytest.mark.asyncio
+async def test_plan_is_persisted_and_patched_by_incremental_sync(db, fake_gmail):
+    mailbox, client = fake_gmail
+    for _ in range(3):
+        mailbox.add_message("Shop <news@shop.com>", ["INBOX", "CATEGORY_PROMOTIONS"])
+    mailbox.add_message("Feed <feed@site.com>", ["INBOX", "CATEGORY_UPDATES"])
+    mailbox.add_message("friend@mail.com", ["INBOX", "CATEGORY_PERSONAL"])
+
+    user = User(email="test@example.com", access_token="t")
+    db.add(user)
+    await db.commit()
+    sync = MailboxSync(db, user, lambda u: GmailScanner(u, client))
+    await sync.run()
+
+    plan_id = await plans.create_plan(db, user.id)
+    mailbox.calls.clear()
+    plan = await plans.get_plan(db, user.id, plan_id)
+    assert not mailbox.calls
+    assert [s["sender"] for s in plan["senders"]] == ["news@shop.com", "feed@site.com"]
+    assert plan["summary"]["total_emails"] == 4
+
+    # new promotional sender arrives, the updates sender's only message is deleted
+    feed = next(mid for mid, m in mailbox.messages.items() if "CATEGORY_UPDATES" in m["labelIds"])
+    mailbox.batch_delete({}, {"ids": [feed]})
+    mailbox.add_message("Deals <deals@store.com>", ["INBOX", "CATEGORY_PROMOTIONS"])
+    mailbox.add_message("Shop <news@shop.com>", ["INBOX", "CATEGORY_PROMOTIONS"])
+    await sync.run()
+
+    assert await plans.latest_plan_id(db, user.id) == plan_id
+    first = await plans.get_plan(db, user.id, plan_id, limit=1)
+    top = first["senders"][0]
+    assert (top["sender"], top["emails_affected"], top["recommended_action"]) == ("news@shop.com", 4, "unsubscribe")
+    assert top["confidence"] > 0.5 > top["risk_score"]
+    rest = await plans.get_plan(db, user.id, plan_id, offset=int(first["next_page_token"]), limit=1)
+    assert [s["sender"] for s in rest["senders"]] == ["deals@store.com"]
+    assert rest["next_page_token"] is None and rest["summary"]["senders"] == 2
+
+    assert await plans.get_plan(db, user.id + 1, plan_id) is None
@@ -0,0 +1,38 @@
+from app.jobs.aggregate import SenderAggregator
+
+
+def _page(start, n):
+    return [
+        {
+            "sender": f"s{i % 7}@example.com",
+            "sender_name": f"S{i % 7}",
+            "labels": ["UNREAD", "CATEGORY_PROMOTIONS"] if i % 2 else ["CATEGORY_UPDATES"],
+            "internal_date": 1_000 + i,
+            "list_unsubscribe": "<https://example.com/u>" if i % 3 == 0 else "",
+        }
+        for i in range(start, start + n)
+    ]
+
+
+def test_fold_is_bounded_by_senders():
+    agg = SenderAggregator()
+    for start in range(0, 10_000, 100):
+        agg.fold(_page(start, 100))
+
+    assert agg.messages_seen == 10_000
+    assert len(agg.senders) == 7
+    assert sum(c.total for c in agg.senders.values()) == 10_000
+    assert sum(c.unread for c in agg.senders.values()) == 5_000
+
+    row = agg.senders["s0@example.com"].to_row(user_id=1)
+    assert row["first_seen"] == 1_000
+    assert row["last_seen"] == 1_000 + 9_996
+    assert row["list_unsubscribe"] == "<https://example.com/u>"
+    assert row["category_mix"] == '{"promotions": 714, "updates": 715}'
+    assert row["category"] == "updates"
+
+
+def test_messages_without_sender_are_counted_but_not_grouped():
+    agg = SenderAggregator()
+    agg.fold([{"sender": "", "sender_name": "", "labels": [], "internal_date": 0, "list_unsubscribe": ""}])
+    assert agg.messages_seen == 1 and agg.senders == {}
@@ -0,0 +1,93 @@
+import csv
+import io
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.config import get_settings
+from app.db.base import AuditLog, User
+
+
+@pytest.fixture
+def client(api_client, session_factory, monkeypatch):
+    import app.routes.audit as audit
+
+    monkeypatch.setattr(audit, "SessionLocal", session_factory)
+    monkeypatch.setattr(audit, "EXPORT_CHUNK", 7)
+    return api_client
+
+
+async def _seed(db, count=45, email="test@example.com", prefix="log"):
+    """`count` rows for `email`'s account (the requests' owner by default). Returns the User."""
+    user = User(email=email, access_token="t")
+    db.add(user)
+    await db.commit()
+    start = datetime(2026, 1, 1)
+    for n in range(count):
+        # pairs of rows share a timestamp, so paging has to break ties on id
+        db.add(AuditLog(id=f"{prefix}-{n:03d}", user_id=user.id, timestamp=start + timedelta(minutes=n // 2),
+                        event_type="undo" if n % 3 == 0 else "execute_plan", details=f"row, \"{n}\""))
+    await db.commit()
+    return user
+
+
+@pytest.mark.asyncio
+async def test_keyset_pages_cover_every_row_once(db, client):
+    await _seed(db)
+    seen, cursor = [], None
+    while True:
+        resp = await client.get("/audit/logs", params={"limit": 10, **({"cursor": cursor} if cursor else {})})
+        seen += [log["id"] for log in resp.json()]
+        cursor = resp.headers.get("x-next-cursor")
+        if cursor is None:
+            break
+    assert seen == [f"log-{n:03d}" for n in range(44, -1, -1)]
+
+    undo = (await client.get("/audit/logs", params={
+        "event_type": "undo", "since": "2026-01-01T00:05:00", "until": "2026-01-01T00:15:00",
+    })).json()
+    assert [log["id"] for log in undo] == ["log-027", "log-024", "log-021", "log-018", "log-015", "log-012"]
+
+    assert (await client.get("/audit/logs", params={"cursor": "not-a-cursor"})).status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_export_streams_ndjson_and_csv(db, client):
+    await _seed(db)
+    resp = await client.get("/audit/logs/export")
+    rows = [json.loads(line) for line in resp.text.splitlines()]
+    assert len(rows) == 45 and rows[0]["id"] == "log-044" and rows[-1]["id"] == "log-000"
+
+    resp = await client.get("/audit/logs/export", params={"format": "csv", "event_type": ["undo"]})
+    assert resp.headers["content-type"].startswith("text/csv")
+    table = list(csv.reader(io.StringIO(resp.text)))
+    assert table[0] == ["id", "timestamp", "event_type", "details"]
+    assert len(table) == 1 + 15
+    assert table[-1] == ["log-000", "2026-01-01T00:00:00", "undo", 'row, "0"']
+
+    assert (await client.get("/audit/logs/export", params={"format": "xml"})).status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_logs_only_list_the_signed_in_accounts_rows(db, client, monkeypatch):
+    await _seed(db, count=3)
+    await _seed(db, count=4, email="other@example.com", prefix="other")
+
+    logs = (await client.get("/audit/logs")).json()
+    assert [log["id"] for log in logs] == ["log-002", "log-001", "log-000"]
+
+    monkeypatch.setattr(get_settings(), "OWNER_FALLBACK", False)
+    assert (await client.get("/audit/logs")).status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_export_leaves_out_other_accounts_rows(db, client):
+    await _seed(db, count=20, email="a@example.com", prefix="a")
+    await _seed(db, count=9)  # the requests' own account
+
+    rows = [json.loads(line) for line in (await client.get("/audit/logs/export")).text.splitlines()]
+    table = list(csv.reader(io.StringIO((await client.get("/audit/logs/export", params={"format": "csv"})).text)))
+
+    assert [row["id"] for row in rows] == [f"log-{n:03d}" for n in range(8, -1, -1)]
+    assert [row[0] for row in table[1:]] == [row["id"] for row in rows]
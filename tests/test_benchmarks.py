@@ -0,0 +1,58 @@
+import argparse
+import time
+
+import pytest
+
+from benchmarks import bench_gmail
+
+
+def _args(**overrides):
+    args = bench_gmail.parse_args(["--messages", "150", "--runs", "2"])
+    return argparse.Namespace(**{**vars(args), **overrides})
+
+
+@pytest.mark.asyncio
+async def test_suite_is_deterministic_in_api_calls():
+    first = await bench_gmail.run_suite(_args())
+    second = await bench_gmail.run_suite(_args())
+
+    assert list(first) == [name for name, *_ in bench_gmail.SCENARIOS]
+    for name in first:
+        for field in ("messages_per_run", "round_trips_per_run", "operations_per_run", "quota_units_per_run"):
+            assert first[name][field] == second[name][field], (name, field)
+    # a fifth of the mailbox comes from the top sender, and every run deletes all of it
+    assert first["execute_action"]["messages_per_run"] == 30
+    assert first["get_senders"]["operations_per_run"] == 101  # one list + one metadata fetch per message
+    assert bench_gmail.compare(second, first, threshold=10.0) == []
+
+
+@pytest.mark.asyncio
+async def test_injected_errors_are_retried_and_show_up_as_extra_round_trips():
+    clean = await bench_gmail.run_suite(_args(only=["get_senders"]))
+    flaky = await bench_gmail.run_suite(_args(only=["get_senders"], error_rate=0.1))
+
+    assert flaky["get_senders"]["retried"] > 0 and flaky["get_senders"]["dropped"] == 0
+    assert flaky["get_senders"]["messages_per_run"] == clean["get_senders"]["messages_per_run"]
+    regressions = bench_gmail.compare(flaky, clean, threshold=10.0)
+    assert "get_senders: round_trips_per_run 2 -> 3" in regressions
+
+
+def test_compare_flags_slower_or_lower_throughput_beyond_threshold():
+    base = {"p50_ms": 10.0, "messages_per_s": 1000.0, "round_trips_per_run": 2,
+            "operations_per_run": 10, "quota_units_per_run": 50}
+    assert bench_gmail.compare({"s": {**base, "p50_ms": 11.0}}, {"s": base}, 0.2) == []
+    assert bench_gmail.compare({"s": {**base, "p50_ms": 13.0}}, {"s": base}, 0.2) == ["s: p50 10.0ms -> 13.0ms"]
+    assert bench_gmail.compare({"s": {**base, "messages_per_s": 700.0}}, {"s": base}, 0.2) == [
+        "s: throughput 1000 -> 700 msg/s"
+    ]
+    assert bench_gmail.percentile([5, 1, 3, 2, 4], 50) == 3
+    assert bench_gmail.percentile([5, 1, 3, 2, 4], 99) == 5
+
+
+@pytest.mark.asyncio
+async def test_fake_latency_is_added_per_round_trip(fake_gmail):
+    mailbox, client = fake_gmail
+    mailbox.latency = 0.02
+    start = time.perf_counter()
+    await client.get_profile()
+    assert time.perf_counter() - start >= 0.02
@@ -0,0 +1,125 @@
+import asyncio
+
+import pytest
+
+from app.jobs.scanner import GmailScanner
+
+
+def _seed(mailbox, n):
+    for _ in range(n):
+        mailbox.add_message("Deals <deals@shop.com>", ["INBOX", "CATEGORY_PROMOTIONS"])
+
+
+@pytest.mark.asyncio
+async def test_bulk_mode_uses_far_fewer_round_trips_and_quota(fake_gmail, fake_user):
+    mailbox, client = fake_gmail
+    scanner = GmailScanner(fake_user, client)
+
+    _seed(mailbox, 400)
+    mailbox.round_trips = mailbox.quota_used = 0
+    per_message = await scanner.execute_action("deals@shop.com", "delete", mode="per_message")
+    per_message_trips, per_message_quota = mailbox.round_trips, mailbox.quota_used
+
+    _seed(mailbox, 400)
+    mailbox.round_trips = mailbox.quota_used = 0
+    bulk = await scanner.execute_action("deals@shop.com", "delete", mode="bulk")
+
+    assert per_message["messages_affected"] == bulk["messages_affected"] == 400
+    assert bulk["api_calls"] == 1 and bulk["api_calls_saved"] == 399
+    # each mode also lists once more for archived (non-inbox) mail, which comes back empty here
+    assert per_message_trips == 1 + 4 + 1  # list + 4 multipart batches
+    assert mailbox.round_trips == 1 + 1 + 1  # list + one batchModify
+    assert per_message_quota == 5 + 400 * 5 + 5
+    assert mailbox.quota_used == 5 + 50 + 5
+    assert all("TRASH" in m["labelIds"] for m in mailbox.messages.values())
+
+
+@pytest.mark.asyncio
+async def test_bulk_category_wipe_chunks_at_1000_ids(fake_gmail, fake_user):
+    mailbox, client = fake_gmail
+    _seed(mailbox, 1000)
+    scanner = GmailScanner(fake_user, client)
+
+    result = await scanner.execute_category_wipe("promotions")
+    assert result["messages_affected"] == 1000
+    assert mailbox.calls["batch_modify"] == result["api_calls"] == 1
+    assert "INBOX" not in next(iter(mailbox.messages.values()))["labelIds"]
+
+
+@pytest.mark.asyncio
+async def test_execute_plan_runs_senders_on_a_shared_client(fake_gmail, fake_user):
+    mailbox, client = fake_gmail
+    scanner = GmailScanner(fake_user, client)
+    senders = [f"news{i}@shop.com" for i in range(6)]
+    for sender in senders:
+        for _ in range(30):
+            mailbox.add_message(f"News <{sender}>", ["INBOX", "CATEGORY_PROMOTIONS"])
+
+    items = [(sender, "delete", None, None) for sender in senders] + [("friend@example.com", "keep", None, None)]
+    finished = []
+    result = await scanner.execute_plan(items, concurrency=3, on_result=finished.append)
+
+    assert result["succeeded"] == 6 and result["skipped"] == 1 and result["failed"] == 0
+    assert result["messages_affected"] == 180
+    assert sorted(o["sender"] for o in finished) == sorted(senders + ["friend@example.com"])
+    assert all("TRASH" in m["labelIds"] for m in mailbox.messages.values())
+
+
+@pytest.mark.asyncio
+async def test_execute_plan_reports_a_failing_sender_and_carries_on(fake_gmail, fake_user):
+    mailbox, client = fake_gmail
+    scanner = GmailScanner(fake_user, client)
+    for sender in ("a@shop.com", "b@shop.com"):
+        mailbox.add_message(f"<{sender}>", ["INBOX"])
+    # the grouped from:(a OR b) list fails, then a's own retry fails too
+    mailbox.error_status, mailbox.fail_next = 400, 2
+
+    finished = []
+    result = await scanner.execute_plan(
+        [("a@shop.com", "unsubscribe", None, None), ("b@shop.com", "unsubscribe", None, None)],
+        concurrency=1, on_result=finished.append,
+    )
+
+    assert result["failed"] == 1 and result["succeeded"] == 1 and result["query_groups"] == 1
+    assert finished[0]["status"] == "failed" and finished[1]["messages_affected"] == 1
+
+
+@pytest.mark.asyncio
+async def test_execute_plan_counts_a_repeated_sender_once(fake_gmail, fake_user):
+    mailbox, client = fake_gmail
+    scanner = GmailScanner(fake_user, client)
+    mailbox.add_message("<a@shop.com>", ["INBOX"])
+
+    result = await scanner.execute_plan([
+        ("a@shop.com", "delete", None, None), ("a@shop.com", "delete", None, None),
+        ("b@shop.com", "keep", None, None), ("b@shop.com", "keep", None, None),
+    ])
+
+    assert result["senders"] == 2
+    assert result["succeeded"] == 1 and result["skipped"] == 1
+
+
+@pytest.mark.asyncio
+async def test_execute_plan_cancels_the_other_workers_on_an_unexpected_error(fake_gmail, fake_user, monkeypatch):
+    _, client = fake_gmail
+    scanner = GmailScanner(fake_user, client)
+    cancelled = []
+
+    async def execute_action(sender_email, *args, **kwargs):
+        if sender_email == "a@shop.com":
+            raise RuntimeError("boom")
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(sender_email)
+            raise
+
+    monkeypatch.setattr(scanner, "execute_action", execute_action)
+    # one sender per group, so each runs through execute_action on its own worker
+    monkeypatch.setattr(scanner, "_plan_groups", lambda items, addresses: [(item[1], [], [item]) for item in items])
+
+    with pytest.raises(RuntimeError):
+        await scanner.execute_plan(
+            [("a@shop.com", "delete", None, None), ("b@shop.com", "delete", None, None)], concurrency=2,
+        )
+    assert cancelled == ["b@shop.com"]
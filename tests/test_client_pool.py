@@ -0,0 +1,60 @@
+import gc
+
+from app.gmail.pool import ClientPool
+
+
+class _User:
+    def __init__(self, user_id, token):
+        self.id = user_id
+        self.access_token = token
+
+
+def test_clients_are_reused_per_user_and_evicted_after_ttl():
+    now = [0.0]
+    pool = ClientPool(ttl_seconds=60, clock=lambda: now[0])
+
+    first = pool.get(_User(1, "a"))
+    assert pool.get(_User(1, "a")) is first
+    assert pool.get(_User(2, "b")) is not first
+    assert (pool.hits, pool.misses) == (1, 2)
+
+    # a refreshed token is picked up by the cached client
+    assert pool.get(_User(1, "rotated")).access_token == "rotated"
+
+    quota = first.quota
+    del first
+    gc.collect()
+    now[0] = 61
+    assert pool.get(_User(1, "rotated")).quota is not quota
+    assert len(pool) == 1  # user 2 idled out as well
+
+
+def test_evicted_client_still_in_use_is_handed_back():
+    now = [0.0]
+    pool = ClientPool(ttl_seconds=60, max_size=1, clock=lambda: now[0])
+
+    # a long scan keeps its client (and with it the account's quota bucket) past the TTL
+    busy = pool.get(_User(1, "a"))
+    now[0] = 61
+    assert pool.get(_User(1, "b")) is busy
+    assert busy.access_token == "b"
+
+    # crowded out by another account while still held: same client again
+    pool.get(_User(2, "t"))
+    assert len(pool) == 1
+    assert pool.get(_User(1, "c")) is busy
+    assert pool.usage(1)["active"]
+
+    # once nothing holds it, the next caller gets a fresh client
+    pool.discard(1)
+    quota = busy.quota
+    del busy
+    gc.collect()
+    assert pool.get(_User(1, "d")).quota is not quota
+
+
+def test_pool_is_bounded():
+    pool = ClientPool(ttl_seconds=60, max_size=2, clock=lambda: 0.0)
+    for uid in range(5):
+        pool.get(_User(uid, "t"))
+    assert len(pool) == 2
@@ -0,0 +1,128 @@
+import asyncio
+
+import pytest
+
+from app.cache import SingleFlight, TTLCache
+from app.config import get_settings
+from app.db.base import User
+from app.jobs import runner as runner_module
+from app.jobs import scanner as scanner_module
+from app.jobs.scanner import GmailScanner
+
+
+@pytest.mark.asyncio
+async def test_concurrent_identical_calls_share_one_upstream_call():
+    flight = SingleFlight(TTLCache(ttl_seconds=60))
+    upstream = []
+
+    async def fetch():
+        upstream.append(1)
+        await asyncio.sleep(0.01)
+        return {"senders": ["a"]}
+
+    results = await asyncio.gather(*(flight.do("k", fetch) for _ in range(10)))
+    assert len(upstream) == 1
+    assert all(r is results[0] for r in results)
+    assert await flight.do("k", fetch) is results[0]  # then from the short cache
+    assert flight.stats() == {
+        "upstream_calls": 1, "coalesced": 9, "cache_hits": 1, "calls_saved": 10, "in_flight": 0,
+    }
+
+
+@pytest.mark.asyncio
+async def test_failures_are_shared_but_not_cached():
+    flight = SingleFlight(TTLCache(ttl_seconds=60))
+    attempts = []
+
+    async def flaky():
+        attempts.append(1)
+        await asyncio.sleep(0.01)
+        if len(attempts) == 1:
+            raise RuntimeError("boom")
+        return "ok"
+
+    outcomes = await asyncio.gather(*(flight.do("k", flaky) for _ in range(3)), return_exceptions=True)
+    assert [type(o) for o in outcomes] == [RuntimeError] * 3
+    assert await flight.do("k", flaky) == "ok"
+    assert len(attempts) == 2
+
+
+@pytest.mark.asyncio
+async def test_scanner_reads_are_coalesced_per_account_and_dropped_after_a_mutation(fake_gmail, monkeypatch):
+    mailbox, client = fake_gmail
+    monkeypatch.setattr(scanner_module, "read_flight", SingleFlight(TTLCache(ttl_seconds=60)))
+    for _ in range(3):
+        mailbox.add_message("<deals@shop.com>", ["INBOX", "CATEGORY_PROMOTIONS", "UNREAD"])
+    user = User(id=7, email="a@example.com", access_token="t")
+
+    # three dashboard panels / tabs asking at once
+    summaries = await asyncio.gather(*(GmailScanner(user, client).get_scan_summary() for _ in range(3)))
+    senders = await asyncio.gather(*(GmailScanner(user, client).get_senders() for _ in range(3)))
+    assert summaries[0]["total_emails_scanned"] == 3
+    assert senders[0]["senders"][0]["total_emails"] == 3
+    assert mailbox.calls["list_messages"] == 1
+    assert scanner_module.read_flight.stats()["calls_saved"] == 4
+
+    # a different account never sees these results
+    other = User(id=8, email="b@example.com", access_token="t")
+    await GmailScanner(other, client).get_senders()
+    assert mailbox.calls["list_messages"] == 2
+
+    await GmailScanner(user, client).execute_action("deals@shop.com", "delete")
+    after = await GmailScanner(user, client).get_senders()
+    assert after["senders"] == []
+
+
+@pytest.mark.asyncio
+async def test_dashboard_requests_share_one_index_refresh(monkeypatch):
+    monkeypatch.setattr(runner_module, "index_refreshes", SingleFlight())
+    syncs = []
+
+    async def slow_refresh(user):
+        syncs.append(user.id)
+        await asyncio.sleep(0.01)
+        return {"mode": "incremental"}
+
+    monkeypatch.setattr(runner_module, "_refresh_index", slow_refresh)
+    user = User(id=3, email="a@example.com")
+    results = await asyncio.gather(*(runner_module.refresh_index(user) for _ in range(3)))
+    assert syncs == [3]
+    assert [r["mode"] for r in results] == ["incremental"] * 3
+
+
+@pytest.mark.asyncio
+async def test_shared_index_refresh_runs_on_its_own_session(session_factory, monkeypatch):
+    monkeypatch.setattr(runner_module, "index_refreshes", SingleFlight())
+    opened, synced_on = [], []
+
+    def sessions():
+        session = session_factory()
+        opened.append(session)
+        return session
+
+    class Sync:
+        def __init__(self, db, user, scanner_factory):
+            self.db = db
+
+        async def ensure_fresh(self):
+            synced_on.append(self.db)
+            await asyncio.sleep(0.01)
+            return {"mode": "incremental"}
+
+    monkeypatch.setattr(runner_module, "SessionLocal", sessions)
+    monkeypatch.setattr(runner_module, "MailboxSync", Sync)
+    user = User(id=3, email="a@example.com")
+    await asyncio.gather(*(runner_module.refresh_index(user) for _ in range(3)))
+    assert len(opened) == 1 and synced_on == opened
+
+
+@pytest.mark.asyncio
+async def test_coalescing_stats_need_a_signed_in_user(db, api_client, monkeypatch):
+    db.add(User(email="test@example.com", access_token="t"))
+    await db.commit()
+
+    stats = (await api_client.get("/scan/coalescing/stats")).json()
+    assert set(stats) == {"scanner_reads", "index_refreshes"}
+
+    monkeypatch.setattr(get_settings(), "OWNER_FALLBACK", False)
+    assert (await api_client.get("/scan/coalescing/stats")).status_code == 401
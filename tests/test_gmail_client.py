@@ -0,0 +1,81 @@
+import pytest
+
+from app.gmail.batch import BatchRequest
+from app.gmail.client import API_PREFIX, GmailAPIError
+from app.jobs.scanner import GmailScanner
+
+
+@pytest.mark.asyncio
+async def test_rest_calls(fake_gmail):
+    mailbox, client = fake_gmail
+    mid = mailbox.add_message("Shop <news@shop.com>", ["INBOX", "UNREAD"])
+
+    listed = await client.list_messages(q="from:shop.com")
+    assert [m["id"] for m in listed["messages"]] == [mid]
+    msg = await client.get_message(mid, metadata_headers=["From"])
+    assert msg["payload"]["headers"] == [{"name": "From", "value": "Shop <news@shop.com>"}]
+
+    await client.modify_message(mid, remove_label_ids=["UNREAD"])
+    assert (await client.get_label("UNREAD"))["messagesUnread"] == 0
+    await client.batch_modify([mid], add_label_ids=["STARRED"])
+    await client.trash_message(mid)
+    assert mailbox.messages[mid]["labelIds"] == ["STARRED", "TRASH"]
+
+    with pytest.raises(GmailAPIError) as err:
+        await client.get_message("missing")
+    assert err.value.status == 404 and err.value.reason == "notFound"
+
+
+@pytest.mark.asyncio
+async def test_from_queries_match_whole_addresses(fake_gmail):
+    mailbox, client = fake_gmail
+    a = mailbox.add_message("A <a@x.com>")
+    aa = mailbox.add_message("aa@x.com")
+    sub = mailbox.add_message("Alerts <a@mail.x.com>")
+
+    async def ids(q):
+        return {m["id"] for m in (await client.list_messages(q=q)).get("messages", [])}
+
+    assert await ids("from:a@x.com") == {a}
+    assert await ids("from:(a@x.com OR aa@x.com)") == {a, aa}
+    assert await ids("from:x.com") == {a, aa, sub}
+    assert await ids("from:mail.x.com") == {sub}
+
+
+@pytest.mark.asyncio
+async def test_multipart_batches_run_in_chunks(fake_gmail):
+    mailbox, client = fake_gmail
+    ids = [mailbox.add_message(f"s{i}@example.com") for i in range(250)]
+
+    results = await client.batch_get_messages(ids + ["missing"], metadata_headers=["From"])
+    assert [r["id"] for r in results[:250]] == ids
+    assert isinstance(results[250], GmailAPIError) and results[250].status == 404
+    assert mailbox.round_trips == 3  # 251 sub-requests -> 3 batches of <=100
+
+    results = await client.batch([BatchRequest("POST", f"{API_PREFIX}/messages/{ids[0]}/trash")])
+    assert "TRASH" in results[0]["labelIds"]
+
+
+@pytest.mark.asyncio
+async def test_scanner_actions(fake_gmail, fake_user):
+    mailbox, client = fake_gmail
+    for i in range(120):
+        mailbox.add_message("Deals <deals@shop.com>", ["INBOX", "CATEGORY_PROMOTIONS", "UNREAD"])
+    mailbox.add_message("friend@mail.com", ["INBOX", "CATEGORY_SOCIAL"])
+    scanner = GmailScanner(fake_user, client)
+
+    page = await scanner.get_senders(50, "promotions")
+    assert page["senders"][0]["email"] == "deals@shop.com"
+    assert page["senders"][0]["total_emails"] == 50
+    assert page["next_page_token"]
+
+    result = await scanner.execute_action("deals@shop.com", "unsubscribe")
+    assert result["messages_affected"] == 120
+    assert all("INBOX" not in m["labelIds"] for m in mailbox.messages.values() if "shop" in m["headers"][0]["value"])
+
+    wiped = await scanner.execute_category_wipe("social")
+    assert wiped["messages_affected"] == 1
+
+    summary = await scanner.get_scan_summary()
+    assert summary["total_unread"] == 120
+    assert summary["unread_by_category"] == {"Promotions": 120}
@@ -0,0 +1,52 @@
+import pytest
+
+from app.db.base import User
+from app.gmail.headers import METADATA_HEADERS, date_ms, is_bulk, parse_headers, parse_sender
+from app.jobs.scanner import GmailScanner
+
+
+def test_headers_fold_into_one_lowercase_map():
+    headers = parse_headers([
+        {"name": "FROM", "value": "Shop <news@shop.com>"},
+        {"name": "list-unsubscribe", "value": "<https://u>"},
+        {"name": "From", "value": "second@shop.com"},
+    ])
+    assert headers == {"from": "Shop <news@shop.com>", "list-unsubscribe": "<https://u>"}
+    assert is_bulk({"precedence": " Bulk "}) and is_bulk({"list-id": "<x.y>"}) and not is_bulk(headers)
+
+
+def test_sender_parsing_is_memoized():
+    parse_sender.cache_clear()
+    assert parse_sender('"Shop, Inc." <News@Shop.com>') == ("news@shop.com", "Shop, Inc.")
+    assert parse_sender("alerts@bank.com") == ("alerts@bank.com", "Alerts")
+    assert parse_sender('"Shop, Inc." <News@Shop.com>') == ("news@shop.com", "Shop, Inc.")
+    assert parse_sender.cache_info().hits == 1
+
+
+def test_date_header_parsing():
+    assert date_ms("Mon, 20 Nov 2023 10:00:00 +0000") == 1_700_474_400_000
+    assert date_ms("not a date") == 0 and date_ms("") == 0
+
+
+@pytest.mark.asyncio
+async def test_one_metadata_call_returns_unsubscribe_and_list_headers(fake_gmail):
+    mailbox, client = fake_gmail
+    mailbox.add_message("Shop <deals@shop.com>", ["INBOX", "CATEGORY_PROMOTIONS"], headers={
+        "List-Unsubscribe": "<https://shop.com/u>", "List-Unsubscribe-Post": "List-Unsubscribe=One-Click",
+    })
+    # list mail in the primary tab, recognised by its List-Id
+    mid = mailbox.add_message("Club <club@lists.org>", ["INBOX", "CATEGORY_PERSONAL"], internal_date=0, headers={
+        "List-Id": "<club.lists.org>", "Date": "Mon, 20 Nov 2023 10:00:00 +0000",
+    })
+    scanner = GmailScanner(User(email="a@example.com", access_token="t"), client)
+
+    result = await scanner.get_senders()
+    senders = {s["email"]: s for s in result["senders"]}
+    assert senders["deals@shop.com"]["list_unsubscribe"] == "<https://shop.com/u>"
+    assert senders["deals@shop.com"]["list_unsubscribe_post"] == "List-Unsubscribe=One-Click"
+    assert senders["club@lists.org"]["suggested_action"] == "unsubscribe"
+    assert mailbox.calls["get_message"] == 2  # no second fetch per message
+
+    [row] = await scanner.fetch_metadata([mid])
+    assert row["internal_date"] == 1_700_474_400_000  # falls back to the Date header
+    assert len(METADATA_HEADERS) == 6
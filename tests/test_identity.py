@@ -0,0 +1,95 @@
+import pytest
+
+from app.db.base import User
+from app.jobs import index
+from app.jobs.identity import canonical_address, from_query_groups, registrable_domain
+from app.jobs.scanner import GmailScanner
+from app.jobs.sync import MailboxSync
+
+
+def test_canonical_identity_and_domain():
+    assert canonical_address(" News+Promo-42@Shop.COM ") == "news@shop.com"
+    assert canonical_address("+tag@shop.com") == "+tag@shop.com"
+    assert registrable_domain("a@mail.news.shop.com") == "shop.com"
+    assert registrable_domain("a@mail.shop.co.uk") == "shop.co.uk"
+    assert registrable_domain("shop.com") == "shop.com"
+
+
+def test_query_groups_stay_within_the_length_limit():
+    senders = [(f"news{i}@shop{i}.com", None) for i in range(50)]
+    senders.append(("big@corp.com", [f"big+{i}@corp.com" for i in range(30)]))
+    groups = from_query_groups(senders, 200)
+
+    assert all(len(q) <= 200 for q, _ in groups)
+    assert [s for _, members in groups for s in members][:50] == [s for s, _ in senders[:50]]
+    assert groups[0][0].startswith("from:(news0@shop0.com OR news1@shop1.com OR ")
+    # too many aliases for one query: that sender gets queries to itself
+    assert len([g for g in groups if g[1] == ["big@corp.com"]]) > 1
+    assert from_query_groups([("a@x.com", None)], 200) == [("from:a@x.com", ["a@x.com"])]
+
+
+@pytest.mark.asyncio
+async def test_plan_over_many_senders_lists_once_per_query_group(fake_gmail, fake_user):
+    mailbox, client = fake_gmail
+    senders = [f"news{i}@mail{i}.shop.com" for i in range(60)]
+    for sender in senders:
+        mailbox.add_message(f"Shop <{sender}>", ["INBOX", "CATEGORY_PROMOTIONS"])
+        mailbox.add_message(f"Shop <{sender}>", ["CATEGORY_PROMOTIONS"])  # archived
+    finished = []
+
+    result = await GmailScanner(fake_user, client).execute_plan(
+        [(s, "delete", None, None) for s in senders], on_result=finished.append,
+    )
+
+    assert result["succeeded"] == 60 and result["messages_affected"] == 120
+    assert result["query_groups"] == 2  # 60 addresses don't fit in one 1024-character query
+    # one list per group and pass (inbox, then archived), instead of 2 per sender
+    assert mailbox.calls["list_messages"] == 4
+    assert len(finished) == 60 and {o["sender"] for o in finished} == set(senders)
+    assert all("TRASH" in m["labelIds"] for m in mailbox.messages.values())
+
+
+@pytest.mark.asyncio
+async def test_aliases_collapse_into_one_sender_and_domains_roll_up(db, fake_gmail, api_client, monkeypatch):
+    import app.routes.actions as actions
+    import app.routes.senders as senders_routes
+
+    mailbox, client = fake_gmail
+    for n in range(3):
+        mailbox.add_message(f"Shop <bounce+{n}@news.shop.com>", ["INBOX", "CATEGORY_PROMOTIONS"])
+    mailbox.add_message("Shop <deals@shop.com>", ["INBOX", "CATEGORY_PROMOTIONS"])
+    mailbox.add_message("friend@mail.com", ["INBOX", "CATEGORY_PERSONAL"])
+    user = User(email="test@example.com", access_token="t")
+    db.add(user)
+    await db.commit()
+    await MailboxSync(db, user, lambda u: GmailScanner(u, client)).run()
+
+    senders = {s["email"]: s for s in (await index.list_senders(db, user.id))["senders"]}
+    assert senders["bounce@news.shop.com"]["total_emails"] == 3
+    assert senders["bounce@news.shop.com"]["domain"] == "shop.com"
+    assert (await index.sender_addresses(db, user.id, ["bounce@news.shop.com", "new@x.com"])) == {
+        "bounce@news.shop.com": [f"bounce+{n}@news.shop.com" for n in range(3)],
+        "new@x.com": ["new@x.com"],
+    }
+
+    async def cached(user):
+        return {"mode": "cached"}
+
+    monkeypatch.setattr(senders_routes, "refresh_index", cached)
+    monkeypatch.setattr(actions, "GmailScanner", lambda user: GmailScanner(user, client))
+
+    domains = (await api_client.get("/senders/domains")).json()
+    company = (await api_client.get("/senders/domains/shop.com")).json()
+    missing = await api_client.get("/senders/domains/nowhere.org")
+    mailbox.calls.clear()
+    deleted = (await api_client.post("/plan/execute", json={
+        "target_email": "bounce@news.shop.com", "action_type": "delete",
+    })).json()
+
+    assert [(d["domain"], d["senders"], d["total_emails"]) for d in domains["domains"]] == [
+        ("shop.com", 2, 4), ("mail.com", 1, 1),
+    ]
+    assert company == {"domain": "shop.com", "senders": ["bounce@news.shop.com", "deals@shop.com"]}
+    assert missing.status_code == 404
+    # every alias goes into one from:(a OR b OR c) query per pass
+    assert deleted["messages_affected"] == 3 and mailbox.calls["list_messages"] == 2
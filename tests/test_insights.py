@@ -0,0 +1,35 @@
+import json
+
+import pytest
+
+from app.db.base import SenderStat, User
+from app.jobs.aggregate import sender_id
+
+
+@pytest.mark.asyncio
+async def test_unsubscribe_candidates_are_the_senders_scored_for_unsubscribe(db, api_client, monkeypatch):
+    import app.routes.senders as senders
+
+    user = User(email="test@example.com", access_token="t")
+    db.add(user)
+    await db.flush()
+    for email, total, unread, mix, last_read in (
+        ("news@shop.com", 40, 38, {"promotions": 40}, None),
+        ("bob@example.com", 12, 0, {"primary": 12}, 1_760_000_000_000),
+    ):
+        db.add(SenderStat(
+            user_id=user.id, email=email, sender_id=sender_id(email), total_emails=total, unread_count=unread,
+            first_seen=1_750_000_000_000, last_seen=1_760_000_000_000, last_read=last_read,
+            category_mix=json.dumps(mix), list_unsubscribe="<https://u>" if unread else "",
+        ))
+    await db.commit()
+
+    async def cached(user):
+        return {"mode": "cached"}
+
+    monkeypatch.setattr(senders, "refresh_index", cached)
+
+    resp = await api_client.get("/insights/unsubscribe-candidates")
+
+    assert resp.status_code == 200
+    assert [s["email"] for s in resp.json()] == ["news@shop.com"]
@@ -0,0 +1,73 @@
+import pytest
+
+from app import metrics
+from app.db.base import User
+from app.jobs.scanner import GmailScanner
+
+
+def _sample(text, prefix):
+    """Value of the single exposition line starting with `prefix`."""
+    lines = [line for line in text.splitlines() if line.startswith(prefix)]
+    assert len(lines) == 1, lines
+    return float(lines[0].rsplit(" ", 1)[1])
+
+
+def test_exposition_format():
+    latency = metrics.Histogram("t_latency_seconds", "Test.", ("op",), buckets=(0.1, 1.0), register=False)
+    for value in (0.05, 0.5, 5.0):
+        latency.observe(value, op='say "hi"')
+    calls = metrics.Counter("t_calls_total", "Test.", ("account",), register=False)
+    calls.inc(5, account=1)
+    calls.inc(account=1)
+
+    text = metrics.render([latency, calls])
+    assert "# TYPE t_latency_seconds histogram" in text
+    assert 't_latency_seconds_bucket{op="say \\"hi\\"",le="0.1"} 1' in text
+    assert 't_latency_seconds_bucket{op="say \\"hi\\"",le="1.0"} 2' in text
+    assert 't_latency_seconds_bucket{op="say \\"hi\\"",le="+Inf"} 3' in text
+    assert 't_latency_seconds_sum{op="say \\"hi\\""} 5.55' in text
+    assert 't_calls_total{account="1"} 6' in text
+    with pytest.raises(ValueError):
+        calls.inc(user=1)
+
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint_reports_gmail_scanner_and_route_timings(fake_gmail, db, api_client, monkeypatch):
+    import app.routes.scan as scan
+
+    mailbox, client = fake_gmail
+    client.account = "metrics-test"
+    for _ in range(3):
+        mailbox.add_message("<deals@shop.com>", ["INBOX", "CATEGORY_PROMOTIONS", "UNREAD"])
+    user = User(email="test@example.com", access_token="t")
+    db.add(user)
+    await db.commit()
+
+    async def needs_full(user):
+        return {"mode": "needs_full"}
+
+    monkeypatch.setattr(scan, "refresh_index", needs_full)
+    monkeypatch.setattr(scan, "GmailScanner", lambda user: GmailScanner(user, client))
+    monkeypatch.setattr(scan.summary_cache, "ttl_seconds", 0)
+
+    before = metrics.GMAIL_SUBREQUEST_FAILURES.value(op="get_message", status=404)
+    await client.batch_get_messages(["missing-id"])
+    assert metrics.GMAIL_SUBREQUEST_FAILURES.value(op="get_message", status=404) == before + 1
+
+    assert (await api_client.get("/scan/summary")).json()["total_emails_scanned"] == 3
+    resp = await api_client.get("/metrics")
+
+    assert resp.headers["content-type"].startswith("text/plain; version=0.0.4")
+    text = resp.text
+    # one batch: the profile plus six label lookups = 1 + 6 quota units, and one missing message = 5
+    assert _sample(text, 'gmail_quota_units_total{account="metrics-test"}') == 12
+    assert _sample(text, 'gmail_request_duration_seconds_count{op="batch",status="200"}') >= 2
+    assert _sample(text, 'scanner_call_duration_seconds_count{method="get_scan_summary",outcome="ok"}') >= 1
+    # routes are labelled by template, and streams/JSON alike are timed to the last byte
+    assert _sample(text, 'http_request_duration_seconds_count{method="GET",route="/scan/summary",status="200"}') >= 1
+    assert 'background_tasks_in_flight{kind="scan_jobs"}' in text
+    assert 'scheduler_turns{state="slots"}' in text
+    # running totals are counters; the summary load above was a scan_summary cache miss
+    assert "# TYPE cache_misses_total counter" in text
+    assert _sample(text, 'cache_misses_total{cache="scan_summary"}') >= 1
+    assert 'coalesced_calls_saved_total{layer="scanner_reads"}' in text
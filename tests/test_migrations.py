@@ -20,5 +20,12 @@ def test_tables_exist_after_migration():
     eng = create_engine("sqlite:///./test.db")
     insp = inspect(eng)
     tables = set(insp.get_table_names())
-    for t in ("audits", "action_plans", "undo_windows"):
+    for t in ("audits", "audit_logs", "action_plans", "undo_windows", "message_index", "sync_state", "sender_stats", "scan_jobs"):
         assert t in tables, f"Missing table: {t}"
+
+    indexes = {ix["name"] for ix in insp.get_indexes("audit_logs")}
+    assert {"ix_audit_logs_user", "ix_audit_logs_user_event_type"} <= indexes
+    assert "user_id" in {c["name"] for c in insp.get_columns("audit_logs")}
+    assert "ix_sender_stats_user_domain" in {ix["name"] for ix in insp.get_indexes("sender_stats")}
+    assert "address" in {c["name"] for c in insp.get_columns("message_index")}
+    assert "watch_expires_at" in {c["name"] for c in insp.get_columns("sync_state")}
@@ -0,0 +1,202 @@
+import asyncio
+import base64
+import json
+from datetime import datetime, timedelta
+
+import pytest
+import pytest_asyncio
+
+from app.config import get_settings
+from app.db.base import SyncState, User
+from tests.fakes.pubsub import FakePubSub
+from app.jobs import index
+from app.jobs.push import PushNotConfigured, PushSync
+from app.jobs.scanner import GmailScanner
+from app.jobs.sync import MailboxSync
+import app.routes.push as push_routes
+
+TOPIC = "projects/test/topics/gmail"
+
+
+class _Runner:
+    def __init__(self):
+        self.enqueued = []
+
+    async def enqueue(self, db, user):
+        self.enqueued.append(user.id)
+
+
+async def _indexed_user(db, mailbox, client):
+    mailbox.add_message("Shop <news@shop.com>", ["UNREAD", "CATEGORY_PROMOTIONS"], 1000)
+    user = User(email=mailbox.email, access_token="t")
+    db.add(user)
+    await db.commit()
+    await MailboxSync(db, user, lambda u: GmailScanner(u, client)).run()
+    return user
+
+
+@pytest_asyncio.fixture
+async def session_factory(tmp_path):
+    """A file database: notifications are read while a sync is mid-transaction, which
+    needs a connection per session (the shared in-memory one would interleave them)."""
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+    from app.db.base import Base
+
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'push.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield async_sessionmaker(engine, expire_on_commit=False)
+    await engine.dispose()
+
+
+@pytest.fixture
+def push(session_factory, fake_gmail, monkeypatch):
+    _, client = fake_gmail
+    monkeypatch.setattr(get_settings(), "GMAIL_PUSH_TOPIC", TOPIC)
+    monkeypatch.setattr(get_settings(), "PUSH_VERIFICATION_TOKEN", "s3cret")
+    push = PushSync(session_factory, scanner_factory=lambda u: GmailScanner(u, client), runner=_Runner())
+    monkeypatch.setattr(push_routes, "push_sync", push)
+    return push
+
+
+@pytest_asyncio.fixture
+async def pubsub(fake_gmail, push, api_client):
+    mailbox, _ = fake_gmail
+    pubsub = FakePubSub(retry_delay=0.001, max_attempts=3)
+    pubsub.subscribe(TOPIC, "projects/test/subscriptions/app", "/push/gmail?token=s3cret", api_client)
+    pubsub.attach(mailbox)
+    yield pubsub
+    await pubsub.close()
+
+
+def _envelope(data):
+    return {"message": {"data": base64.b64encode(json.dumps(data).encode()).decode(), "messageId": "1"},
+            "subscription": "projects/test/subscriptions/app"}
+
+
+@pytest.mark.asyncio
+async def test_notifications_update_the_index_without_polling(db, fake_gmail, push, pubsub):
+    mailbox, _ = fake_gmail
+    user = await _indexed_user(db, mailbox, fake_gmail[1])
+    registered = await push.watch(db, user)
+    assert mailbox.watch_topic == TOPIC
+    assert registered["topic"] == TOPIC
+
+    mailbox.add_message("Bank <alerts@bank.com>", ["UNREAD", "CATEGORY_UPDATES"], 2000)
+    await pubsub.drain()
+    await push.wait()
+
+    assert pubsub.stats()["delivered"] == 1
+    assert push.stats() == {"syncs": 1, "syncing": 0, "failures": 0}
+    async with push._session_factory() as fresh:
+        senders = {s["email"] for s in (await index.list_senders(fresh, user.id))["senders"]}
+        summary = await index.summary(fresh, user.id)
+        state = await fresh.get(SyncState, user.id)
+    assert senders == {"news@shop.com", "alerts@bank.com"}
+    assert summary["total_emails_scanned"] == 2 and summary["total_unread"] == 2
+    assert state.history_id == str(mailbox.history_id)
+
+    # While the watch is active, request-time freshness checks don't touch Gmail
+    mailbox.calls.clear()
+    async with push._session_factory() as fresh:
+        user = await fresh.get(User, user.id)
+        assert await MailboxSync(fresh, user, lambda u: pytest.fail("Gmail contacted")).ensure_fresh(0) == {"mode": "push"}
+    assert not mailbox.calls
+
+
+@pytest.mark.asyncio
+async def test_a_long_quiet_watch_still_syncs_on_request(db, fake_gmail, push):
+    mailbox, client = fake_gmail
+    user = await _indexed_user(db, mailbox, client)
+    await push.watch(db, user)
+    # a change whose notification never arrived
+    mailbox.add_message("Bank <alerts@bank.com>", ["UNREAD", "CATEGORY_UPDATES"], 2000)
+
+    state = await db.get(SyncState, user.id)
+    state.last_synced_at = datetime.utcnow() - timedelta(seconds=get_settings().PUSH_MAX_INDEX_AGE_SECONDS + 1)
+    await db.commit()
+
+    result = await MailboxSync(db, user, lambda u: GmailScanner(u, client)).ensure_fresh()
+    assert result["mode"] == "incremental" and result["added"] == 1
+    assert (await index.summary(db, user.id))["total_emails_scanned"] == 2
+
+
+@pytest.mark.asyncio
+async def test_bursts_coalesce_and_redeliveries_are_stale(db, fake_gmail, push, pubsub):
+    mailbox, client = fake_gmail
+    user = await _indexed_user(db, mailbox, client)
+    await push.watch(db, user)
+
+    for i in range(5):
+        mailbox.add_message(f"user{i}@mail.com", ["INBOX"], 2000 + i)
+    await pubsub.drain()
+    await push.wait()
+
+    # never one sync per notification, and nothing is missed
+    assert 1 <= push.syncs < 5
+    async with push._session_factory() as fresh:
+        assert (await index.summary(fresh, user.id))["total_emails_scanned"] == 6
+
+    assert await push.notify(mailbox.email, mailbox.history_id) == "stale"
+    assert await push.notify("stranger@example.com", 1) == "unknown_account"
+
+
+@pytest.mark.asyncio
+async def test_a_notification_right_after_the_last_sync_is_not_lost(push, monkeypatch):
+    synced = []
+
+    async def sync(user_id):
+        synced.append(user_id)
+        if len(synced) == 1:
+            # runs once this sync has finished, before anything else sees the task done
+            asyncio.get_running_loop().call_soon(push._schedule, user_id)
+
+    monkeypatch.setattr(push, "_sync", sync)
+    push._schedule(1)
+    await push.wait()
+
+    assert synced == [1, 1]
+    assert push.stats()["syncing"] == 0
+
+
+@pytest.mark.asyncio
+async def test_webhook_rejects_bad_tokens_and_malformed_envelopes(push, api_client):
+    data = {"emailAddress": "stranger@example.com", "historyId": "5"}
+    assert (await api_client.post("/push/gmail", json=_envelope(data))).status_code == 403
+    assert (await api_client.post("/push/gmail?token=wrong", json=_envelope(data))).status_code == 403
+    assert (await api_client.post("/push/gmail?token=s3cret", json={"message": {"data": "%%"}})).status_code == 400
+    # unknown accounts are acked so Pub/Sub stops redelivering
+    assert (await api_client.post("/push/gmail?token=s3cret", json=_envelope(data))).status_code == 204
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("setting", ["GMAIL_PUSH_TOPIC", "PUSH_VERIFICATION_TOKEN"])
+async def test_webhook_is_closed_until_push_is_configured(push, api_client, monkeypatch, setting):
+    monkeypatch.setattr(get_settings(), setting, "")
+    data = {"emailAddress": "stranger@example.com", "historyId": "5"}
+    for url in ("/push/gmail", "/push/gmail?token=s3cret"):
+        assert (await api_client.post(url, json=_envelope(data))).status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_renewal_watches_accounts_without_a_current_watch(db, fake_gmail, push, monkeypatch):
+    mailbox, client = fake_gmail
+    user = await _indexed_user(db, mailbox, client)
+    db.add(User(email="signed-out@example.com"))
+    await db.commit()
+
+    assert await push.renew_due() == 1
+    async with push._session_factory() as fresh:
+        expires_at = (await fresh.get(SyncState, user.id)).watch_expires_at
+    assert expires_at > datetime.utcnow() + timedelta(days=6)
+    # nothing is due until the watch gets within the lead time of expiring
+    assert await push.renew_due() == 0
+
+    await push.stop(db, user)
+    assert mailbox.watch_topic is None
+    assert (await db.get(SyncState, user.id)).watch_expires_at is None
+
+    monkeypatch.setattr(get_settings(), "GMAIL_PUSH_TOPIC", "")
+    assert await push.renew_due() == 0
+    with pytest.raises(PushNotConfigured):
+        await push.watch(db, user)
@@ -0,0 +1,162 @@
+import httpx
+import pytest
+
+from app.gmail.client import TRANSPORT_ERROR, AsyncGmailClient, GmailAPIError
+from app.gmail.ratelimit import AdaptiveBatchSize, RetryPolicy, TokenBucket, track_calls
+from tests.fakes.gmail import FakeMailbox, create_fake_gmail_app
+
+
+@pytest.mark.asyncio
+async def test_token_bucket_paces_spending():
+    now = [0.0]
+
+    async def sleep(seconds):
+        now[0] += seconds
+
+    bucket = TokenBucket(rate=250, clock=lambda: now[0], sleep=sleep)
+    assert await bucket.acquire(250) == 0  # full burst available
+    waited = await bucket.acquire(500)  # capped at capacity, waits for a full refill
+    assert waited == pytest.approx(1.0)
+    assert now[0] == pytest.approx(1.0)
+
+
+def test_retry_delay_is_jittered_and_capped():
+    policy = RetryPolicy(base_delay=0.5, max_delay=4, rng=lambda: 1.0)
+    assert [policy.delay(a) for a in range(5)] == [0.5, 1.0, 2.0, 4, 4]
+    assert RetryPolicy(rng=lambda: 0.0).delay(3) == 0.0
+
+
+def test_adaptive_batch_size():
+    size = AdaptiveBatchSize(maximum=100, minimum=10)
+    size.record(100, 20)
+    size.record(50, 10)
+    assert size.current == 25
+    size.record(25, 0)
+    assert size.current == 35
+    for _ in range(10):
+        size.record(100, 100)
+    assert size.current == 10
+
+
+@pytest.mark.asyncio
+async def test_batch_retries_rate_limited_sub_requests_without_losing_messages(fake_gmail):
+    mailbox, client = fake_gmail
+    ids = [mailbox.add_message(f"s{i}@example.com") for i in range(500)]
+    mailbox.error_rate = 0.3
+
+    with track_calls() as stats:
+        results = await client.batch_get_messages(ids)
+
+    assert [r["id"] for r in results] == ids
+    assert stats.retried > 0 and stats.dropped == 0
+    assert client.batch_size.current < 100
+    assert stats.quota_units >= 500 * 5
+
+
+@pytest.mark.asyncio
+async def test_exhausted_retries_are_counted_as_dropped(fake_gmail):
+    mailbox, client = fake_gmail
+    mid = mailbox.add_message("a@example.com")
+    client.retry.max_retries = 2
+    mailbox.error_rate = 1.0
+
+    with track_calls() as stats:
+        results = await client.batch_get_messages([mid])
+        with pytest.raises(GmailAPIError):
+            await client.get_profile()
+
+    assert isinstance(results[0], GmailAPIError) and results[0].retryable
+    assert stats.retried == 4 and stats.dropped == 2
+
+
+@pytest.mark.asyncio
+async def test_single_request_recovers_after_rate_limit(fake_gmail):
+    mailbox, client = fake_gmail
+    mailbox.fail_next = 2
+    assert (await client.get_profile())["emailAddress"] == mailbox.email
+    assert client.stats.retried == 2
+
+
+class _Flaky(httpx.AsyncBaseTransport):
+    """Raises `error` for the first `failures` requests, then hands over to `inner`."""
+
+    def __init__(self, inner, failures, error=httpx.ReadTimeout):
+        self.inner = inner
+        self.failures = failures
+        self.error = error
+
+    async def handle_async_request(self, request):
+        if self.failures:
+            self.failures -= 1
+            raise self.error("network blip", request=request)
+        return await self.inner.handle_async_request(request)
+
+
+def _flaky_client(mailbox, failures, error=httpx.ReadTimeout):
+    transport = _Flaky(httpx.ASGITransport(app=create_fake_gmail_app(mailbox)), failures, error)
+    http = httpx.AsyncClient(transport=transport, base_url="http://fake-gmail")
+    return AsyncGmailClient("t", http=http, quota=TokenBucket(10**9), retry=RetryPolicy(max_retries=2, base_delay=0.001))
+
+
+@pytest.mark.asyncio
+async def test_network_errors_are_retried_with_backoff():
+    mailbox = FakeMailbox()
+    ids = [mailbox.add_message(f"s{i}@example.com") for i in range(3)]
+
+    client = _flaky_client(mailbox, failures=2)
+    with track_calls() as stats:
+        assert (await client.get_profile())["emailAddress"] == mailbox.email
+    assert stats.retried == 2 and stats.dropped == 0
+
+    client = _flaky_client(mailbox, failures=1, error=httpx.RemoteProtocolError)
+    assert [r["id"] for r in await client.batch_get_messages(ids)] == ids
+    assert client.stats.retried == 3  # the whole envelope's sub-requests went round again
+
+
+@pytest.mark.asyncio
+async def test_network_errors_past_the_retry_budget_are_dropped():
+    mailbox = FakeMailbox()
+    mid = mailbox.add_message("a@example.com")
+
+    client = _flaky_client(mailbox, failures=10)
+    with track_calls() as stats:
+        with pytest.raises(httpx.ReadTimeout):
+            await client.get_profile()
+        results = await client.batch_get_messages([mid])
+    assert isinstance(results[0], GmailAPIError) and results[0].reason == TRANSPORT_ERROR
+    assert stats.retried == 4 and stats.dropped == 2
+
+    # a send may already have gone out when the read timed out, so it isn't repeated
+    client = _flaky_client(mailbox, failures=1)
+    with pytest.raises(httpx.ReadTimeout):
+        await client.send_message("aGk=")
+    assert client.stats.retried == 0 and not mailbox.sent
+
+
+class _ProxyPage(_Flaky):
+    """Answers the first `failures` requests with a proxy's HTML 502 page."""
+
+    async def handle_async_request(self, request):
+        if self.failures:
+            self.failures -= 1
+            return httpx.Response(502, html="<html><body><h1>502 Bad Gateway</h1></body></html>")
+        return await self.inner.handle_async_request(request)
+
+
+@pytest.mark.asyncio
+async def test_non_json_error_pages_are_retried_like_any_5xx():
+    mailbox = FakeMailbox()
+    ids = [mailbox.add_message(f"s{i}@example.com") for i in range(2)]
+    transport = _ProxyPage(httpx.ASGITransport(app=create_fake_gmail_app(mailbox)), failures=2)
+    http = httpx.AsyncClient(transport=transport, base_url="http://fake-gmail")
+    client = AsyncGmailClient("t", http=http, quota=TokenBucket(10**9), retry=RetryPolicy(max_retries=2, base_delay=0.001))
+
+    assert (await client.get_profile())["emailAddress"] == mailbox.email
+    transport.failures = 1
+    assert [r["id"] for r in await client.batch_get_messages(ids)] == ids
+    assert client.stats.retried == 2 + 2
+
+    transport.failures = 3
+    with pytest.raises(GmailAPIError) as excinfo:
+        await client.get_profile()
+    assert excinfo.value.status == 502 and "Bad Gateway" in excinfo.value.message
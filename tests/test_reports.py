@@ -0,0 +1,11 @@
+import pytest
+
+
+@pytest.mark.asyncio
+async def test_latest_report_as_json_and_pdf(api_client):
+    report = await api_client.get("/reports/latest")
+    pdf = await api_client.get("/reports/latest.pdf")
+
+    assert set(report.json()["summary"]) == {"unread_senders", "labels_created", "unsubscribe_candidates"}
+    assert pdf.headers["content-type"] == "application/pdf"
+    assert pdf.content.startswith(b"%PDF-1.4") and pdf.content.rstrip().endswith(b"%%EOF")
@@ -0,0 +1,183 @@
+import asyncio
+
+import pytest
+
+from app.db.base import ScanJob, User
+from app.jobs import index
+from app.jobs.runner import ScanJobRunner, job_progress
+from app.jobs.scheduler import FairScheduler
+from app.jobs.sync import MailboxSync
+
+
+class PagedScanner:
+    """Serves 12 pages of 100 messages; optionally blows up once on a given page."""
+
+    pages = 12
+
+    def __init__(self, user, fail_on_page=None, gate=None):
+        self.fail_on_page = fail_on_page
+        self.gate = gate
+        self.listed = []
+
+    async def get_profile(self):
+        return {"historyId": "500", "messagesTotal": self.pages * 100}
+
+    async def list_message_ids(self, page_token=None, page_size=100, q=None):
+        page = int(page_token or 0)
+        if self.gate is not None:
+            await self.gate.wait()
+        if page == self.fail_on_page:
+            self.fail_on_page = None
+            raise RuntimeError("worker died")
+        self.listed.append(page)
+        ids = [f"{page}-{i}" for i in range(100)]
+        return ids, str(page + 1) if page + 1 < self.pages else None
+
+    async def fetch_metadata(self, ids):
+        return [
+            {
+                "id": mid, "thread_id": mid, "sender": f"s{n % 3}@example.com", "sender_name": "S",
+                "labels": ["UNREAD"], "internal_date": 1, "list_unsubscribe": "",
+            }
+            for n, mid in enumerate(ids)
+        ]
+
+
+async def _user(db):
+    user = User(email="test@example.com", access_token="t")
+    db.add(user)
+    await db.commit()
+    return user
+
+
+@pytest.mark.asyncio
+async def test_failed_job_resumes_from_checkpoint(db, session_factory, monkeypatch):
+    monkeypatch.setattr(MailboxSync, "CHECKPOINT_PAGES", 5)
+    user = await _user(db)
+    scanner = PagedScanner(user, fail_on_page=7)
+    runner = ScanJobRunner(session_factory, lambda u: scanner)
+
+    job = await runner.enqueue(db, user)
+    await runner.wait(job.id)
+    await db.refresh(job)
+    assert job.status == "failed"
+    assert job.page_token == "5"  # last checkpoint, not page 0
+
+    # a restarted worker re-queues the job and continues from page 5
+    job.status = "queued"
+    await db.commit()
+    scanner.listed.clear()
+    await runner.resume()
+    await runner.wait(job.id)
+    await db.refresh(job)
+
+    assert job.status == "completed"
+    assert scanner.listed == list(range(5, 12))
+    senders = (await index.list_senders(db, user.id))["senders"]
+    assert sum(s["total_emails"] for s in senders) == 1200
+    assert job_progress(job)["resumable"] is False
+
+
+@pytest.mark.asyncio
+async def test_cancel_running_job(db, session_factory):
+    user = await _user(db)
+    gate = asyncio.Event()
+    runner = ScanJobRunner(session_factory, lambda u: PagedScanner(u, gate=gate))
+
+    job = await runner.enqueue(db, user)
+    assert (await runner.enqueue(db, user)).id == job.id  # one active scan per user
+    await asyncio.sleep(0.05)
+    await runner.cancel(db, job.id)
+    gate.set()
+    await runner.wait(job.id)
+
+    fresh = await db.get(ScanJob, job.id)
+    await db.refresh(fresh)
+    assert fresh.status == "cancelled"
+    state = await index.get_sync_state(db, user.id)
+    assert state is None or state.history_id is None
+
+
+@pytest.mark.asyncio
+async def test_scans_from_several_accounts_interleave_page_by_page(db, session_factory):
+    users = [User(email=f"u{n}@example.com", access_token="t") for n in range(2)]
+    db.add_all(users)
+    await db.commit()
+    order = []
+
+    class LoggingScanner(PagedScanner):
+        def __init__(self, user):
+            super().__init__(user)
+            self.user = user
+
+        async def list_message_ids(self, page_token=None, page_size=100, q=None):
+            order.append(self.user.email)
+            return await super().list_message_ids(page_token, page_size, q)
+
+    runner = ScanJobRunner(session_factory, LoggingScanner, scheduler=FairScheduler(slots=1))
+    jobs = [await runner.enqueue(db, user) for user in users]
+    for job in jobs:
+        await runner.wait(job.id)
+
+    assert order.count("u0@example.com") == order.count("u1@example.com") == 12
+    # neither account waits for the other's whole scan: turns alternate while both have pages left
+    assert order[2:8] == ["u0@example.com", "u1@example.com"] * 3
+
+
+@pytest.mark.asyncio
+async def test_job_fails_when_its_account_is_gone_or_cannot_refresh(db, session_factory, monkeypatch):
+    from app.oauth.tokens import token_manager
+
+    user = await _user(db)
+    runner = ScanJobRunner(session_factory, lambda u: PagedScanner(u))
+
+    async def broken_refresh(user):
+        raise KeyError("access_token")
+
+    monkeypatch.setattr(token_manager, "ensure_fresh", broken_refresh)
+    job = await runner.enqueue(db, user)
+    await runner.wait(job.id)
+    await db.refresh(job)
+    assert job.status == "failed" and "access_token" in job.error
+
+    orphan = ScanJob(id="orphan", user_id=9999, status="queued", pages_done=0, messages_processed=0,
+                     retried=0, dropped=0, created_at=job.created_at)
+    db.add(orphan)
+    await db.commit()
+    await runner.resume()
+    await runner.wait("orphan")
+    await db.refresh(orphan)
+    assert orphan.status == "failed" and "9999" in orphan.error
+
+
+@pytest.mark.asyncio
+async def test_a_rescan_leaves_the_live_index_alone_until_it_completes(db, session_factory, monkeypatch):
+    from app.db.base import MessageIndex
+    from app.jobs.sync import staging_key
+    from sqlalchemy import func, select
+
+    monkeypatch.setattr(MailboxSync, "CHECKPOINT_PAGES", 5)
+    user = await _user(db)
+    scanner = PagedScanner(user)
+    runner = ScanJobRunner(session_factory, lambda u: scanner)
+    await runner.wait((await runner.enqueue(db, user)).id)
+
+    async def counts(user_id):
+        total = (await index.summary(db, user_id))["total_emails_scanned"]
+        rows = await db.scalar(select(func.count()).select_from(MessageIndex).where(MessageIndex.user_id == user_id))
+        return total, rows
+
+    # the rescan dies after checkpointing five of its twelve pages
+    scanner.fail_on_page = 7
+    job = await runner.enqueue(db, user)
+    await runner.wait(job.id)
+    assert await counts(user.id) == (1200, 1200)
+    assert (await counts(staging_key(user.id)))[1] == 500
+
+    await db.refresh(job)
+    job.status = "queued"
+    await db.commit()
+    await runner.resume()
+    await runner.wait(job.id)
+    assert await counts(user.id) == (1200, 1200)
+    assert (await counts(staging_key(user.id)))[1] == 0
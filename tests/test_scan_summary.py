@@ -0,0 +1,82 @@
+import pytest
+
+from app.cache import TTLCache
+from app.db.base import User
+from app.jobs.scanner import GmailScanner
+
+
+@pytest.mark.asyncio
+async def test_summary_is_one_batched_round_trip(fake_gmail, fake_user):
+    mailbox, client = fake_gmail
+    mailbox.add_message("Deals <deals@shop.com>", ["INBOX", "UNREAD", "CATEGORY_PROMOTIONS"])
+    mailbox.add_message("Bob <bob@example.com>", ["INBOX", "UNREAD", "CATEGORY_PERSONAL"])
+    mailbox.add_message("Feed <feed@site.com>", ["INBOX", "CATEGORY_UPDATES"])
+
+    summary = await GmailScanner(fake_user, client).get_scan_summary()
+
+    assert mailbox.round_trips == 1
+    assert summary["total_emails_scanned"] == 3
+    assert summary["total_unread"] == 2
+    assert summary["unread_by_category"] == {"Promotions": 1, "Primary": 1}
+
+
+def test_ttl_cache_expires_and_evicts_least_recent():
+    now = [0.0]
+    cache = TTLCache(ttl_seconds=10, maxsize=2, clock=lambda: now[0])
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)  # "b" is the least recently used
+    assert cache.get("b") is None and cache.get("a") == 1
+
+    now[0] = 11
+    assert cache.get("a") is None and len(cache) == 1
+    assert (cache.hits, cache.misses) == (2, 2)
+
+
+@pytest.mark.asyncio
+async def test_summary_route_serves_repeat_loads_from_cache(fake_gmail, db, api_client, monkeypatch):
+    import app.routes.scan as scan
+
+    mailbox, client = fake_gmail
+    mailbox.add_message("Deals <deals@shop.com>", ["INBOX", "UNREAD", "CATEGORY_PROMOTIONS"])
+    db.add(User(email="test@example.com", access_token="t"))
+    await db.commit()
+
+    async def needs_full(user):
+        return {"mode": "needs_full"}
+
+    monkeypatch.setattr(scan, "refresh_index", needs_full)
+    monkeypatch.setattr(scan, "GmailScanner", lambda user: GmailScanner(user, client))
+    monkeypatch.setattr(scan, "summary_cache", TTLCache(ttl_seconds=60))
+
+    first = (await api_client.get("/scan/summary")).json()
+    second = (await api_client.get("/scan/summary")).json()
+
+    assert first == second and first["total_unread"] == 1
+    assert mailbox.round_trips == 1
+
+
+@pytest.mark.asyncio
+async def test_summary_route_reports_gmail_errors_without_caching_them(fake_gmail, db, api_client, monkeypatch):
+    import app.routes.scan as scan
+
+    mailbox, client = fake_gmail
+    mailbox.add_message("Deals <deals@shop.com>", ["INBOX", "UNREAD", "CATEGORY_PROMOTIONS"])
+    db.add(User(email="test@example.com", access_token="t"))
+    await db.commit()
+
+    async def needs_full(user):
+        return {"mode": "needs_full"}
+
+    monkeypatch.setattr(scan, "refresh_index", needs_full)
+    monkeypatch.setattr(scan, "GmailScanner", lambda user: GmailScanner(user, client))
+    monkeypatch.setattr(scan, "summary_cache", TTLCache(ttl_seconds=60))
+
+    mailbox.error_status, mailbox.fail_next = 400, 100
+    failed = await api_client.get("/scan/summary")
+    assert failed.status_code == 502
+
+    mailbox.fail_next = 0
+    recovered = await api_client.get("/scan/summary")
+    assert recovered.status_code == 200 and recovered.json()["total_unread"] == 1
@@ -0,0 +1,60 @@
+import asyncio
+
+import pytest
+
+from app.jobs.scheduler import FairScheduler
+
+
+@pytest.mark.asyncio
+async def test_turns_rotate_between_accounts():
+    scheduler = FairScheduler(slots=1)
+    order = []
+    hold = asyncio.Event()
+
+    async def work(account):
+        async with scheduler.turn(account):
+            order.append(account)
+            if account == "holder":
+                await hold.wait()
+
+    holder = asyncio.create_task(work("holder"))
+    await asyncio.sleep(0)
+    # a big mailbox queues a lot of pages before a small one shows up
+    tasks = [asyncio.create_task(work("big")) for _ in range(5)]
+    await asyncio.sleep(0)
+    tasks += [asyncio.create_task(work("small")) for _ in range(2)]
+    await asyncio.sleep(0)
+    assert scheduler.stats()["waiting"] == {"big": 5, "small": 2}
+
+    hold.set()
+    await asyncio.gather(holder, *tasks)
+    assert order == ["holder", "big", "small", "big", "small", "big", "big", "big"]
+    assert scheduler.stats()["busy"] == 0
+    assert scheduler.stats()["turns"] == {"holder": 1, "big": 5, "small": 2}
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_gives_up_its_place():
+    scheduler = FairScheduler(slots=1)
+    hold = asyncio.Event()
+
+    async def holder():
+        async with scheduler.turn("a"):
+            await hold.wait()
+
+    async def waiter():
+        async with scheduler.turn("b"):
+            pass
+
+    first = asyncio.create_task(holder())
+    await asyncio.sleep(0)
+    second = asyncio.create_task(waiter())
+    await asyncio.sleep(0)
+    second.cancel()
+    await asyncio.gather(second, return_exceptions=True)
+    assert scheduler.stats()["waiting"] == {}
+
+    hold.set()
+    await first
+    async with scheduler.turn("c"):
+        assert scheduler.stats()["busy"] == 1
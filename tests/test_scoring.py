@@ -0,0 +1,52 @@
+import json
+
+import pytest
+
+from app.db.base import MessageIndex, SenderStat
+from app.jobs import scoring
+
+NOW = 1_760_000_000_000
+DAY = scoring.DAY_MS
+
+
+def _stat(email, total, unread, category_mix, last_read=None, list_unsubscribe="", weeks=4):
+    return SenderStat(
+        user_id=1, email=email, sender_id="x", total_emails=total, unread_count=unread,
+        first_seen=NOW - weeks * scoring.WEEK_MS, last_seen=NOW, last_read=last_read,
+        category_mix=json.dumps(category_mix), list_unsubscribe=list_unsubscribe,
+    )
+
+
+@pytest.mark.asyncio
+async def test_unread_newsletter_scores_above_a_friend_the_user_replies_to(db):
+    db.add_all([
+        _stat("news@shop.com", 40, 38, {"promotions": 40}, list_unsubscribe="<https://u>"),
+        _stat("bob@example.com", 12, 0, {"primary": 12}, last_read=NOW - DAY),
+        MessageIndex(user_id=1, id="m1", thread_id="t1", sender="bob@example.com", labels="INBOX"),
+        MessageIndex(user_id=1, id="m2", thread_id="t1", sender="me@example.com", labels="SENT"),
+        MessageIndex(user_id=1, id="m3", thread_id="t2", sender="news@shop.com", labels="INBOX"),
+    ])
+    await db.commit()
+
+    emails, columns = await scoring.load_columns(db, 1)
+    row = dict(zip(emails, columns.tolist()))
+    assert row["bob@example.com"][-1] == 1 and row["news@shop.com"][-1] == 0
+    assert row["news@shop.com"][scoring.COLUMNS.index("promo_emails")] == 40
+
+    scores = await scoring.score_senders(db, 1, now_ms=NOW)
+    newsletter, friend = scores["news@shop.com"], scores["bob@example.com"]
+    assert newsletter["suggested_action"] == "unsubscribe" and friend["suggested_action"] == "keep"
+    assert newsletter["confidence"] > 0.9 and newsletter["risk_score"] < 0.1
+    assert friend["confidence"] < 0.1 and friend["risk_score"] > 0.9
+
+
+@pytest.mark.asyncio
+async def test_recent_opens_lower_confidence(db):
+    db.add_all([
+        _stat("a@shop.com", 10, 2, {"updates": 10}, last_read=NOW - 200 * DAY),
+        _stat("b@shop.com", 10, 2, {"updates": 10}, last_read=NOW - DAY),
+    ])
+    await db.commit()
+
+    scores = await scoring.score_senders(db, 1, ["a@shop.com", "b@shop.com"], now_ms=NOW)
+    assert scores["a@shop.com"]["confidence"] > scores["b@shop.com"]["confidence"]
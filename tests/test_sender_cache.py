@@ -0,0 +1,37 @@
+import pytest
+
+from app.cache import TTLCache
+from app.config import get_settings
+from app.db.base import SenderStat, User
+from app.jobs.aggregate import sender_id
+
+
+@pytest.mark.asyncio
+async def test_sender_detail_is_served_from_listing_cache(db, api_client, monkeypatch):
+    import app.routes.senders as senders
+
+    user = User(email="test@example.com", access_token="t")
+    db.add(user)
+    await db.flush()
+    for email, total in (("deals@shop.com", 40), ("bob@example.com", 3)):
+        db.add(SenderStat(user_id=user.id, email=email, sender_id=sender_id(email), total_emails=total))
+    await db.commit()
+
+    async def cached(user):
+        return {"mode": "cached"}
+
+    cache = TTLCache(ttl_seconds=60)
+    monkeypatch.setattr(senders, "refresh_index", cached)
+    monkeypatch.setattr(senders, "sender_cache", cache)
+
+    listing = (await api_client.get("/senders")).json()
+    detail = await api_client.get(f"/senders/{sender_id('deals@shop.com')}")
+    missing = await api_client.get("/senders/ffffffff")
+    stats = (await api_client.get("/senders/cache/stats")).json()
+
+    assert detail.json() == listing["senders"][0]
+    assert missing.status_code == 404
+    assert stats["size"] == 2 and stats["hits"] == 1 and stats["misses"] == 1
+
+    monkeypatch.setattr(get_settings(), "OWNER_FALLBACK", False)
+    assert (await api_client.get("/senders/cache/stats")).status_code == 401
@@ -0,0 +1,71 @@
+import json
+
+import pytest
+
+from app.db.base import SenderStat, User
+from app.jobs.aggregate import sender_id
+from app.jobs.scanner import GmailScanner
+
+
+def _patch_senders(session_factory, monkeypatch, mode, gmail=None):
+    import app.routes.senders as senders
+
+    async def refresh(user):
+        return {"mode": mode}
+
+    monkeypatch.setattr(senders, "refresh_index", refresh)
+    monkeypatch.setattr(senders, "SessionLocal", session_factory)
+    monkeypatch.setattr(senders, "GmailScanner", lambda user: GmailScanner(user, gmail))
+
+
+def _sse(text):
+    events = []
+    for block in text.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((fields["event"], json.loads(fields["data"])))
+    return events
+
+
+@pytest.mark.asyncio
+async def test_live_sampling_emits_one_event_per_metadata_batch(fake_gmail, db, session_factory, api_client,
+                                                                monkeypatch):
+    mailbox, client = fake_gmail
+    for n in range(250):
+        mailbox.add_message(f"<s{n % 3}@shop.com>", ["INBOX", "CATEGORY_PROMOTIONS", "UNREAD"])
+    db.add(User(email="test@example.com", access_token="t"))
+    await db.commit()
+
+    _patch_senders(session_factory, monkeypatch, "needs_full", client)
+    resp = await api_client.get("/senders/stream", params={"format": "ndjson"})
+    events = [json.loads(line) for line in resp.text.splitlines()]
+
+    assert resp.headers["content-type"].startswith("application/x-ndjson")
+    assert [e["event"] for e in events] == ["senders"] * 3 + ["done"]
+    assert [e["totals"]["messages"] for e in events[:3]] == [100, 200, 250]
+    assert events[0]["source"] == "live" and len(events[0]["senders"]) == 3
+    # each event carries the running aggregate of the senders it touched
+    assert sum(s["total_emails"] for s in events[2]["senders"]) == 250
+    assert events[-1]["totals"] == {"batches": 3, "messages": 250, "senders": 3}
+    assert mailbox.calls["list_messages"] == 3
+
+
+@pytest.mark.asyncio
+async def test_indexed_senders_stream_as_sse_pages(db, session_factory, api_client, monkeypatch):
+    user = User(email="test@example.com", access_token="t")
+    db.add(user)
+    await db.flush()
+    for n in range(150):
+        email = f"s{n:03d}@example.com"
+        db.add(SenderStat(user_id=user.id, email=email, sender_id=sender_id(email), total_emails=n + 1))
+    await db.commit()
+
+    _patch_senders(session_factory, monkeypatch, "cached")
+    resp = await api_client.get("/senders/stream")
+    unknown = await api_client.get("/senders/stream", params={"format": "xml"})
+    events = _sse(resp.text)
+
+    assert resp.headers["content-type"].startswith("text/event-stream")
+    assert [name for name, _ in events] == ["senders", "senders", "done"]
+    assert len(events[0][1]["senders"]) == 100 and events[0][1]["senders"][0]["email"] == "s149@example.com"
+    assert events[-1][1] == {"source": "index", "totals": {"batches": 2, "senders": 150, "emails": 150 * 151 // 2}}
+    assert unknown.status_code == 400
@@ -37,3 +37,13 @@ def test_lifespan_startup_if_present():
     except Exception:
         # If not FastAPI / no routes, that's fine—import path still covered
         pass
+
+def test_app_refuses_to_start_without_a_session_secret(monkeypatch):
+    import pytest
+    import app.main as m
+
+    settings = m.get_settings()
+    assert settings.OWNER_FALLBACK is False  # opt-in
+    monkeypatch.setattr(settings, "SESSION_SECRET", "")
+    with pytest.raises(RuntimeError, match="SESSION_SECRET"):
+        m.create_app()
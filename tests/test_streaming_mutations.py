@@ -0,0 +1,122 @@
+import json
+
+import pytest
+
+from app.db.base import AuditLog, User
+from app.jobs.scanner import GmailScanner
+from tests.fakes.gmail import _error
+
+
+def _seed(mailbox, n, sender="Deals <deals@shop.com>"):
+    for i in range(n):
+        mailbox.add_message(sender, ["INBOX", "CATEGORY_PROMOTIONS"], internal_date=1_000_000 + i)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("action", ["delete", "unsubscribe"])
+async def test_execute_action_follows_every_page(fake_gmail, fake_user, action):
+    mailbox, client = fake_gmail
+    _seed(mailbox, 2_300)
+    _seed(mailbox, 10, "other@example.com")
+    progress = []
+
+    result = await GmailScanner(fake_user, client).execute_action(
+        "deals@shop.com", action, on_progress=progress.append
+    )
+
+    assert result["messages_affected"] == result["messages_matched"] == 2_300
+    assert result["pages"] == 5
+    # list pages of 500 are regrouped into full 1000-id batchModify calls
+    assert result["api_calls"] == 3
+    assert [p["batch_messages"] for p in progress] == [1_000, 1_000, 300]
+    assert progress[-1]["messages_affected"] == 2_300
+    untouched = [m for m in mailbox.messages.values() if "INBOX" in m["labelIds"]]
+    assert len(untouched) == 10
+
+
+@pytest.mark.asyncio
+async def test_category_wipe_has_no_page_cap(fake_gmail, fake_user):
+    mailbox, client = fake_gmail
+    _seed(mailbox, 1_200)
+    result = await GmailScanner(fake_user, client).execute_category_wipe("promotions", mode="per_message")
+    assert result["messages_affected"] == 1_200
+    assert result["batches"] == result["pages"] == 3
+    assert all("TRASH" in m["labelIds"] for m in mailbox.messages.values())
+
+
+@pytest.mark.asyncio
+async def test_draining_pass_stops_on_messages_it_cannot_change(fake_gmail, fake_user):
+    mailbox, client = fake_gmail
+    _seed(mailbox, 1_200)
+    stuck = set(list(mailbox.messages)[-3:])  # newest first, so these sit on the first page
+    trash = mailbox.trash_message
+    mailbox.trash_message = lambda params, body, id: (
+        _error(400, "Invalid message", "invalidArgument") if id in stuck else trash(params, body, id)
+    )
+
+    result = await GmailScanner(fake_user, client).execute_action("deals@shop.com", "delete", mode="per_message")
+
+    assert result["messages_affected"] == 1_197
+    assert {i for i, m in mailbox.messages.items() if "TRASH" not in m["labelIds"]} == stuck
+
+
+@pytest.mark.asyncio
+async def test_passes_that_keep_their_matches_page_through(fake_gmail, fake_user, monkeypatch):
+    mailbox, client = fake_gmail
+    _seed(mailbox, 1_200)
+    monkeypatch.setitem(GmailScanner.ACTION_PASSES, "star", ((None, ["STARRED"], []),))
+
+    result = await GmailScanner(fake_user, client).stream_mutation("from:deals@shop.com", "star")
+
+    assert result["pages"] == 3 and result["batches"] == 2
+    assert result["messages_affected"] == 1_200
+    assert all("STARRED" in m["labelIds"] for m in mailbox.messages.values())
+
+
+@pytest.mark.asyncio
+async def test_wipe_route_streams_ndjson_progress(fake_gmail, db, session_factory, api_client, monkeypatch):
+    import app.routes.actions as actions
+
+    mailbox, client = fake_gmail
+    _seed(mailbox, 1_100)
+    db.add(User(email="test@example.com", access_token="t"))
+    await db.commit()
+
+    monkeypatch.setattr(actions, "GmailScanner", lambda user: GmailScanner(user, client))
+    monkeypatch.setattr(actions, "SessionLocal", session_factory)
+
+    resp = await api_client.delete("/categories/promotions", params={"stream": "true"})
+
+    events = [json.loads(line) for line in resp.text.splitlines()]
+    assert [e["event"] for e in events] == ["progress", "progress", "done"]
+    assert events[-1]["messages_affected"] == 1_100
+
+    async with session_factory() as session:
+        logs = (await session.execute(AuditLog.__table__.select())).all()
+    assert len(logs) == 1
+
+
+@pytest.mark.asyncio
+async def test_execute_all_route_streams_one_line_per_sender(fake_gmail, db, session_factory, api_client, monkeypatch):
+    import app.routes.actions as actions
+
+    mailbox, client = fake_gmail
+    for i in range(3):
+        mailbox.add_message(f"<news{i}@shop.com>", ["INBOX", "CATEGORY_PROMOTIONS"])
+    db.add(User(email="test@example.com", access_token="t"))
+    await db.commit()
+
+    monkeypatch.setattr(actions, "GmailScanner", lambda user: GmailScanner(user, client))
+    monkeypatch.setattr(actions, "SessionLocal", session_factory)
+
+    plan = {"senders": [{"sender": f"news{i}@shop.com", "recommended_action": "delete"} for i in range(3)],
+            "stream": True}
+    resp = await api_client.post("/plan/execute-all", json=plan)
+
+    events = [json.loads(line) for line in resp.text.splitlines()]
+    assert [e["event"] for e in events] == ["sender"] * 3 + ["done"]
+    assert events[-1]["messages_affected"] == 3
+
+    async with session_factory() as session:
+        logs = (await session.execute(AuditLog.__table__.select())).all()
+    assert len(logs) == 1
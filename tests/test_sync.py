@@ -0,0 +1,68 @@
+import pytest
+
+from app.db.base import User
+from app.jobs import index
+from app.jobs.scanner import GmailScanner
+from app.jobs.sync import MailboxSync
+
+
+async def _user(db):
+    user = User(email="test@example.com", access_token="t")
+    db.add(user)
+    await db.commit()
+    return user
+
+
+@pytest.mark.asyncio
+async def test_full_then_incremental_sync(db, fake_gmail):
+    mailbox, client = fake_gmail
+    m1 = mailbox.add_message("Shop <news@shop.com>", ["UNREAD", "CATEGORY_PROMOTIONS"], 1000)
+    m2 = mailbox.add_message("Shop <news@shop.com>", ["CATEGORY_PROMOTIONS"], 2000)
+    mailbox.add_message("friend@mail.com", ["INBOX", "CATEGORY_PERSONAL"], 3000)
+
+    user = await _user(db)
+    sync = MailboxSync(db, user, lambda u: GmailScanner(u, client))
+    assert (await sync.run()) == {"mode": "full", "indexed": 3, "senders": 2}
+
+    senders = (await index.list_senders(db, user.id))["senders"]
+    assert senders[0]["email"] == "news@shop.com"
+    assert senders[0]["total_emails"] == 2 and senders[0]["unread_count"] == 1
+    assert senders[0]["suggested_action"] == "unsubscribe"
+
+    mailbox.add_message("friend@mail.com", ["UNREAD", "CATEGORY_PERSONAL"], 4000)
+    mailbox.batch_delete({}, {"ids": [m1]})
+    mailbox.modify_message({}, {"addLabelIds": ["UNREAD"]}, id=m2)
+    mailbox.calls.clear()
+
+    result = await sync.run()
+    assert result["mode"] == "incremental"
+    # only the new message is fetched; label changes are applied locally
+    assert mailbox.calls["get_message"] == 1
+
+    senders = {s["email"]: s for s in (await index.list_senders(db, user.id))["senders"]}
+    assert senders["news@shop.com"]["total_emails"] == 1
+    assert senders["friend@mail.com"]["unread_count"] == 1
+    assert senders["friend@mail.com"]["category_mix"] == {"primary": 2}
+
+    summary = await index.summary(db, user.id)
+    assert summary["total_emails_scanned"] == 3
+    assert summary["total_unread"] == 2
+    assert summary["unread_by_category"] == {"Promotions": 1, "Primary": 1}
+    assert (await index.get_sync_state(db, user.id)).history_id == str(mailbox.history_id)
+
+    # fresh index -> no Gmail work at all
+    mailbox.calls.clear()
+    assert (await sync.ensure_fresh()) == {"mode": "cached"}
+    assert not mailbox.calls
+
+
+@pytest.mark.asyncio
+async def test_expired_history_needs_full_sync(db, fake_gmail):
+    mailbox, client = fake_gmail
+    mailbox.add_message("a@example.com")
+    user = await _user(db)
+    sync = MailboxSync(db, user, lambda u: GmailScanner(u, client))
+    await sync.run()
+
+    mailbox.oldest_history_id = mailbox.history_id + 1
+    assert (await sync.run(allow_full=False)) == {"mode": "needs_full"}
@@ -0,0 +1,75 @@
+import asyncio
+import time
+from urllib.parse import parse_qs
+
+import httpx
+import pytest
+
+from app.db.base import User
+from app.gmail.pool import ClientPool
+from app.oauth.tokens import TokenManager
+
+
+def _token_endpoint(calls, status=200, delay=0.02):
+    async def handler(request):
+        form = parse_qs(request.content.decode())
+        calls.append(form["refresh_token"][0])
+        await asyncio.sleep(delay)
+        if status >= 400:
+            return httpx.Response(status, json={"error": "invalid_grant"})
+        return httpx.Response(200, json={"access_token": f"fresh-{len(calls)}", "expires_in": 3600})
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+async def _user(db, email="a@example.com", expires_in=30):
+    user = User(email=email, access_token="stale", refresh_token="r-" + email, expires_at=int(time.time()) + expires_in)
+    db.add(user)
+    await db.commit()
+    return user
+
+
+@pytest.mark.asyncio
+async def test_concurrent_refreshes_collapse_into_one(db, session_factory):
+    user = await _user(db)
+    calls = []
+    pool = ClientPool()
+    pooled = pool.get(user)
+    manager = TokenManager(session_factory, http=_token_endpoint(calls), pool=pool, lead_seconds=300)
+
+    tokens = await asyncio.gather(*(manager.refresh(user) for _ in range(10)))
+    assert calls == ["r-a@example.com"]
+    assert set(tokens) == {"fresh-1"}
+    assert manager.stats() == {"refreshes": 1, "coalesced": 9, "failures": 0}
+
+    # persisted, and the pooled client (used by scans already running) switched over
+    await db.refresh(user)
+    assert user.access_token == "fresh-1"
+    assert user.expires_at > time.time() + 3000
+    assert pooled.access_token == "fresh-1"
+    assert not manager.needs_refresh(user)
+
+
+@pytest.mark.asyncio
+async def test_background_pass_only_refreshes_tokens_near_expiry(db, session_factory):
+    due = await _user(db, "due@example.com", expires_in=60)
+    await _user(db, "later@example.com", expires_in=3000)
+    db.add(User(email="no-refresh@example.com", access_token="t"))
+    await db.commit()
+    calls = []
+    manager = TokenManager(session_factory, http=_token_endpoint(calls), pool=ClientPool(), lead_seconds=300)
+
+    assert await manager.refresh_due() == 1
+    assert calls == ["r-due@example.com"]
+    await db.refresh(due)
+    assert due.access_token == "fresh-1"
+
+
+@pytest.mark.asyncio
+async def test_failed_refresh_leaves_the_token_alone_on_the_hot_path(db, session_factory):
+    user = await _user(db, expires_in=-10)
+    calls = []
+    manager = TokenManager(session_factory, http=_token_endpoint(calls, status=400), pool=ClientPool())
+
+    assert await manager.ensure_fresh(user) is user
+    assert user.access_token == "stale"
+    assert manager.stats()["failures"] == 1
@@ -0,0 +1,132 @@
+import pytest
+
+from app.db.base import User
+from app.jobs import undo
+from app.jobs.scanner import GmailScanner
+
+
+def _journal(ids):
+    journal = undo.UndoJournal()
+    journal.record(["TRASH"], [], ids)
+    return journal
+
+
+def test_journal_packs_ids_into_eight_bytes_each():
+    journal = undo.UndoJournal()
+    ids = [f"{0x18c2f00000000000 + i * 7:016x}" for i in range(10_000)]
+    journal.record(["TRASH"], ["INBOX"], ids[:6_000])
+    journal.record(["TRASH"], [], ids[6_000:])
+    journal.record([], ["INBOX"], ["not-a-hex-id"])
+
+    payload = journal.dumps()
+    assert len(payload) < 8 * len(ids)
+
+    restored = undo.UndoJournal.loads(payload)
+    assert len(restored) == 10_001
+    assert sorted(restored.groups[("TRASH",), ("INBOX",)]) == ids[:6_000]
+    assert restored.groups[(), ("INBOX",)] == ["not-a-hex-id"]
+
+
+@pytest.mark.asyncio
+async def test_wipe_is_reverted_with_a_few_batch_modify_calls(fake_gmail, fake_user):
+    mailbox, client = fake_gmail
+    scanner = GmailScanner(fake_user, client)
+    inbox = [mailbox.add_message("<deals@shop.com>", ["INBOX", "CATEGORY_PROMOTIONS"]) for _ in range(9_000)]
+    archived = [mailbox.add_message("<deals@shop.com>", ["CATEGORY_PROMOTIONS"]) for _ in range(1_000)]
+
+    journal = undo.UndoJournal()
+    result = await scanner.execute_category_wipe("promotions", journal=journal)
+    assert result["messages_affected"] == len(journal) == 10_000
+
+    mailbox.calls.clear()
+    restored, api_calls, remaining = await scanner.revert(journal)
+    assert restored == 10_000 and not len(remaining)
+    assert api_calls == mailbox.calls["batch_modify"] == 10
+    assert all(mailbox.messages[m]["labelIds"] == ["CATEGORY_PROMOTIONS", "INBOX"] for m in inbox)
+    # archived mail goes back to the archive, not the inbox
+    assert all(mailbox.messages[m]["labelIds"] == ["CATEGORY_PROMOTIONS"] for m in archived)
+
+
+@pytest.mark.asyncio
+async def test_undo_routes_report_and_revert_an_executed_action(fake_gmail, db, api_client, monkeypatch):
+    import app.routes.actions as actions
+
+    mailbox, client = fake_gmail
+    ids = [mailbox.add_message("<news@shop.com>", ["INBOX"]) for _ in range(3)]
+    db.add(User(email="test@example.com", access_token="t"))
+    await db.commit()
+
+    monkeypatch.setattr(actions, "GmailScanner", lambda user: GmailScanner(user, client))
+
+    executed = (await api_client.post("/plan/execute", json={"target_email": "news@shop.com", "action_type": "delete"})).json()
+    status = (await api_client.get(f"/undo/status/{executed['undo_id']}")).json()
+    undone = await api_client.post(f"/action/undo/{executed['undo_id']}")
+    again = await api_client.post(f"/action/undo/{executed['undo_id']}")
+
+    assert status["status"] == "available" and status["message_count"] == 3
+    assert undone.json()["messages_restored"] == 3 and undone.json()["api_calls"] == 1
+    assert again.status_code == 409
+    assert all(mailbox.messages[m]["labelIds"] == ["INBOX"] for m in ids)
+
+
+@pytest.mark.asyncio
+async def test_a_partial_undo_keeps_the_rest_for_a_retry(fake_gmail, db, api_client, monkeypatch):
+    import app.routes.actions as actions
+
+    mailbox, client = fake_gmail
+    ids = [mailbox.add_message("<news@shop.com>", ["INBOX"]) for _ in range(3)]
+    db.add(User(email="test@example.com", access_token="t"))
+    await db.commit()
+    monkeypatch.setattr(actions, "GmailScanner", lambda user: GmailScanner(user, client))
+    monkeypatch.setattr(GmailScanner, "BULK_LIMIT", 2)
+
+    executed = (await api_client.post("/plan/execute", json={"target_email": "news@shop.com", "action_type": "delete"})).json()
+    # one of the two restore batches is rejected outright
+    mailbox.error_status, mailbox.fail_next = 400, 1
+    first = (await api_client.post(f"/action/undo/{executed['undo_id']}")).json()
+    status = (await api_client.get(f"/undo/status/{executed['undo_id']}")).json()
+    retried = (await api_client.post(f"/action/undo/{executed['undo_id']}")).json()
+
+    assert first["partial"] and first["status"] == status["status"] == "partial"
+    assert first["messages_restored"] + first["messages_remaining"] == 3 and first["messages_remaining"]
+    assert not retried["partial"] and retried["status"] == "undone"
+    assert retried["messages_restored"] == first["messages_remaining"]
+    assert all(mailbox.messages[m]["labelIds"] == ["INBOX"] for m in ids)
+
+
+@pytest.mark.asyncio
+async def test_only_one_of_two_undos_claims_the_window(db, session_factory):
+    window = undo.record(db, 1, "delete", _journal(["a", "b"]))
+    await db.commit()
+
+    async with session_factory() as other:
+        racer = await undo.find_window(other, 1, window.action_id)
+        assert await undo.claim(db, window)
+        assert not await undo.claim(other, racer)
+    assert window.status == undo.REVERTING
+    assert undo.window_status(window) == "reverting"
+
+
+@pytest.mark.asyncio
+async def test_a_failed_action_keeps_an_undo_window_for_what_it_changed(fake_gmail, db, api_client, monkeypatch):
+    import app.routes.actions as actions
+
+    mailbox, client = fake_gmail
+    ids = [mailbox.add_message("<news@shop.com>", ["INBOX"]) for _ in range(3)]
+    db.add(User(email="test@example.com", access_token="t"))
+    await db.commit()
+    monkeypatch.setattr(actions, "GmailScanner", lambda user: GmailScanner(user, client))
+
+    async def fail_after_trashing(self, sender, action_type, list_unsubscribe, mode, on_progress, journal, *args):
+        await self._apply_labels(ids, ["TRASH"], [], "bulk")
+        journal.record(["TRASH"], [], ids)
+        raise RuntimeError("list page failed")
+
+    monkeypatch.setattr(GmailScanner, "execute_action", fail_after_trashing)
+    resp = await api_client.post("/plan/execute", json={"target_email": "news@shop.com", "action_type": "delete"})
+    assert resp.status_code == 502
+    undo_id = resp.json()["detail"]["undo_id"]
+    assert (await api_client.get(f"/undo/status/{undo_id}")).json()["message_count"] == 3
+
+    assert (await api_client.post(f"/action/undo/{undo_id}")).json()["messages_restored"] == 3
+    assert all(mailbox.messages[m]["labelIds"] == ["INBOX"] for m in ids)
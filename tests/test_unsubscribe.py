@@ -0,0 +1,90 @@
+import asyncio
+from collections import Counter
+
+import httpx
+import pytest
+
+from app.db.base import AuditLog
+from app.gmail.ratelimit import RetryPolicy
+from app.jobs.unsubscribe import UnsubscribeDispatcher, parse_list_unsubscribe
+
+ONE_CLICK = "List-Unsubscribe=One-Click"
+
+
+def _dispatcher(session_factory, handler, **kwargs):
+    http = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return UnsubscribeDispatcher(
+        session_factory=session_factory, http=http, retry=RetryPolicy(max_retries=2, base_delay=0.001), **kwargs
+    )
+
+
+def test_parse_list_unsubscribe_keeps_every_uri():
+    web, mailto = parse_list_unsubscribe("<mailto:u@list.com?subject=stop>, <https://list.com/u?id=1>")
+    assert web == ["https://list.com/u?id=1"]
+    assert mailto == ["mailto:u@list.com?subject=stop"]
+
+
+@pytest.mark.asyncio
+async def test_one_click_posts_form_and_retries_transient_errors(session_factory):
+    seen = []
+
+    async def handler(request):
+        seen.append((request.method, request.content.decode()))
+        return httpx.Response(503 if len(seen) == 1 else 200)
+
+    dispatcher = _dispatcher(session_factory, handler)
+    outcome = await dispatcher.dispatch(None, "news@shop.com", "<https://shop.com/u>", ONE_CLICK, user_id=7)
+
+    assert outcome["status"] == "ok" and outcome["method"] == "one_click" and outcome["tries"] == 2
+    assert seen == [("POST", "List-Unsubscribe=One-Click")] * 2
+    async with session_factory() as session:
+        logs = (await session.execute(AuditLog.__table__.select())).all()
+    assert len(logs) == 1 and "via one_click" in logs[0].details and logs[0].user_id == 7
+
+
+@pytest.mark.asyncio
+async def test_rejected_one_click_falls_back_to_mailto_through_gmail(session_factory, fake_gmail):
+    mailbox, client = fake_gmail
+
+    async def handler(request):
+        return httpx.Response(404)
+
+    dispatcher = _dispatcher(session_factory, handler)
+    outcome = await dispatcher.dispatch(
+        client, "news@shop.com", "<https://shop.com/u>, <mailto:leave@shop.com?subject=remove%20me>", ONE_CLICK
+    )
+
+    assert outcome["status"] == "ok" and outcome["method"] == "mailto"
+    assert len(mailbox.sent) == 1
+    assert mailbox.sent[0]["To"] == "leave@shop.com" and mailbox.sent[0]["Subject"] == "remove me"
+
+
+@pytest.mark.asyncio
+async def test_hundreds_of_senders_run_concurrently_within_per_domain_limits(session_factory):
+    in_flight, peak = Counter(), Counter()
+    total_peak = 0
+
+    async def handler(request):
+        nonlocal total_peak
+        host = request.url.host
+        in_flight[host] += 1
+        peak[host] = max(peak[host], in_flight[host])
+        total_peak = max(total_peak, sum(in_flight.values()))
+        # long enough that the (serialized) audit writes don't dominate the timing
+        await asyncio.sleep(0.05)
+        in_flight[host] -= 1
+        return httpx.Response(200)
+
+    dispatcher = _dispatcher(session_factory, handler, per_domain=2, max_concurrency=50)
+    for i in range(200):
+        dispatcher.submit(None, f"s{i}@x.com", f"<https://host{i % 4}.com/u/{i}>", ONE_CLICK)
+
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    await dispatcher.wait()
+    elapsed = loop.time() - start
+
+    assert set(peak.values()) == {2}
+    # every host at its limit at once, not one host after another
+    assert total_peak == 4 * 2
+    assert elapsed < 200 * 0.05 / 2  # quicker than one request at a time, even with the audit writes